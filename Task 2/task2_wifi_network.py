@@ -1,89 +1,151 @@
-from mininet.net import Mininet
-from mininet.node import Controller
-from mininet.cli import CLI
-from mininet.log import setLogLevel, info
-from mn_wifi.net import Mininet_wifi
-from mn_wifi.node import Station
-from mn_wifi.cli import CLI_wifi
-from mn_wifi.link import wmediumd, adhoc
-from mn_wifi.wmediumdConnector import interference
 import time
 import threading
 import subprocess
+import sys
 import os
 
-def create_adhoc_network():
-    """Create Ad-Hoc network for emergency response units"""
+# Shared helper modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# WIFI_BACKEND=simulated runs on the in-memory backend; anything else
+# needs Mininet-WiFi, so a broken install fails here instead of quietly
+# producing simulated results
+if os.environ.get('WIFI_BACKEND') == 'simulated':
+    from simnet import (CLI, CLI_wifi, Controller, Mininet, Mininet_wifi, Station,
+                        adhoc, info, interference, setLogLevel, wmediumd)
+else:
+    try:
+        from mininet.net import Mininet
+        from mininet.node import Controller
+        from mininet.cli import CLI
+        from mininet.log import setLogLevel, info
+        from mn_wifi.net import Mininet_wifi
+        from mn_wifi.node import Station
+        from mn_wifi.cli import CLI_wifi
+        from mn_wifi.link import wmediumd, adhoc
+        from mn_wifi.wmediumdConnector import interference
+    except ImportError as error:
+        raise ImportError(f"{error}; set WIFI_BACKEND=simulated to run without "
+                          "Mininet-WiFi") from error
+
+from connectivity import connectivity_matrix
+from iperf_stream import stream_iperf
+from capture import LiveAnalysis, TrafficCapture
+from interference import InterferenceEngine, format_links
+from mesh import build_mesh, plan_mesh
+from profiling import enable_from_env, format_summary, instrument_net, profiled
+from propagation import PropagationModel
+from renderer import plot_network
+from results import (interval_recorder, open_from_env, record_connectivity, record_iperf,
+                     record_route_changes, record_routes, timed)
+from olsr import TxtinfoClient, start_olsr, wait_for_convergence
+from scenario import load_scenario
+from scheduler import clock_for
+from traffic import TrafficOrchestrator, aggregate_flows, summarize_flow
+
+# Emergency response units; position is x,y,antenna_height
+ADHOC_SPECS = [
+    {'name': 'adhoc1', 'ip': '192.168.2.1/24', 'mac': '02:00:00:00:21:00',
+     'position': '60,10,1', 'range': 30, 'antennaGain': 5},
+    {'name': 'adhoc2', 'ip': '192.168.2.2/24', 'mac': '02:00:00:00:22:00',
+     'position': '75,25,2', 'range': 30, 'antennaGain': 6},
+    {'name': 'adhoc3', 'ip': '192.168.2.3/24', 'mac': '02:00:00:00:23:00',
+     'position': '90,15,3', 'range': 30, 'antennaGain': 7},
+]
+
+# Shared ad-hoc network settings
+ADHOC_LINK = {'ssid': 'adhocUH', 'mode': 'g', 'channel': 6, 'ht_cap': 'HT40+'}
+
+# logDistance exponent for the outdoor emergency scenario
+PATH_LOSS_EXP = 2.5
+
+def transfer_pair(net):
+    """(client, server) of the TCP transfer: the first two stations
+    
+    For the built-in topology (and scenarios/task2.yaml) that is adhoc1
+    sending to adhoc2.
+    """
+    
+    if len(net.stations) < 2:
+        raise ValueError("the TCP transfer needs at least two stations")
+    return net.stations[0], net.stations[1]
+
+@profiled()
+def create_adhoc_network(scenario=None):
+    """Create Ad-Hoc network for emergency response units
+    
+    With a scenario file (e.g. scenarios/task2.yaml) the topology is
+    built from it instead of the hard-coded stations.
+    """
     
     setLogLevel('info')
     
+    if scenario is not None:
+        return instrument_net(load_scenario(scenario).build(
+            simulated=getattr(Mininet_wifi, 'simulated', False)))
+    
     # Create Mininet-WiFi network with ad-hoc support
     net = Mininet_wifi(
         link=wmediumd,
         wmediumd_mode=interference
     )
     
+    # Time configureWifiNodes/build/start/stop when profiling
+    instrument_net(net)
+    
     info("*** Creating Ad-Hoc Emergency Network\n")
     
     # Add emergency response stations with ad-hoc configuration
-    adhoc1 = net.addStation('adhoc1',
-                           ip='192.168.2.1/24',
-                           mac='02:00:00:00:21:00',
-                           position='60,10,1',  # x,y,antenna_height
-                           range=30,
-                           antennaGain=5)
-    
-    adhoc2 = net.addStation('adhoc2', 
-                           ip='192.168.2.2/24',
-                           mac='02:00:00:00:22:00',
-                           position='75,25,2',  # x,y,antenna_height
-                           range=30,
-                           antennaGain=6)
-    
-    adhoc3 = net.addStation('adhoc3',
-                           ip='192.168.2.3/24', 
-                           mac='02:00:00:00:23:00',
-                           position='90,15,3',  # x,y,antenna_height
-                           range=30,
-                           antennaGain=7)
+    stations = [net.addStation(spec['name'],
+                               **{key: value for key, value in spec.items()
+                                  if key != 'name'})
+                for spec in ADHOC_SPECS]
     
     # Configure propagation model for outdoor emergency scenario
-    net.setPropagationModel(model="logDistance", exp=2.5)
+    net.setPropagationModel(model="logDistance", exp=PATH_LOSS_EXP)
     
     info("*** Configuring Ad-Hoc nodes\n")
     net.configureWifiNodes()
     
-    # Create ad-hoc links between stations
+    # Only pairs that can be in range need checking; report them so the
+    # OLSR neighbour tables can be compared against the layout
+    plan = plan_mesh(ADHOC_SPECS, exp=PATH_LOSS_EXP)
+    for a, b in plan.neighbors:
+        info(f"*** {a} <-> {b} in range ({plan.distance[(a, b)]:.1f} m)\n")
+    for name in plan.isolated():
+        info(f"*** {name} has no neighbour in range\n")
+    
+    # Join each station to the ad-hoc network once
     info("*** Creating Ad-Hoc mesh topology\n")
-    net.addLink(adhoc1, adhoc2, cls=adhoc, 
-                ssid='adhocUH', 
-                mode='g',
-                channel=6,
-                ht_cap='HT40+')
-    
-    net.addLink(adhoc1, adhoc3, cls=adhoc,
-                ssid='adhocUH',
-                mode='g', 
-                channel=6,
-                ht_cap='HT40+')
-    
-    net.addLink(adhoc2, adhoc3, cls=adhoc,
-                ssid='adhocUH',
-                mode='g',
-                channel=6, 
-                ht_cap='HT40+')
-    
-    # Plot network for visualization 
-    net.plotGraph(max_x=100, max_y=40)
+    build_mesh(net, stations, adhoc, **ADHOC_LINK)
+    
+    # Plot network for visualization (WIFI_PLOT=throttled renders off-screen)
+    plot_network(net, max_x=100, max_y=40)
     
     # Build and start network
     info("*** Starting Ad-Hoc network\n")
     net.build()
     net.start()
     
-    return net
+    # Nodes exist now, so their cmd() calls can be timed too
+    return instrument_net(net)
 
-def configure_olsr(net):
+def estimate_adhoc_links(activity=0.5):
+    """Expected SINR, PER and PHY rate of every in-range ad-hoc link"""
+    
+    nodes = [dict(spec, channel=ADHOC_LINK['channel']) for spec in ADHOC_SPECS]
+    engine = InterferenceEngine(nodes, PropagationModel(exp=PATH_LOSS_EXP), activity)
+    plan = plan_mesh(ADHOC_SPECS, exp=PATH_LOSS_EXP)
+    pairs = plan.neighbors + [(b, a) for a, b in plan.neighbors]
+    links = engine.links(pairs)
+    
+    print("Estimated ad-hoc link quality:")
+    print(format_links(links))
+    
+    return engine
+
+@profiled()
+def configure_olsr(net, convergence_timeout=60):
     """Configure OLSR routing protocol on all ad-hoc nodes"""
     
     info("*** Configuring OLSR routing protocol\n")
@@ -124,216 +186,294 @@ Interface "{interface}"
 }
 """
     
-    stations = ['adhoc1', 'adhoc2', 'adhoc3']
+    stations = list(net.stations)
+    config_files = {}
     
-    for station_name in stations:
-        station = net.get(station_name)
-        interface = f"{station_name}-wlan0"
+    for station in stations:
+        interface = f"{station.name}-wlan0"
         
-        # Create OLSR config file for this station
-        config_content = olsr_config.format(interface=interface)
-        config_file = f"/tmp/olsrd_{station_name}.conf"
+        # Create OLSR config file for this station (str.replace, since the
+        # template's own braces would trip str.format)
+        config_content = olsr_config.replace('{interface}', interface)
+        config_file = f"/tmp/olsrd_{station.name}.conf"
         
         # Write config file
         with open(config_file, 'w') as f:
             f.write(config_content)
-        
-        # Start OLSR daemon
-        info(f"*** Starting OLSR on {station_name}\n")
-        olsr_cmd = f"olsrd -f {config_file} -d 1 &"
-        station.cmd(olsr_cmd)
-        
-        # Wait for OLSR to initialize
-        time.sleep(2)
+        config_files[station.name] = config_file
+    
+    # Start every daemon at once
+    startup_time = start_olsr(stations, config_files)
     
-    # Allow OLSR convergence time
+    # Wait until txtinfo shows complete, stable neighbor and route tables
     info("*** Waiting for OLSR convergence\n")
-    time.sleep(10)
+    metrics = wait_for_convergence(stations, timeout=convergence_timeout,
+                                   clock=clock_for(net))
+    metrics['startup_time'] = startup_time
+    
+    status = "converged" if metrics['converged'] else "did not converge"
+    info(f"*** OLSR {status}: startup {startup_time:.2f}s, "
+         f"convergence {metrics['convergence_time']:.2f}s\n")
+    
+    return metrics
 
-def test_icmp_connectivity(net):
+@profiled()
+def test_icmp_connectivity(net, count=5, store=None):
     """Test ICMP connectivity between closest ad-hoc stations"""
     
     info("*** Testing ICMP connectivity between stations\n")
     
-    # Get stations
-    adhoc1 = net.get('adhoc1')
-    adhoc2 = net.get('adhoc2') 
-    adhoc3 = net.get('adhoc3')
-    
-    results = {}
-    
-    # Test adhoc1 to adhoc2 
-    info("*** Testing adhoc1 -> adhoc2 connectivity\n")
-    result1 = adhoc1.cmd('ping -c 5 192.168.2.2')
-    results['adhoc1_to_adhoc2'] = result1
-    print("ADHOC1 to ADHOC2 ping result:")
-    print(result1)
-    print("-" * 60)
-    
-    # Test adhoc2 to adhoc3  
-    info("*** Testing adhoc2 -> adhoc3 connectivity\n")
-    result2 = adhoc2.cmd('ping -c 5 192.168.2.3')
-    results['adhoc2_to_adhoc3'] = result2
-    print("ADHOC2 to ADHOC3 ping result:")
-    print(result2)
-    print("-" * 60)
+    # Probe all station pairs concurrently instead of one ping at a time
+    stations = list(net.stations)
+    matrix = connectivity_matrix(stations, count=count)
     
-    # Test adhoc1 to adhoc3 
-    info("*** Testing adhoc1 -> adhoc3 connectivity\n") 
-    result3 = adhoc1.cmd('ping -c 5 192.168.2.3')
-    results['adhoc1_to_adhoc3'] = result3
-    print("ADHOC1 to ADHOC3 ping result:")
-    print(result3)
+    print("Ad-Hoc connectivity results:")
+    print(matrix.format())
     print("-" * 60)
+    if store is not None:
+        record_connectivity(store, matrix)
     
-    return results
+    # Keyed as 'adhoc1_to_adhoc2' etc. with loss/RTT/reachability per pair
+    return matrix.as_dict()
 
+@profiled()
 def setup_tcp_transfer(net):
     """Setup TCP transfer test with iperf3"""
     
     info("*** Setting up TCP transfer test\n")
     
     # Get stations
-    adhoc1 = net.get('adhoc1')
-    adhoc2 = net.get('adhoc2')
+    client, server = transfer_pair(net)
     
-    # Start iperf3 server on adhoc2
-    info("*** Starting iperf3 server on adhoc2\n")
+    # Start iperf3 server on the receiving station
+    info(f"*** Starting iperf3 server on {server.name}\n")
     server_cmd = "iperf3 -s -p 5001 -D"  # -D for daemon mode
-    adhoc2.cmd(server_cmd)
+    server.cmd(server_cmd)
     
     # Wait for server to start
-    time.sleep(2)
+    if not getattr(net, 'simulated', False):
+        time.sleep(2)
     
-    return adhoc1, adhoc2
+    return client, server
 
-def run_tcp_transfer(client_station, server_ip, duration=120):
+@profiled()
+def run_tcp_transfer(client_station, server_ip, duration=120, stream=False,
+                     on_sample=None, stall_bps=None):
     """Run TCP transfer test for specified duration"""
     
     info(f"*** Running TCP transfer for {duration} seconds\n")
     
+    # Streaming mode ingests each 1 s interval as it arrives into a
+    # bounded buffer and can abort early when the flow stalls
+    if stream:
+        return stream_iperf(client_station, server_ip, 5001, duration,
+                            on_sample=on_sample, stall_bps=stall_bps)
+    
     # Run iperf3 client for 120 seconds with JSON output
     client_cmd = f"iperf3 -c {server_ip} -p 5001 -t {duration} -J"
     result = client_station.cmd(client_cmd)
     
     return result
 
+@profiled()
+def run_multi_flow_transfer(net, pairs, duration=30, protocol='tcp',
+                            parallel=1, stagger=0.0, store=None):
+    """Run concurrent iperf3 flows between (client, server) station names"""
+    
+    info(f"*** Running {len(pairs)} concurrent {protocol.upper()} flows\n")
+    
+    orchestrator = TrafficOrchestrator()
+    for i, (client_name, server_name) in enumerate(pairs):
+        orchestrator.add_flow(net.get(client_name), net.get(server_name),
+                              protocol=protocol, parallel=parallel,
+                              start=i * stagger, duration=duration)
+    try:
+        flows = orchestrator.run()
+    finally:
+        orchestrator.stop_servers()
+    if store is not None:
+        for flow in flows:
+            if isinstance(flow.result, dict):
+                record_iperf(store, flow.result, flow.name)
+    
+    return analyze_tcp_results(flows)
+
 def analyze_tcp_results(iperf_result):
     """Analyze TCP transfer results and extract throughput"""
     
     import json
     
+    # Several flows: aggregate per-flow and network-wide goodput,
+    # fairness and loss
+    if isinstance(iperf_result, list):
+        return aggregate_flows({flow.name: flow.result
+                                for flow in iperf_result})
+    
     try:
-        # Parse JSON output from iperf3
-        data = json.loads(iperf_result)
+        # Parse JSON output from iperf3 (or an already decoded document,
+        # e.g. IperfStream.document())
+        if isinstance(iperf_result, dict):
+            data = iperf_result
+        else:
+            data = json.loads(iperf_result)
         
         # Extract throughput information
-        sent_bps = data['end']['sum_sent']['bits_per_second']
-        received_bps = data['end']['sum_received']['bits_per_second']
-        
-        # Convert to Mbps
-        sent_mbps = sent_bps / 1000000
-        received_mbps = received_bps / 1000000
-        
-        # Calculate success rate
-        sent_bytes = data['end']['sum_sent']['bytes']
-        received_bytes = data['end']['sum_received']['bytes']  
-        success_rate = (received_bytes / sent_bytes) * 100 if sent_bytes > 0 else 0
-        
-        results = {
-            'sent_mbps': sent_mbps,
-            'received_mbps': received_mbps,
-            'success_rate': success_rate,
-            'duration': data['end']['sum_sent']['seconds']
-        }
+        summary = summarize_flow(data)
+        results = {key: summary[key] for key in
+                   ('sent_mbps', 'received_mbps', 'success_rate', 'duration')}
         
         return results
         
-    except (json.JSONDecodeError, KeyError) as e:
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
         print(f"Error parsing iperf3 results: {e}")
         return None
 
+@profiled()
 def check_routing_tables(net):
     """Check OLSR routing tables on all stations"""
     
     info("*** Checking OLSR routing tables\n")
     
-    stations = ['adhoc1', 'adhoc2', 'adhoc3']
+    stations = list(net.stations)
     routing_info = {}
     
-    for station_name in stations:
-        station = net.get(station_name)
-        
-        # Check routing table
-        route_result = station.cmd('route -n')
-        
-        # Check OLSR-specific routes
-        olsr_result = station.cmd('echo "/routes" | nc 127.0.0.1 2006 2>/dev/null || echo "OLSR info not available"')
+    # Query every node's kernel table and txtinfo plugin concurrently
+    with TxtinfoClient(stations) as client:
+        route_results = client.run('route -n')
+        graph = client.snapshot()
+    
+    for station in stations:
+        olsr_routes = graph.routes.get(station.name, {})
         
-        routing_info[station_name] = {
-            'routing_table': route_result,
-            'olsr_routes': olsr_result
+        routing_info[station.name] = {
+            'routing_table': route_results[station.name],
+            'olsr_routes': olsr_routes
         }
         
-        print(f"\n{station_name.upper()} Routing Information:")
+        print(f"\n{station.name.upper()} Routing Information:")
         print("System Routing Table:")
-        print(route_result)
+        print(route_results[station.name])
         print("OLSR Routes:")
-        print(olsr_result)
+        if not olsr_routes:
+            print("OLSR info not available")
+        for destination, (gateway, metric, etx, interface) in sorted(olsr_routes.items()):
+            print(f"{destination:<20} via {gateway:<16} metric {metric:g} "
+                  f"ETX {etx:.3f} dev {interface}")
         print("-" * 80)
     
+    routing_info['graph'] = graph
+    
     return routing_info
 
-def capture_network_traffic(interface, duration=130, filename="adhoc_traffic.pcap"):
-    """Capture network traffic using tcpdump for Wireshark analysis"""
+@profiled()
+def track_route_churn(net, duration=60, interval=1.0, store=None):
+    """Record routing changes (not full tables) while the network runs"""
     
-    info(f"*** Starting traffic capture on {interface}\n")
+    info(f"*** Tracking OLSR route churn for {duration} seconds\n")
     
-    # Start tcpdump in background
-    capture_cmd = f"tcpdump -i {interface} -w {filename} &"
-    subprocess.Popen(capture_cmd, shell=True)
+    stations = list(net.stations)
+    churn = []
     
-    return filename
+    with TxtinfoClient(stations, clock=clock_for(net)) as client:
+        polls = max(1, int(duration / interval))
+        for graph, changes in client.sample(interval, count=polls):
+            churn.append((graph.timestamp, changes))
+    if store is not None:
+        record_route_changes(store, churn)
+    
+    return churn
+
+def capture_network_traffic(interface, duration=130, filename="adhoc_traffic.pcap",
+                            node=None, ring_files=None, file_size_mb=None):
+    """Capture network traffic using tcpdump for Wireshark analysis"""
+    
+    # Keep a handle on our own tcpdump (run inside the node's namespace
+    # when one is given) and analyse the pcap while it is being written
+    capture = TrafficCapture(interface, filename, node=node,
+                             ring_files=ring_files, file_size_mb=file_size_mb)
+    capture.start()
+    analysis = LiveAnalysis(capture).start()
+    
+    return capture, analysis
 
 def main():
     """Main function for Task 2 Ad-Hoc network implementation"""
     
+    # WIFI_PROFILE=<prefix> writes <prefix>.json and <prefix>.trace.json
+    profiler, profile_prefix = enable_from_env()
+    
+    # WIFI_RESULTS=<dir> stores the run's manifest and measurements
+    scenario = sys.argv[1] if len(sys.argv) > 1 else None
+    store = open_from_env({'task': 2, 'scenario': scenario, 'adhoc': ADHOC_LINK,
+                           'path_loss_exp': PATH_LOSS_EXP,
+                           'backend': 'simulated' if getattr(Mininet_wifi, 'simulated', False)
+                           else 'emulation'})
+    status = 'failed'
+    
     try:
         # Create ad-hoc network
-        net = create_adhoc_network()
+        # Optional scenario file, e.g. scenarios/task2.yaml
+        with timed(store, 'create_network'):
+            net = create_adhoc_network(scenario)
         
         print("Ad-Hoc network created successfully!")
         input("Press Enter to configure OLSR routing...")
         
         # Configure OLSR protocol
-        configure_olsr(net)
-        
-        print("OLSR configured and converged!")
+        olsr_metrics = configure_olsr(net)
+        if store is not None:
+            store.timing('olsr_startup', olsr_metrics['startup_time'])
+            store.timing('olsr_convergence', olsr_metrics['convergence_time'])
+        
+        if olsr_metrics['converged']:
+            print(f"OLSR configured and converged in "
+                  f"{olsr_metrics['convergence_time']:.1f}s!")
+        else:
+            print("OLSR configured but routes did not converge before the timeout")
         input("Press Enter to test ICMP connectivity...")
         
         # Test ICMP connectivity
-        icmp_results = test_icmp_connectivity(net)
+        icmp_results = test_icmp_connectivity(net, store=store)
         
         input("Press Enter to setup TCP transfer...")
         
         # Setup TCP transfer
         client, server = setup_tcp_transfer(net)
-        server_ip = "192.168.2.2"
+        server_ip = server.IP()
         
         # Start traffic capture for Wireshark analysis
-        capture_file = capture_network_traffic("adhoc1-wlan0")
+        capture, analysis = capture_network_traffic(f"{client.name}-wlan0", node=client)
+        capture_file = capture.filename
         
         print("Starting 120-second TCP transfer...")
         print("Traffic capture started - this will be used for Wireshark analysis")
         
-        # Run TCP transfer for 120 seconds
-        tcp_result = run_tcp_transfer(client, server_ip, 120)
+        # Run TCP transfer for 120 seconds, reporting each interval live
+        def show_interval(sample):
+            print(f"  {sample['start']:6.1f}-{sample['end']:6.1f}s "
+                  f"{sample['bits_per_second'] / 1e6:8.2f} Mbps "
+                  f"retr={sample['retransmits']} cwnd={sample['snd_cwnd']}")
+        
+        if store is not None:
+            show_interval = interval_recorder(store, f'{client.name}_to_{server.name}',
+                                              show_interval)
+        with timed(store, 'tcp_transfer'):
+            tcp_stream = run_tcp_transfer(client, server_ip, 120, stream=True,
+                                          on_sample=show_interval)
+        tcp_result = tcp_stream.document()
         
-        # Stop traffic capture
-        subprocess.run("pkill tcpdump", shell=True)
+        # Stop our traffic capture and finish the live analysis
+        capture.stop()
+        traffic_summary = analysis.stop()
         
         print(f"TCP transfer completed!")
         print(f"Traffic capture saved to: {capture_file}")
+        print(f"Captured {traffic_summary['packets']} packets, "
+              f"OLSR overhead {traffic_summary['olsr_overhead_percent']:.2f}%")
+        for flow_name, flow in traffic_summary['flows'].items():
+            if flow['retransmits'] or flow['throughput_mbps'] > 0.01:
+                print(f"  {flow_name}: {flow['throughput_mbps']:.2f} Mbps, "
+                      f"{flow['retransmits']} retransmissions")
         
         # Analyze TCP results
         tcp_analysis = analyze_tcp_results(tcp_result)
@@ -347,6 +487,9 @@ def main():
         
         # Check routing information
         routing_info = check_routing_tables(net)
+        if store is not None:
+            record_routes(store, routing_info['graph'])
+        status = 'complete'
         
         print("\n*** Task 2 Implementation Completed Successfully! ***")
         print("\nDeliverables collected:")
@@ -369,8 +512,15 @@ def main():
         if 'net' in locals():
             info("*** Stopping network\n")
             # Kill OLSR processes
-            subprocess.run("pkill olsrd", shell=True)
+            if not getattr(net, 'simulated', False):
+                subprocess.run("pkill olsrd", shell=True)
             net.stop()
+        if store is not None:
+            store.close(status)
+        if profiler is not None:
+            print(format_summary(profiler.summary()))
+            json_path, trace_path = profiler.save(profile_prefix)
+            print(f"Profile written to {json_path} and {trace_path}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Continuous association sampling with array-backed ring buffers"""
+
+import threading
+
+import numpy as np
+
+from executor import BatchExecutor
+from scheduler import EventScheduler
+
+NOT_CONNECTED = 0
+
+# (connected, signal, tx bitrate, number characters, MAC separator) per input type
+_TOKENS = {
+    str: ('Connected to ', 'signal: ', 'tx bitrate: ', '-+.0123456789', ':'),
+    bytes: (b'Connected to ', b'signal: ', b'tx bitrate: ', b'-+.0123456789', b':'),
+}
+
+
+def mac_to_int(mac):
+    """'02:00:00:00:01:00' -> 48-bit integer (0 means not connected)"""
+    return int(mac.replace(':', ''), 16)
+
+
+def int_to_mac(value):
+    text = f'{int(value):012x}'
+    return ':'.join(text[i:i + 2] for i in range(0, 12, 2))
+
+
+def _number_after(data, token, digits, start=0):
+    """Float following `token` in data, or NaN"""
+    pos = data.find(token, start)
+    if pos < 0:
+        return float('nan')
+    pos += len(token)
+    end = pos
+    while end < len(data) and data[end] in digits:
+        end += 1
+    try:
+        return float(data[pos:end])
+    except ValueError:
+        return float('nan')
+
+
+def parse_iw_link(data):
+    """Parse `iw dev <intf> link` output into (bssid, signal dBm, tx Mbit/s)
+
+    Accepts str (as node.cmd() returns it) or bytes and scans either
+    with find() for the three fields it needs, without splitting lines.
+    bssid is an integer (NOT_CONNECTED when unassociated); a missing
+    signal or bitrate is NaN.
+    """
+    connected, signal, bitrate, digits, colon = _TOKENS[str if isinstance(data, str) else bytes]
+    pos = data.find(connected)
+    if pos < 0:
+        return NOT_CONNECTED, float('nan'), float('nan')
+    pos += len(connected)
+    bssid = int(data[pos:pos + 17].replace(colon, colon[:0]), 16)
+    return (bssid, _number_after(data, signal, digits, pos),
+            _number_after(data, bitrate, digits, pos))
+
+
+class AssociationHistory:
+    """Fixed-size history of association samples for many stations
+
+    Samples are stored in (stations, capacity) arrays that wrap around,
+    so memory is constant whatever the sampling rate or run length.
+    """
+
+    def __init__(self, names, capacity=1024):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.capacity = capacity
+        shape = (len(self.names), capacity)
+        self.times = np.zeros(capacity)
+        self.bssid = np.zeros(shape, dtype=np.uint64)
+        self.signal = np.full(shape, np.nan, dtype=np.float32)
+        self.tx_bitrate = np.full(shape, np.nan, dtype=np.float32)
+        self._next = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def record(self, t, bssids, signals, bitrates):
+        """Store one sample column for every station at time t"""
+        slot = self._next
+        self.times[slot] = t
+        self.bssid[:, slot] = bssids
+        self.signal[:, slot] = signals
+        self.tx_bitrate[:, slot] = bitrates
+        self._next = (slot + 1) % self.capacity
+        self.total += 1
+
+    def _order(self):
+        if self.total < self.capacity:
+            return np.arange(self._next)
+        return (np.arange(self.capacity) + self._next) % self.capacity
+
+    def series(self, name):
+        """(times, bssid, signal, tx_bitrate) for one station, oldest first"""
+        order = self._order()
+        row = self.index[name]
+        return (self.times[order], self.bssid[row, order],
+                self.signal[row, order], self.tx_bitrate[row, order])
+
+    def handovers(self, bssid_names=None):
+        """Every change of serving BSSID, in time order
+
+        Returns (time, station, old, new) tuples; old/new are AP names when
+        `bssid_names` maps MAC strings to names, else MAC strings, and None
+        for "not connected".
+        """
+        order = self._order()
+        if len(order) < 2:
+            return []
+        bssid = self.bssid[:, order]
+        times = self.times[order]
+        lookup = {mac_to_int(mac): name for mac, name in (bssid_names or {}).items()}
+
+        def label(value):
+            if value == NOT_CONNECTED:
+                return None
+            return lookup.get(int(value), int_to_mac(value))
+
+        rows, cols = np.nonzero(bssid[:, 1:] != bssid[:, :-1])
+        events = [(float(times[c + 1]), self.names[r], label(bssid[r, c]),
+                   label(bssid[r, c + 1])) for r, c in zip(rows, cols)]
+        return sorted(events)
+
+    def latest(self):
+        """{station: (bssid mac or None, signal, tx bitrate)} of the last sample"""
+        if not self.total:
+            return {}
+        slot = (self._next - 1) % self.capacity
+        return {name: (int_to_mac(self.bssid[i, slot]) if self.bssid[i, slot] else None,
+                       float(self.signal[i, slot]), float(self.tx_bitrate[i, slot]))
+                for i, name in enumerate(self.names)}
+
+
+class AssociationSampler:
+    """Poll `iw dev <sta>-wlan0 link` on every station at a fixed rate
+
+    Each poll is one concurrent batch across all stations. The sampler
+    can run in its own thread (start/stop) or as periodic events on an
+    existing EventScheduler timeline (schedule).
+    """
+
+    def __init__(self, stations, rate=10.0, capacity=1024, workers=64,
+                 interface='{name}-wlan0'):
+        self.stations = list(stations)
+        self.rate = float(rate)
+        self.history = AssociationHistory([s.name for s in self.stations], capacity)
+        self._query = {station: f"iw dev {interface.format(name=station.name)} link"
+                       for station in self.stations}
+        self._executor = BatchExecutor(workers=max(1, min(workers, len(self.stations))))
+        self._scheduler = None
+        self._thread = None
+        self._timeline = None
+        self._event = None
+
+    def poll(self, t):
+        """Sample every station once and record the result at time t"""
+        outputs = self._executor.outputs(self._query)
+        parsed = [parse_iw_link(outputs[station.name]) for station in self.stations]
+        bssids, signals, bitrates = zip(*parsed) if parsed else ((), (), ())
+        self.history.record(t, bssids, signals, bitrates)
+
+    def schedule(self, scheduler, start=None, until=None):
+        """Add periodic polls to an EventScheduler timeline"""
+        self._event = scheduler.every(1.0 / self.rate,
+                                      lambda: self.poll(scheduler.now()),
+                                      start=start, until=until,
+                                      name='association-poll')
+        self._timeline = scheduler
+
+    def start(self, clock=None):
+        """Poll in a background thread until stop()"""
+        self._scheduler = EventScheduler(clock)
+        self.schedule(self._scheduler)
+        self._thread = threading.Thread(target=self._scheduler.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Cancel pending polls, stop the thread and release the workers"""
+        if self._event is not None:
+            self._timeline.cancel(self._event)
+        if self._scheduler is not None:
+            self._scheduler.stop()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.close()
+        return self.history
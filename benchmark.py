@@ -0,0 +1,319 @@
+"""Scaling benchmarks for network build, mobility and measurement paths
+
+Scaled copies of the Task 1 infrastructure scenario (APs on a wired
+chain, roaming stations) and the Task 2 ad-hoc scenario (an OLSR mesh)
+are generated at each requested size with the same node density as the
+originals. Each phase is timed on the chosen backend, and the median
+over the repeats is compared against a stored baseline:
+
+    build          create nodes and links, configureWifiNodes, build, start
+    mobility       one MobilityEngine moving every station (Task 1)
+    association    one `iw dev ... link` poll of every station (Task 1)
+    olsr           start olsrd everywhere and wait for convergence (Task 2)
+    probe          batched ping of one neighbour per station
+    probe_serial   the same pings one cmd() at a time
+    stop           net.stop()
+
+A phase regresses when it is slower than baseline * (1 + threshold)
+plus a small absolute allowance for timer noise. The simulated backend
+needs neither root nor Mininet-WiFi, so the suite runs on any Linux box.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from association import AssociationSampler
+from connectivity import connectivity_matrix
+from coverage import parse_position
+from mobility import MobilityEngine
+from olsr import start_olsr, wait_for_convergence
+from profiling import Profiler
+from scenario import Scenario
+from scheduler import EventScheduler, clock_for
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use without Mininet
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+SIZES = (10, 100, 500)
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Regression threshold: relative slowdown plus an absolute floor in seconds
+THRESHOLD = 0.5
+NOISE_FLOOR = 0.02
+
+# Minimal olsrd configuration with the txtinfo plugin wait_for_convergence reads
+OLSR_CONFIG = """DebugLevel 0
+IpVersion 4
+AllowNoInt yes
+LoadPlugin "olsrd_txtinfo.so.1.1"
+{
+    PlParam "port" "2006"
+    PlParam "Accept" "127.0.0.1"
+}
+Interface "{interface}"
+{
+    HelloInterval 2.0
+    TcInterval 5.0
+}
+"""
+
+
+def _grid(count):
+    """(rows, cols) of the most square grid with at least `count` cells"""
+    cols = math.ceil(math.sqrt(count))
+    return math.ceil(count / cols), cols
+
+
+def infrastructure_scenario(stations, seed=1):
+    """Task 1 scaled to `stations`: area and AP count grow with the station count
+
+    Task 1 has 3 stations and 4 APs on 50 x 30 m; the scaled layout keeps
+    that station density, puts one AP per 5 stations (at least 4) on a
+    grid chained by wired links, and moves every station across the
+    area between t=10 s and t=20 s.
+    """
+    scale = math.sqrt(stations / 3)
+    width, height = 50 * scale, 30 * scale
+    rows, cols = _grid(max(4, stations // 5))
+    spacing = [width / cols, height / rows]
+    aps = [f'ap{i}' for i in range(1, rows * cols + 1)]
+    data = {
+        'network': {'controller': True, 'wmediumd': 'interference',
+                    'noise_th': -70, 'fading_cof': 3},
+        'propagation': {'model': 'logDistance', 'exp': 3},
+        'addressing': {'network': '10.0.0.0/16'},
+        'defaults': {'ap': {'ssid': 'cafeteria-wifi', 'mode': 'g', 'channel': '35',
+                            'range': 35}},
+        'aps': [{'generate': 'grid', 'prefix': 'ap', 'rows': rows, 'cols': cols,
+                 'spacing': spacing, 'origin': [spacing[0] / 2, spacing[1] / 2, 0]}],
+        'stations': [{'generate': 'random', 'prefix': 'sta', 'count': stations,
+                      'box': [[0, 0, 0], [width, height, 0]], 'seed': seed}],
+        'links': [{'chain': aps, 'cls': 'wired'}],
+    }
+    scenario = Scenario(data, f'task1-{stations}')
+    ends = np.random.default_rng(seed + 1).uniform([0, 0, 0], [width, height, 0],
+                                                    size=(stations, 3))
+    data['mobility'] = [{'name': spec['name'], 'start': list(parse_position(spec['position'])),
+                         'end': end.tolist(), 'start_time': 10, 'end_time': 20,
+                         'min_v': 0.1, 'max_v': 100}
+                        for spec, end in zip((spec for spec in scenario.nodes
+                                              if spec['kind'] == 'station'), ends)]
+    return Scenario(data, f'task1-{stations}')
+
+
+def adhoc_scenario(stations):
+    """Task 2 scaled to `stations`: a connected grid of ad-hoc nodes 15 m apart
+
+    Hidden-node interference adds up over the whole grid, so the spacing
+    is tight enough that every link keeps an ETX path at 500 nodes.
+    """
+    rows, cols = _grid(stations)
+    data = {
+        'network': {'wmediumd': 'interference'},
+        'propagation': {'model': 'logDistance', 'exp': 2.5},
+        'addressing': {'network': '10.0.0.0/16'},
+        'defaults': {'station': {'range': 30}},
+        'stations': [{'generate': 'grid', 'prefix': 'adhoc', 'rows': rows, 'cols': cols,
+                      'spacing': [15, 15], 'origin': [10, 10, 1]}],
+        'links': [{'mesh': 'stations', 'cls': 'adhoc', 'ssid': 'adhocUH', 'mode': 'g',
+                   'channel': 6}],
+    }
+    scenario = Scenario(data, f'task2-{stations}')
+    # Trim the last grid row to the exact count
+    data['stations'] = [{'name': spec['name'], 'position': spec['position']}
+                        for spec in scenario.nodes if spec['kind'] == 'station'][:stations]
+    return Scenario(data, f'task2-{stations}')
+
+
+def _phases(profiler):
+    return {name: histogram.total for name, histogram in profiler.histograms.items()}
+
+
+def _probe_pairs(stations):
+    """One probe per station to its successor, so the work grows linearly"""
+    names = [station.name for station in stations]
+    return list(zip(names, names[1:] + names[:1]))
+
+
+def _probe_serial(stations, pairs):
+    nodes = {station.name: station for station in stations}
+    for src, dst in pairs:
+        nodes[src].cmd(f'ping -c 1 -W 1 {nodes[dst].IP()}')
+
+
+def bench_infrastructure(stations, simulated=True):
+    """{phase: seconds} for one run of the scaled Task 1 scenario"""
+    scenario = infrastructure_scenario(stations)
+    profiler = Profiler()
+    with profiler.phase('build'):
+        net = scenario.build(simulated=simulated)
+    try:
+        nodes = [net.get(name) for name in scenario.names('station')]
+        engine = MobilityEngine(rate=1.0)
+        for spec in scenario.mobility:
+            engine.add_trajectory(net.get(spec['name']), spec['start'], spec['end'],
+                                  spec['start_time'], spec['end_time'],
+                                  spec['min_v'], spec['max_v'])
+        scheduler = EventScheduler(clock_for(net))
+        with profiler.phase('mobility'):
+            engine.schedule(scheduler)
+            scheduler.run()
+        sampler = AssociationSampler(nodes)
+        with profiler.phase('association'):
+            sampler.poll(0.0)
+        sampler.stop()
+        pairs = _probe_pairs(nodes)
+        with profiler.phase('probe'):
+            connectivity_matrix(nodes, pairs, count=1)
+        with profiler.phase('probe_serial'):
+            _probe_serial(nodes, pairs)
+    finally:
+        with profiler.phase('stop'):
+            net.stop()
+    return _phases(profiler)
+
+
+def bench_adhoc(stations, simulated=True, convergence_timeout=120):
+    """{phase: seconds} for one run of the scaled Task 2 scenario"""
+    scenario = adhoc_scenario(stations)
+    profiler = Profiler()
+    with profiler.phase('build'):
+        net = scenario.build(simulated=simulated)
+    try:
+        nodes = [net.get(name) for name in scenario.names('station')]
+        config_files = {}
+        for node in nodes:
+            config_files[node.name] = f'/tmp/olsrd_bench_{node.name}.conf'
+            with open(config_files[node.name], 'w') as handle:
+                handle.write(OLSR_CONFIG.replace('{interface}', f'{node.name}-wlan0'))
+        with profiler.phase('olsr'):
+            start_olsr(nodes, config_files)
+            metrics = wait_for_convergence(nodes, timeout=convergence_timeout,
+                                           clock=clock_for(net))
+        if not metrics['converged']:
+            info(f"*** OLSR did not converge on {stations} stations\n")
+        pairs = _probe_pairs(nodes)
+        with profiler.phase('probe'):
+            connectivity_matrix(nodes, pairs, count=1)
+        with profiler.phase('probe_serial'):
+            _probe_serial(nodes, pairs)
+    finally:
+        for node in nodes:
+            node.cmd('pkill -x olsrd')
+        with profiler.phase('stop'):
+            net.stop()
+    return _phases(profiler)
+
+
+SUITES = {'task1': bench_infrastructure, 'task2': bench_adhoc}
+
+
+def run_suite(sizes=SIZES, suites=tuple(SUITES), simulated=True, repeat=3):
+    """{'task1/100/build': median seconds, ...} over `repeat` runs per size"""
+    results = {}
+    for suite in suites:
+        for size in sizes:
+            runs = []
+            for _ in range(repeat):
+                runs.append(SUITES[suite](size, simulated=simulated))
+                if not simulated:
+                    from mininet.clean import cleanup
+                    cleanup()
+            for phase in runs[0]:
+                results[f'{suite}/{size}/{phase}'] = statistics.median(
+                    run[phase] for run in runs)
+            info(f"*** {suite} at {size} stations: "
+                 + ', '.join(f"{phase} {results[f'{suite}/{size}/{phase}'] * 1e3:.1f} ms"
+                             for phase in runs[0]) + '\n')
+    return results
+
+
+def baseline_path(backend):
+    return os.path.join(BASELINE_DIR, f'{backend}.json')
+
+
+def load_baseline(backend):
+    try:
+        with open(baseline_path(backend)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(backend, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    document = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'backend': backend,
+                'threshold': THRESHOLD, 'noise_floor': NOISE_FLOOR, 'phases': results}
+    with open(baseline_path(backend), 'w') as handle:
+        json.dump(document, handle, indent=1, sort_keys=True)
+        handle.write('\n')
+    return baseline_path(backend)
+
+
+def compare(results, baseline, threshold=None, noise_floor=None):
+    """[(key, baseline s, current s)] of every phase slower than allowed"""
+    threshold = baseline.get('threshold', THRESHOLD) if threshold is None else threshold
+    noise_floor = baseline.get('noise_floor', NOISE_FLOOR) if noise_floor is None else noise_floor
+    regressions = []
+    for key, seconds in sorted(results.items()):
+        reference = baseline['phases'].get(key)
+        if reference is not None and seconds > reference * (1 + threshold) + noise_floor:
+            regressions.append((key, reference, seconds))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    """Plain-text table of phase timings, with the baseline when given"""
+    lines = [f"{'suite/size/phase':<28} {'ms':>10} {'baseline':>10} {'change':>8}"]
+    for key, seconds in results.items():
+        reference = (baseline or {}).get('phases', {}).get(key)
+        if reference:
+            lines.append(f"{key:<28} {seconds * 1e3:10.1f} {reference * 1e3:10.1f} "
+                         f"{(seconds / reference - 1) * 100:+7.0f}%")
+        else:
+            lines.append(f"{key:<28} {seconds * 1e3:10.1f} {'-':>10} {'-':>8}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling benchmarks with regression check')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--suites', nargs='+', choices=sorted(SUITES), default=sorted(SUITES))
+    parser.add_argument('--backend', choices=('simulated', 'emulation'), default='simulated')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float,
+                        help=f'allowed relative slowdown (default: baseline\'s, {THRESHOLD})')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.suites, args.backend == 'simulated', args.repeat)
+    baseline = load_baseline(args.backend)
+    print(format_results(results, baseline))
+    if args.update_baseline:
+        if baseline is not None:
+            # Keep sizes and suites that were not part of this run
+            results = dict(baseline['phases'], **results)
+        print(f"Baseline written to {save_baseline(args.backend, results)}")
+        return 0
+    if baseline is None:
+        print(f"No baseline for '{args.backend}' yet; run with --update-baseline")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for key, reference, seconds in regressions:
+        print(f"REGRESSION {key}: {reference * 1e3:.1f} ms -> {seconds * 1e3:.1f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Packet capture with a tracked tcpdump process and streaming pcap analysis"""
+
+import glob
+import os
+import re
+import struct
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use on recorded pcaps
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+OLSR_PORT = 698
+
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+# Inter-arrival histogram bins: 1 us .. 10 s, log spaced, plus overflow
+IAT_BINS = np.concatenate(([0.0], np.logspace(-6, 1, 29)))
+
+
+class TrafficCapture:
+    """tcpdump run with a process handle we own
+
+    Packets are captured whole; pass `snaplen` (e.g. 128) to keep only
+    the headers. With `ring_files` and `file_size_mb` tcpdump rotates
+    through a fixed set of files (-W/-C) so disk use stays bounded on long
+    captures; `file_size_mb` alone starts a new numbered file each time
+    the current one fills. stop() terminates only this process, not every
+    tcpdump on the host.
+    """
+
+    def __init__(self, interface, filename='adhoc_traffic.pcap', node=None,
+                 ring_files=None, file_size_mb=None, snaplen=None):
+        self.interface = interface
+        self.filename = filename
+        self.node = node
+        self.ring_files = ring_files
+        self.file_size_mb = file_size_mb
+        self.snaplen = snaplen
+        self.process = None
+
+    def command(self):
+        # -U flushes every packet so the streaming reader sees it at once
+        cmd = ['tcpdump', '-i', self.interface, '-U', '-w', self.filename]
+        if self.snaplen:
+            cmd += ['-s', str(self.snaplen)]
+        if self.file_size_mb:
+            cmd += ['-C', str(self.file_size_mb)]
+        if self.ring_files:
+            cmd += ['-W', str(self.ring_files)]
+        return cmd
+
+    def files(self):
+        """Capture files in the order tcpdump writes them
+
+        A ring is its fixed set of files; with -C alone tcpdump writes
+        file, file1, file2, ... so those that exist so far are globbed.
+        """
+        if self.ring_files and self.file_size_mb:
+            width = len(str(self.ring_files - 1))
+            return [f'{self.filename}{i:0{width}d}' for i in range(self.ring_files)]
+        if not self.file_size_mb:
+            return [self.filename]
+        pattern = re.compile(re.escape(os.path.basename(self.filename)) + r'(\d+)$')
+        rotated = []
+        for path in glob.glob(glob.escape(self.filename) + '[0-9]*'):
+            match = pattern.match(os.path.basename(path))
+            if match:
+                rotated.append((int(match.group(1)), path))
+        return [self.filename] + [path for _, path in sorted(rotated)]
+
+    def following(self, path):
+        """File tcpdump moves on to after `path`, or None if it never rotates"""
+        if not self.file_size_mb:
+            return None
+        if self.ring_files:
+            files = self.files()
+            return files[(files.index(path) + 1) % len(files)]
+        count = 0 if path == self.filename else int(path[len(self.filename):])
+        return f'{self.filename}{count + 1}'
+
+    def start(self):
+        info(f"*** Starting traffic capture on {self.interface}\n")
+        popen = self.node.popen if self.node is not None else subprocess.Popen
+        self.process = popen(self.command(), stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL)
+        return self
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self, timeout=5):
+        """Terminate our tcpdump and wait for it to flush its files"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        info(f"*** Traffic capture on {self.interface} stopped\n")
+
+
+class PcapStream:
+    """Incremental reader for a pcap file that may still be growing
+
+    read() returns the packets appended since the previous call and
+    leaves any partially written record for the next call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._endian = '<'
+        self._scale = 1e-6
+        self.linktype = None
+
+    def _open(self):
+        if self._file is None:
+            try:
+                handle = open(self.path, 'rb')
+            except FileNotFoundError:
+                return False
+            header = handle.read(24)
+            if len(header) < 24:
+                handle.close()
+                return False
+            if header[:4] not in PCAP_MAGIC:
+                handle.close()
+                raise ValueError(f"{self.path} is not a pcap file")
+            self._endian, self._scale = PCAP_MAGIC[header[:4]]
+            self.linktype = struct.unpack(self._endian + 'I', header[20:24])[0]
+            self._file = handle
+        return True
+
+    def read(self, limit=None):
+        """Yield (timestamp, original length, data) for new packets"""
+        if not self._open():
+            return
+        record = struct.Struct(self._endian + 'IIII')
+        count = 0
+        while limit is None or count < limit:
+            count += 1
+            position = self._file.tell()
+            head = self._file.read(16)
+            if len(head) < 16:
+                self._file.seek(position)
+                return
+            seconds, fraction, caplen, length = record.unpack(head)
+            data = self._file.read(caplen)
+            if len(data) < caplen:
+                self._file.seek(position)
+                return
+            yield seconds + fraction * self._scale, length, data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def parse_packet(data, linktype):
+    """Extract (proto, src, dst, sport, dport, tcp seq, payload len, flags)
+
+    Returns None for anything that is not IPv4.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        ethertype = struct.unpack('!H', data[12:14])[0]
+        offset = 14
+        if ethertype == 0x8100 and len(data) >= 18:
+            ethertype = struct.unpack('!H', data[16:18])[0]
+            offset = 18
+        if ethertype != 0x0800:
+            return None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16 or struct.unpack('!H', data[14:16])[0] != 0x0800:
+            return None
+        offset = 16
+    elif linktype == LINKTYPE_RAW:
+        offset = 0
+    else:
+        return None
+    ip = data[offset:offset + 20]
+    if len(ip) < 20 or ip[0] >> 4 != 4:
+        return None
+    header_len = (ip[0] & 0x0F) * 4
+    total_len = struct.unpack('!H', ip[2:4])[0]
+    proto = ip[9]
+    src = '.'.join(str(b) for b in ip[12:16])
+    dst = '.'.join(str(b) for b in ip[16:20])
+    transport = data[offset + header_len:]
+    sport = dport = seq = flags = 0
+    payload = max(total_len - header_len, 0)
+    if proto == 6 and len(transport) >= 14:
+        sport, dport, seq = struct.unpack('!HHI', transport[:8])
+        data_offset = (transport[12] >> 4) * 4
+        flags = transport[13]
+        payload = max(total_len - header_len - data_offset, 0)
+    elif proto == 17 and len(transport) >= 4:
+        sport, dport = struct.unpack('!HH', transport[:4])
+        payload = max(total_len - header_len - 8, 0)
+    return proto, src, dst, sport, dport, seq, payload, flags
+
+
+class FlowStats:
+    """Constant-size running statistics for one 5-tuple"""
+
+    __slots__ = ('packets', 'bytes', 'first', 'last', 'retransmits',
+                 'next_seq', 'iat_histogram')
+
+    def __init__(self, timestamp):
+        self.packets = 0
+        self.bytes = 0
+        self.first = self.last = timestamp
+        self.retransmits = 0
+        self.next_seq = None
+        self.iat_histogram = np.zeros(len(IAT_BINS), dtype=np.int64)
+
+    @property
+    def throughput_bps(self):
+        span = self.last - self.first
+        return 8 * self.bytes / span if span > 0 else 0.0
+
+
+class FlowAnalyzer:
+    """Fold packets into per-flow statistics as they are read
+
+    Memory grows with the number of distinct flows only, never with the
+    number of packets, so a long capture can be analysed while it runs.
+    """
+
+    def __init__(self):
+        self.flows = {}
+        self.packets = 0
+        self.bytes = 0
+        self.olsr_packets = 0
+        self.olsr_bytes = 0
+        self.iat_histogram = np.zeros(len(IAT_BINS), dtype=np.int64)
+        self._last = None
+
+    def add(self, timestamp, length, data, linktype):
+        self.packets += 1
+        self.bytes += length
+        if self._last is not None:
+            self.iat_histogram[_iat_bin(timestamp - self._last)] += 1
+        self._last = timestamp
+        parsed = parse_packet(data, linktype)
+        if parsed is None:
+            return
+        proto, src, dst, sport, dport, seq, payload, flags = parsed
+        if proto == 17 and OLSR_PORT in (sport, dport):
+            self.olsr_packets += 1
+            self.olsr_bytes += length
+        key = (proto, src, sport, dst, dport)
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = FlowStats(timestamp)
+        else:
+            flow.iat_histogram[_iat_bin(timestamp - flow.last)] += 1
+        flow.packets += 1
+        flow.bytes += length
+        flow.last = timestamp
+        if proto == 6 and payload > 0:
+            end = (seq + payload) & 0xFFFFFFFF
+            if flow.next_seq is None:
+                flow.next_seq = end
+            else:
+                # A data segment ending at or before the highest byte
+                # already seen is a retransmission (seq wraps at 2**32)
+                ahead = (end - flow.next_seq) & 0xFFFFFFFF
+                if ahead == 0 or ahead >= 0x80000000:
+                    flow.retransmits += 1
+                else:
+                    flow.next_seq = end
+
+    def consume(self, stream):
+        """Fold every packet currently readable from a PcapStream"""
+        count = 0
+        for timestamp, length, data in stream.read():
+            self.add(timestamp, length, data, stream.linktype)
+            count += 1
+        return count
+
+    def summary(self):
+        """Per-flow throughput/retransmissions plus OLSR overhead"""
+        flows = {}
+        for (proto, src, sport, dst, dport), flow in self.flows.items():
+            name = f"{'tcp' if proto == 6 else 'udp' if proto == 17 else proto}" \
+                   f" {src}:{sport} -> {dst}:{dport}"
+            flows[name] = {
+                'packets': flow.packets,
+                'bytes': flow.bytes,
+                'throughput_mbps': flow.throughput_bps / 1e6,
+                'retransmits': flow.retransmits,
+                'iat_histogram': flow.iat_histogram.tolist(),
+            }
+        return {
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'olsr_packets': self.olsr_packets,
+            'olsr_bytes': self.olsr_bytes,
+            'olsr_overhead_percent': 100.0 * self.olsr_bytes / self.bytes if self.bytes else 0.0,
+            'iat_bins': IAT_BINS.tolist(),
+            'iat_histogram': self.iat_histogram.tolist(),
+            'flows': flows,
+        }
+
+
+def _iat_bin(delta):
+    return min(int(np.searchsorted(IAT_BINS, delta, side='right')) - 1,
+               len(IAT_BINS) - 1)
+
+
+class LiveAnalysis:
+    """Follow a running TrafficCapture and analyse packets as they land
+
+    Moves on to the next file when tcpdump rotates. Call stop()
+    after the capture has stopped to drain what is left and join.
+    """
+
+    def __init__(self, capture, analyzer=None, interval=0.5):
+        self.capture = capture
+        self.analyzer = FlowAnalyzer() if analyzer is None else analyzer
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        current = self.capture.files()[0]
+        stream = PcapStream(current)
+        opened = time.time()
+        while True:
+            stopping = self._stop.is_set()
+            self.analyzer.consume(stream)
+            following = self.capture.following(current)
+            if following not in (None, current) and os.path.exists(following) \
+                    and os.path.getmtime(following) >= opened:
+                # tcpdump rotated: drain the current file, then switch
+                self.analyzer.consume(stream)
+                stream.close()
+                current = following
+                stream = PcapStream(following)
+                opened = time.time()
+                continue
+            if stopping:
+                break
+            self._stop.wait(self.interval)
+        stream.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.analyzer.summary()
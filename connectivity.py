@@ -0,0 +1,177 @@
+"""Concurrent all-pairs ping probing with structured results"""
+
+import re
+
+import numpy as np
+
+from executor import BatchExecutor
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub nodes
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+PROBE_MARKER = '@@probe'
+
+_STATS_RE = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received')
+_RTT_RE = re.compile(r'(?:rtt|round-trip) min/avg/max/(?:mdev|stddev) = '
+                     r'([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)')
+
+FIELDS = ('transmitted', 'received', 'loss', 'min', 'avg', 'max', 'mdev')
+
+
+def parse_ping(output):
+    """Parse iputils/busybox ping output into a dict of numbers
+
+    RTT fields are NaN when no reply came back; loss is a percentage.
+    """
+    result = dict.fromkeys(FIELDS, float('nan'))
+    result['transmitted'] = result['received'] = 0
+    stats = _STATS_RE.search(output)
+    if stats:
+        result['transmitted'] = int(stats.group(1))
+        result['received'] = int(stats.group(2))
+    if result['transmitted']:
+        result['loss'] = 100.0 * (1 - result['received'] / result['transmitted'])
+    else:
+        result['loss'] = 100.0
+    rtt = _RTT_RE.search(output)
+    if rtt:
+        for key, value in zip(('min', 'avg', 'max', 'mdev'), rtt.groups()):
+            result[key] = float(value)
+    result['reachable'] = result['received'] > 0
+    return result
+
+
+def probe_command(targets, count=4, timeout=1, interval=None):
+    """Build one shell command that pings every target concurrently
+
+    Each ping writes to its own temp file; only the PIDs we started are
+    waited on so daemons already running in the node shell are left alone.
+    """
+    opts = f'-c {count} -W {timeout}'
+    if interval is not None:
+        opts += f' -i {interval}'
+    parts = ['d=$(mktemp -d)']
+    pids = []
+    for i, target in enumerate(targets):
+        parts.append(f'ping {opts} {target} > $d/{i} 2>&1 & p{i}=$!')
+        pids.append(f'$p{i}')
+    parts.append('wait ' + ' '.join(pids))
+    indexes = ' '.join(str(i) for i in range(len(targets)))
+    parts.append(f'for i in {indexes}; do echo "{PROBE_MARKER} $i"; '
+                 f'cat $d/$i; done')
+    parts.append('rm -rf $d')
+    return '; '.join(parts)
+
+
+def split_probe_output(output, count):
+    """Split the combined output of probe_command into per-target chunks"""
+    chunks = [''] * count
+    current = None
+    lines = []
+    for line in output.splitlines():
+        if line.startswith(PROBE_MARKER):
+            if current is not None:
+                chunks[current] = '\n'.join(lines)
+            current = int(line.split()[1])
+            lines = []
+        elif current is not None:
+            lines.append(line)
+    if current is not None:
+        chunks[current] = '\n'.join(lines)
+    return chunks
+
+
+class ConnectivityMatrix:
+    """Source x destination ping statistics stored as NumPy arrays
+
+    Each field in FIELDS is an (N, N) float array indexed [src, dst];
+    pairs that were not probed (including the diagonal) hold NaN.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        size = len(self.names)
+        self.data = {field: np.full((size, size), np.nan) for field in FIELDS}
+        self.raw = {}
+
+    def __getitem__(self, field):
+        return self.data[field]
+
+    def record(self, src, dst, stats, raw=None):
+        i, j = self.index[src], self.index[dst]
+        for field in FIELDS:
+            self.data[field][i, j] = stats[field]
+        if raw is not None:
+            self.raw[(src, dst)] = raw
+
+    @property
+    def reachable(self):
+        """Boolean matrix of pairs with at least one reply"""
+        return np.nan_to_num(self.data['received']) > 0
+
+    def get(self, src, dst):
+        """Stats dict for one probed pair"""
+        i, j = self.index[src], self.index[dst]
+        stats = {field: float(self.data[field][i, j]) for field in FIELDS}
+        stats['reachable'] = bool(self.reachable[i, j])
+        return stats
+
+    def pairs(self):
+        """Yield (src, dst) for every probed pair"""
+        probed = ~np.isnan(self.data['transmitted'])
+        for i, j in zip(*np.nonzero(probed)):
+            yield self.names[i], self.names[j]
+
+    def as_dict(self):
+        """{'src_to_dst': stats} for every probed pair"""
+        return {f'{src}_to_{dst}': self.get(src, dst)
+                for src, dst in self.pairs()}
+
+    def format(self):
+        """Human-readable table of loss and RTT per pair"""
+        lines = [f"{'pair':<24}{'loss%':>8}{'min':>9}{'avg':>9}"
+                 f"{'max':>9}{'mdev':>9}"]
+        for src, dst in self.pairs():
+            s = self.get(src, dst)
+            lines.append(f"{src + ' -> ' + dst:<24}{s['loss']:>8.1f}"
+                         f"{s['min']:>9.3f}{s['avg']:>9.3f}"
+                         f"{s['max']:>9.3f}{s['mdev']:>9.3f}")
+        return '\n'.join(lines)
+
+
+def connectivity_matrix(stations, pairs=None, count=4, timeout=1,
+                        interval=None, workers=16):
+    """Ping between stations concurrently and return a ConnectivityMatrix
+
+    `stations` is a list of nodes with name, IP() and cmd(). By default
+    every ordered pair is probed; pass `pairs` as (src, dst) names to
+    restrict the set. Sources run in parallel on a pool bounded by
+    `workers`, and each source runs its own probes in parallel.
+    """
+    nodes = {node.name: node for node in stations}
+    if pairs is None:
+        pairs = [(src, dst) for src in nodes for dst in nodes if src != dst]
+    plan = {}
+    for src, dst in pairs:
+        plan.setdefault(src, []).append((dst, nodes[dst].IP()))
+
+    matrix = ConnectivityMatrix(nodes)
+    if not plan:
+        return matrix
+    info(f"*** Probing {len(pairs)} pairs from {len(plan)} sources\n")
+    # One command per source: its probes run in parallel in its own shell
+    batch = {nodes[src]: probe_command([ip for _, ip in targets], count,
+                                       timeout, interval)
+             for src, targets in plan.items()}
+    with BatchExecutor(workers=max(1, min(workers, len(plan)))) as executor:
+        outputs = executor.outputs(batch)
+    for src, targets in plan.items():
+        chunks = split_probe_output(outputs[src], len(targets))
+        for (dst, _), raw in zip(targets, chunks):
+            matrix.record(src, dst, parse_ping(raw), raw)
+    return matrix
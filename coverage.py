@@ -0,0 +1,167 @@
+"""Vectorized RSSI, best-server and SINR grids for AP placement checks"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from propagation import (DEFAULT_ANTENNA_GAIN, PropagationModel, channel_frequency,
+                         node_txpower, to_dbm, to_mw)
+
+CACHE_SIZE = 64
+_cache = OrderedDict()
+
+
+def parse_position(position):
+    """'x,y,z' strings or sequences -> [x, y, z] floats"""
+    if isinstance(position, str):
+        position = position.split(',')
+    values = [float(v) for v in position]
+    return values + [0.0] * (3 - len(values))
+
+
+def ap_arrays(aps, model=None):
+    """Column arrays (positions, txpower, gain, freq, channel) for AP dicts
+
+    Each AP is a dict with 'position' and 'channel' and optionally
+    'txpower', 'range' and 'antennaGain', i.e. the addAccessPoint()
+    keywords; txpower comes from node_txpower() under `model`.
+    """
+    model = PropagationModel() if model is None else model
+    positions = np.array([parse_position(ap['position']) for ap in aps], dtype=float)
+    txpower = np.array([node_txpower(ap, model) for ap in aps])
+    gain = np.array([float(ap.get('antennaGain', DEFAULT_ANTENNA_GAIN)) for ap in aps])
+    channel = np.array([int(ap['channel']) for ap in aps])
+    freq = np.array([channel_frequency(c) for c in channel])
+    return positions.reshape(len(aps), 3), txpower, gain, freq, channel
+
+
+def config_hash(aps, model, max_x, max_y, resolution, height, rx_gain):
+    """Stable hash of everything that affects a coverage computation"""
+    config = {
+        'aps': [{key: (parse_position(value) if key == 'position' else value)
+                 for key, value in sorted(ap.items())
+                 if key in ('position', 'channel', 'txpower', 'range', 'antennaGain')}
+                for ap in aps],
+        'model': model.params(),
+        'area': [max_x, max_y, resolution, height, rx_gain],
+    }
+    blob = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+class CoverageMap:
+    """Result grids of compute_coverage(), indexed [y, x]"""
+
+    def __init__(self, names, x, y, rssi, channel, model):
+        self.names = list(names)
+        self.x = x
+        self.y = y
+        self.rssi = rssi
+        self.model = model
+        self.best_server = np.argmax(rssi, axis=0)
+        self.best_rssi = np.take_along_axis(rssi, self.best_server[None], axis=0)[0]
+        # Interference: every other AP on the serving AP's channel
+        power = to_mw(rssi)
+        same_channel = channel[:, None] == channel[None, :]
+        co_channel = np.tensordot(same_channel.astype(float), power, axes=(1, 0))
+        serving = np.take_along_axis(co_channel, self.best_server[None], axis=0)[0]
+        interference = serving - to_mw(self.best_rssi)
+        noise = to_mw(model.noise_th)
+        self.sinr = self.best_rssi - to_dbm(np.maximum(interference, 0) + noise)
+        self.covered = self.best_rssi - model.fading_cof >= model.noise_th
+
+    @property
+    def coverage_ratio(self):
+        return float(self.covered.mean())
+
+    def dead_spots(self):
+        """(x, y) of every grid cell without usable signal"""
+        rows, cols = np.nonzero(~self.covered)
+        return np.column_stack((self.x[cols], self.y[rows]))
+
+    def at(self, x, y):
+        """Values of the grid cell nearest to (x, y)"""
+        col = int(np.abs(self.x - x).argmin())
+        row = int(np.abs(self.y - y).argmin())
+        return {
+            'best_server': self.names[self.best_server[row, col]],
+            'rssi': float(self.best_rssi[row, col]),
+            'sinr': float(self.sinr[row, col]),
+            'covered': bool(self.covered[row, col]),
+        }
+
+
+def compute_coverage(aps, model=None, max_x=50, max_y=30, resolution=1.0,
+                     height=0.0, rx_gain=DEFAULT_ANTENNA_GAIN, cache=True):
+    """RSSI of every AP at every grid cell in one broadcast operation
+
+    Returns a CoverageMap; results are cached by a hash of the AP list,
+    model parameters and grid, so repeated checks are free.
+    """
+    model = PropagationModel() if model is None else model
+    key = config_hash(aps, model, max_x, max_y, resolution, height, rx_gain)
+    if cache and key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    positions, txpower, gain, freq, channel = ap_arrays(aps, model)
+    x = np.arange(0.0, max_x + resolution / 2, resolution)
+    y = np.arange(0.0, max_y + resolution / 2, resolution)
+    # (A, Ny, Nx) distances from every AP to every cell
+    dx = x[None, None, :] - positions[:, 0, None, None]
+    dy = y[None, :, None] - positions[:, 1, None, None]
+    dz = height - positions[:, 2, None, None]
+    distance = np.sqrt(dx ** 2 + dy ** 2 + dz ** 2)
+    rssi = model.rssi(distance, freq[:, None, None], txpower[:, None, None],
+                      gain[:, None, None], rx_gain)
+    names = [ap.get('name', f'ap{i + 1}') for i, ap in enumerate(aps)]
+    result = CoverageMap(names, x, y, rssi, channel, model)
+
+    if cache:
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def score_layouts(layouts, model=None, max_x=50, max_y=30, resolution=1.0,
+                  channel=1, txpower=None, ap_range=None, gain=DEFAULT_ANTENNA_GAIN,
+                  rx_gain=DEFAULT_ANTENNA_GAIN, chunk=256):
+    """Coverage ratio and worst-cell RSSI for many candidate layouts
+
+    `layouts` is an (L, A, 2 or 3) array of AP positions. Every AP uses
+    `txpower`, or the power giving `ap_range` under `model`, exactly as
+    node_txpower() resolves them for compute_coverage(). Layouts are
+    evaluated `chunk` at a time as one (chunk, A, cells) broadcast, so
+    thousands of candidates take seconds.
+    """
+    model = PropagationModel() if model is None else model
+    params = {'channel': channel, 'antennaGain': gain}
+    if txpower is not None:
+        params['txpower'] = txpower
+    if ap_range is not None:
+        params['range'] = ap_range
+    txpower = node_txpower(params, model)
+    layouts = np.asarray(layouts, dtype=float)
+    if layouts.shape[-1] == 2:
+        layouts = np.concatenate((layouts, np.zeros(layouts.shape[:-1] + (1,))), axis=-1)
+    x = np.arange(0.0, max_x + resolution / 2, resolution)
+    y = np.arange(0.0, max_y + resolution / 2, resolution)
+    gx, gy = np.meshgrid(x, y)
+    cells = np.column_stack((gx.ravel(), gy.ravel(), np.zeros(gx.size)))
+    freq = channel_frequency(channel)
+    coverage = np.empty(len(layouts))
+    worst = np.empty(len(layouts))
+    for start in range(0, len(layouts), chunk):
+        block = layouts[start:start + chunk]
+        distance = np.sqrt(((block[:, :, None, :] - cells[None, None]) ** 2).sum(-1))
+        best = model.rssi(distance, freq, txpower, gain, rx_gain).max(axis=1)
+        coverage[start:start + chunk] = (best - model.fading_cof >= model.noise_th).mean(axis=1)
+        worst[start:start + chunk] = best.min(axis=1)
+    return {'coverage': coverage, 'worst_rssi': worst}
+
+
+def clear_cache():
+    _cache.clear()
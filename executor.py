@@ -0,0 +1,134 @@
+"""Batched, concurrent command execution across node shells"""
+
+import asyncio
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TIMEOUT_MARKER = '@@timeout'
+
+
+class CommandResult:
+    """Output and timing of one command run in one node shell"""
+
+    __slots__ = ('node', 'command', 'output', 'latency', 'timed_out', 'error')
+
+    def __init__(self, node, command, output='', latency=0.0, timed_out=False,
+                 error=None):
+        self.node = node
+        self.command = command
+        self.output = output
+        self.latency = latency
+        self.timed_out = timed_out
+        self.error = error
+
+    @property
+    def ok(self):
+        return not self.timed_out and self.error is None
+
+    def __repr__(self):
+        return (f'CommandResult({self.node!r}, {self.command!r}, '
+                f'{self.latency:.3f}s, ok={self.ok})')
+
+
+def with_timeout(command, timeout):
+    """Wrap a shell command so coreutils `timeout` bounds its runtime"""
+    return (f'timeout {timeout} bash -c {shlex.quote(command)}; '
+            f'[ $? -eq 124 ] && echo {TIMEOUT_MARKER}')
+
+
+class BatchExecutor:
+    """Send commands to many node shells at once
+
+    A node shell can only run one command at a time, so each node's
+    commands run in order on one worker while different nodes run in
+    parallel. Nodes only need a `name` and a `cmd(str) -> str` method,
+    which makes fake shells enough for testing.
+    """
+
+    def __init__(self, workers=32, timeout=None):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self.latencies = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def _run_node(self, node, commands, timeout):
+        results = []
+        for command in commands:
+            shell_command = command if timeout is None else with_timeout(command, timeout)
+            began = time.monotonic()
+            result = CommandResult(node.name, command)
+            try:
+                output = node.cmd(shell_command)
+            except Exception as e:  # a broken shell must not sink the batch
+                output = ''
+                result.error = e
+            result.latency = time.monotonic() - began
+            if timeout is not None and output.rstrip().endswith(TIMEOUT_MARKER):
+                result.timed_out = True
+                output = output.rstrip()[:-len(TIMEOUT_MARKER)]
+            result.output = output
+            results.append(result)
+            with self._lock:
+                self.latencies.setdefault(node.name, []).append(result.latency)
+        return results
+
+    def submit(self, plan, timeout=None):
+        """Start a {node: [commands]} batch; returns {node name: Future}
+
+        Each future resolves to the node's list of CommandResult in the
+        order the commands were given. A single string counts as one
+        command.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        futures = {}
+        for node, commands in plan.items():
+            if isinstance(commands, str):
+                commands = [commands]
+            futures[node.name] = self._pool.submit(self._run_node, node,
+                                                   list(commands), timeout)
+        return futures
+
+    def run(self, plan, timeout=None):
+        """Run a batch to completion; returns {node name: [CommandResult]}"""
+        futures = self.submit(plan, timeout)
+        return {name: future.result() for name, future in futures.items()}
+
+    def outputs(self, plan, timeout=None):
+        """Like run() but returns {node name: output of the last command}"""
+        return {name: results[-1].output if results else ''
+                for name, results in self.run(plan, timeout).items()}
+
+    async def run_async(self, plan, timeout=None):
+        """asyncio flavour of run(); node batches become awaitable tasks"""
+        futures = self.submit(plan, timeout)
+        names = list(futures)
+        results = await asyncio.gather(*(asyncio.wrap_future(futures[name])
+                                         for name in names))
+        return dict(zip(names, results))
+
+    def report(self):
+        """Per-node command count and latency statistics in seconds"""
+        with self._lock:
+            latencies = {name: list(values) for name, values in self.latencies.items()}
+        return {name: {'commands': len(values),
+                       'total': sum(values),
+                       'mean': sum(values) / len(values),
+                       'max': max(values)}
+                for name, values in latencies.items() if values}
+
+
+def run_batch(plan, timeout=None, workers=32):
+    """One-shot helper: run a {node: [commands]} map and close the pool"""
+    with BatchExecutor(workers, timeout) as executor:
+        return executor.run(plan)
@@ -0,0 +1,224 @@
+"""Offline prediction of serving APs and handovers along station trajectories"""
+
+import numpy as np
+
+from coverage import ap_arrays
+from mobility import _as_point
+from propagation import DEFAULT_ANTENNA_GAIN, PropagationModel
+from traces import TraceCursor, TraceReader
+
+# Roaming decisions predict_handovers() can model
+POLICIES = ('sticky', 'strongest')
+
+
+class APGrid:
+    """Uniform grid over AP positions for nearby-AP queries
+
+    The cell size is the largest distance at which any AP is still above
+    the receiver floor, so every AP that can serve a point lies in the 3x3
+    block of cells around it. Each cell keeps a padded row of AP indices,
+    which lets a whole batch of points gather its candidates in one step.
+    """
+
+    def __init__(self, aps, model=None, rx_gain=DEFAULT_ANTENNA_GAIN):
+        self.model = PropagationModel() if model is None else model
+        self.names = [ap.get('name', f'ap{i + 1}') for i, ap in enumerate(aps)]
+        (self.positions, self.txpower, self.gain,
+         self.freq, self.channel) = ap_arrays(aps, self.model)
+        self.rx_gain = rx_gain
+        reach = self.model.max_distance(self.freq, self.txpower, self.gain, rx_gain)
+        self.cell = float(max(np.max(reach), 1e-3)) if len(aps) else 1.0
+        self.origin = self.positions[:, :2].min(axis=0) if len(aps) else np.zeros(2)
+        cells = self._cells(self.positions[:, :2])
+        self.shape = tuple(cells.max(axis=0) + 1) if len(aps) else (1, 1)
+        flat = cells[:, 0] * self.shape[1] + cells[:, 1]
+        counts = np.bincount(flat, minlength=self.shape[0] * self.shape[1])
+        self.table = np.full((len(counts), max(int(counts.max(initial=0)), 1)), -1)
+        order = np.argsort(flat, kind='stable')
+        slot = np.arange(len(flat)) - np.searchsorted(flat[order], flat[order])
+        self.table[flat[order], slot] = order
+
+    def _cells(self, points):
+        return np.floor((points - self.origin) / self.cell).astype(np.int64)
+
+    def candidates(self, points):
+        """(P, 9 * per-cell) AP indices near each point, -1 padded"""
+        cells = self._cells(np.asarray(points, dtype=float)[:, :2])
+        offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+        around = cells[:, None, :] + offsets[None]
+        inside = ((around >= 0) & (around < np.array(self.shape))).all(axis=-1)
+        flat = np.where(inside, around[..., 0] * self.shape[1] + around[..., 1], 0)
+        found = self.table[flat]
+        found[~inside] = -1
+        return found.reshape(len(points), -1)
+
+    def rssi(self, points, candidates):
+        """RSSI of each candidate AP at each point; -inf for padding"""
+        points = np.asarray(points, dtype=float)
+        index = np.maximum(candidates, 0)
+        distance = np.linalg.norm(points[:, None, :] - self.positions[index], axis=-1)
+        rssi = self.model.rssi(distance, self.freq[index], self.txpower[index],
+                               self.gain[index], self.rx_gain)
+        usable = (candidates >= 0) & (rssi - self.model.fading_cof >= self.model.noise_th)
+        return np.where(usable, rssi, -np.inf)
+
+    def best(self, points):
+        """(serving AP index or -1, RSSI) for every point"""
+        candidates = self.candidates(points)
+        rssi = self.rssi(points, candidates)
+        pick = np.argmax(rssi, axis=1)
+        rows = np.arange(len(candidates))
+        best = rssi[rows, pick]
+        return np.where(np.isfinite(best), candidates[rows, pick], -1), best
+
+
+def trajectory_positions(specs, times):
+    """(T, S, 3) positions of MOBILITY_SPECS-style trajectories at `times`"""
+    start = np.array([_as_point(s['start']) for s in specs]).reshape(len(specs), 3)
+    end = np.array([_as_point(s['end']) for s in specs]).reshape(len(specs), 3)
+    t0 = np.array([float(s['start_time']) for s in specs])
+    t1 = np.array([float(s['end_time']) for s in specs])
+    times = np.asarray(times, dtype=float)[:, None]
+    frac = np.clip((times - t0) / np.maximum(t1 - t0, 1e-9), 0.0, 1.0)
+    frac[times >= t1] = 1.0
+    return start + (end - start) * frac[..., None]
+
+
+def trace_positions(path, times, interpolate='linear'):
+    """(station names, (T, S, 3) positions) of a recorded trace at `times`
+
+    Stations sit at their first recorded position until that record is
+    reached, as a replay leaves them where the network placed them;
+    stations without any record are left out.
+    """
+    with TraceReader(path) as reader:
+        cursor = TraceCursor(reader, interpolate)
+        positions = np.stack([cursor.advance(t) for t in times]) if len(times) else \
+            np.empty((0, len(reader.names), 3))
+        names = list(reader.names)
+    keep = []
+    for station in range(len(names)):
+        known = np.flatnonzero(np.isfinite(positions[:, station, 0]))
+        if len(known):
+            positions[:known[0], station] = positions[known[0], station]
+            keep.append(station)
+    return [names[i] for i in keep], positions[:, keep]
+
+
+class HandoverTimeline:
+    """Predicted serving AP and RSSI of every station over time
+
+    `serving` and `rssi` are (times, stations) arrays; -1 in `serving`
+    means no AP is above the receiver floor.
+    """
+
+    def __init__(self, times, stations, aps, serving, rssi):
+        self.times = times
+        self.stations = list(stations)
+        self.aps = list(aps)
+        self.serving = serving
+        self.rssi = rssi
+
+    def _label(self, index):
+        return None if index < 0 else self.aps[index]
+
+    def handovers(self):
+        """(time, station, old, new) tuples like AssociationHistory.handovers"""
+        rows, cols = np.nonzero(self.serving[1:] != self.serving[:-1])
+        return sorted((float(self.times[r + 1]), self.stations[c],
+                       self._label(self.serving[r, c]),
+                       self._label(self.serving[r + 1, c]))
+                      for r, c in zip(rows, cols))
+
+    def serving_at(self, station, t):
+        """Predicted serving AP name of a station at time t"""
+        row = max(int(np.searchsorted(self.times, t, 'right')) - 1, 0)
+        return self._label(self.serving[row, self.stations.index(station)])
+
+    def sampling_windows(self, margin=2.0):
+        """(start, end) windows around predicted handovers, merged when close"""
+        windows = []
+        for t, *_ in self.handovers():
+            start, end = max(t - margin, 0.0), t + margin
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+        return windows
+
+    def compare(self, observed, tolerance=2.0):
+        """Match observed handovers against the prediction
+
+        `observed` is a list of (time, station, old, new) tuples. Returns
+        a dict of matched (predicted, observed) pairs, plus predicted
+        events that never happened ('missing') and observed events that
+        were not predicted ('unexpected').
+        """
+        remaining = list(observed)
+        matched, missing = [], []
+        for event in self.handovers():
+            t, station, _, new = event
+            hit = next((o for o in remaining if o[1] == station and o[3] == new
+                        and abs(o[0] - t) <= tolerance), None)
+            if hit is None:
+                missing.append(event)
+            else:
+                remaining.remove(hit)
+                matched.append((event, hit))
+        return {'matched': matched, 'missing': missing, 'unexpected': remaining}
+
+
+def predict_handovers(specs, aps, model=None, dt=0.1, duration=None,
+                      hysteresis=0.0, rx_gain=DEFAULT_ANTENNA_GAIN, policy='sticky'):
+    """Predict each station's serving AP along its trajectory
+
+    Stations attach to the strongest AP. With the 'sticky' policy they
+    stay on it until it drops below the receiver floor, i.e. out of the
+    AP's `range`, as Mininet-WiFi and simnet do; with 'strongest' they
+    also move whenever another AP is `hysteresis` dB stronger. Every
+    time step handles all stations in one batch.
+    """
+    if duration is None:
+        duration = max((float(s['end_time']) for s in specs), default=0.0)
+    times = np.arange(0.0, duration + dt / 2, dt)
+    return _predict([s['name'] for s in specs], times, trajectory_positions(specs, times),
+                    aps, model, hysteresis, rx_gain, policy)
+
+
+def predict_trace_handovers(path, aps, model=None, dt=0.1, hysteresis=0.0,
+                            rx_gain=DEFAULT_ANTENNA_GAIN, policy='sticky',
+                            interpolate='linear'):
+    """predict_handovers() for the stations of a recorded trace file"""
+    with TraceReader(path) as reader:
+        duration = reader.end_time
+    times = np.arange(0.0, duration + dt / 2, dt)
+    names, positions = trace_positions(path, times, interpolate)
+    return _predict(names, times, positions, aps, model, hysteresis, rx_gain, policy)
+
+
+def _predict(names, times, positions, aps, model, hysteresis, rx_gain, policy):
+    """Serving APs of stations at (T, S, 3) `positions`, step by step"""
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy {policy!r}; expected one of {POLICIES}")
+    grid = APGrid(aps, model, rx_gain)
+    count = len(names)
+    serving = np.full((len(times), count), -1, dtype=np.int64)
+    rssi = np.full((len(times), count), -np.inf)
+    current = np.full(count, -1, dtype=np.int64)
+    rows = np.arange(count)
+    for step, points in enumerate(positions):
+        candidates = grid.candidates(points)
+        levels = grid.rssi(points, candidates)
+        pick = np.argmax(levels, axis=1)
+        best_ap = np.where(np.isfinite(levels[rows, pick]), candidates[rows, pick], -1)
+        best_level = levels[rows, pick]
+        # Signal of the AP each station is currently attached to
+        same = (candidates == current[:, None]) & (current[:, None] >= 0)
+        current_level = np.where(same, levels, -np.inf).max(axis=1)
+        switch = ~np.isfinite(current_level)
+        if policy == 'strongest':
+            switch |= best_level > current_level + hysteresis
+        current = np.where(switch, best_ap, current)
+        serving[step] = current
+        rssi[step] = np.where(switch, best_level, current_level)
+    return HandoverTimeline(times, names, grid.names, serving, rssi)
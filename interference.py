@@ -0,0 +1,172 @@
+"""Pairwise SINR, PER and PHY rate estimates for interference-mode scenarios"""
+
+import numpy as np
+
+from coverage import parse_position
+from propagation import (DEFAULT_ANTENNA_GAIN, PropagationModel, channel_frequency,
+                         node_txpower, to_dbm, to_mw)
+
+# 802.11a/g OFDM rates: (Mbit/s, bits per symbol, code rate)
+OFDM_RATES = (
+    (6, 1, 1 / 2), (9, 1, 3 / 4), (12, 2, 1 / 2), (18, 2, 3 / 4),
+    (24, 4, 1 / 2), (36, 4, 3 / 4), (48, 6, 2 / 3), (54, 6, 3 / 4),
+)
+# Rough SNR gain of the convolutional code at each code rate (dB)
+CODING_GAIN = {1 / 2: 5.0, 2 / 3: 4.0, 3 / 4: 3.0}
+FRAME_BYTES = 1500
+
+
+def erfc(x):
+    """Complementary error function (Abramowitz & Stegun 7.1.26) for arrays"""
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+                + t * (-1.453152027 + t * 1.061405429))))
+    value = poly * np.exp(-z * z)
+    return np.where(x >= 0, value, 2.0 - value)
+
+
+def bit_error_rate(snr_db, bits, code_rate):
+    """Approximate coded BER of an OFDM rate at the given SNR"""
+    snr = to_mw(np.asarray(snr_db, dtype=float) + CODING_GAIN[code_rate])
+    if bits == 1:
+        return 0.5 * erfc(np.sqrt(snr))
+    levels = 2 ** bits
+    return np.minimum((2.0 / bits) * (1 - 1 / np.sqrt(levels))
+                      * erfc(np.sqrt(3 * snr / (2 * (levels - 1)))), 0.5)
+
+
+def packet_error_rate(snr_db, frame_bytes=FRAME_BYTES):
+    """(rates, PER) with PER shaped (len(OFDM_RATES),) + snr shape"""
+    snr_db = np.asarray(snr_db, dtype=float)
+    per = np.empty((len(OFDM_RATES),) + snr_db.shape)
+    for k, (_, bits, code_rate) in enumerate(OFDM_RATES):
+        ber = bit_error_rate(snr_db, bits, code_rate)
+        per[k] = -np.expm1(8 * frame_bytes * np.log1p(-ber))
+    rates = np.array([rate for rate, _, _ in OFDM_RATES], dtype=float)
+    return rates, per
+
+
+def channel_overlap(a, b):
+    """Fraction of a transmitter on channel a heard by a receiver on b
+
+    2.4 GHz channels 5 MHz apart overlap partially; 5 GHz channels only
+    interfere with themselves.
+    """
+    a = np.asarray(a, dtype=int)
+    b = np.asarray(b, dtype=int)
+    gap = np.abs(a - b)
+    narrow = (a <= 14) & (b <= 14)
+    return np.where(narrow, np.clip(1.0 - gap / 5.0, 0.0, 1.0),
+                    (gap == 0).astype(float))
+
+
+class InterferenceEngine:
+    """Received power between every pair of nodes, kept up to date as they move
+
+    `power[i, j]` is the power in mW that node j receives from node i
+    with the fading margin applied; interference at each receiver is
+    the co-channel sum weighted by each transmitter's `activity` (its
+    share of airtime, 1.0 = always on). move() only recomputes the rows
+    and columns of nodes that moved.
+    """
+
+    def __init__(self, nodes, model=None, activity=1.0, frame_bytes=FRAME_BYTES):
+        self.model = PropagationModel() if model is None else model
+        self.names = [node['name'] for node in nodes]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.positions = np.array([parse_position(node['position']) for node in nodes],
+                                  dtype=float).reshape(len(nodes), 3)
+        self.txpower = np.array([node_txpower(node, self.model) for node in nodes])
+        self.gain = np.array([float(node.get('antennaGain', DEFAULT_ANTENNA_GAIN))
+                              for node in nodes])
+        self.channel = np.array([int(node.get('channel', 1)) for node in nodes])
+        self.activity = np.broadcast_to(np.asarray(activity, dtype=float),
+                                        (len(nodes),)).copy()
+        self.frame_bytes = frame_bytes
+        self.noise = to_mw(self.model.noise_th)
+        self.recompute()
+
+    def _power(self, rows, cols):
+        """Received power (mW) from transmitters `rows` at receivers `cols`"""
+        distance = np.linalg.norm(self.positions[rows][:, None, :]
+                                  - self.positions[cols][None, :, :], axis=-1)
+        freq = np.array([channel_frequency(c) for c in self.channel[rows]])
+        rssi = self.model.rssi(distance, freq[:, None], self.txpower[rows][:, None],
+                               self.gain[rows][:, None], self.gain[cols][None, :])
+        power = to_mw(rssi - self.model.fading_cof)
+        power[rows[:, None] == cols[None, :]] = 0.0
+        return power
+
+    def _heard(self, rows, cols):
+        """Activity- and overlap-weighted power counted as interference"""
+        overlap = channel_overlap(self.channel[rows][:, None], self.channel[cols][None, :])
+        return self.power[np.ix_(rows, cols)] * overlap * self.activity[rows][:, None]
+
+    def recompute(self):
+        """Rebuild the full N x N matrix and the per-receiver totals"""
+        everyone = np.arange(len(self.names))
+        self.power = self._power(everyone, everyone)
+        self.total = self._heard(everyone, everyone).sum(axis=0)
+
+    def move(self, positions):
+        """Update node positions ({name: position}); cost grows with N per mover"""
+        moved = np.array(sorted(self.index[name] for name in positions), dtype=int)
+        if not len(moved):
+            return
+        everyone = np.arange(len(self.names))
+        self.total -= self._heard(moved, everyone).sum(axis=0)
+        for name, position in positions.items():
+            self.positions[self.index[name]] = parse_position(position)
+        self.power[moved, :] = self._power(moved, everyone)
+        self.power[:, moved] = self._power(everyone, moved)
+        self.total += self._heard(moved, everyone).sum(axis=0)
+        # Columns of moved receivers changed for every transmitter
+        self.total[moved] = self._heard(everyone, moved).sum(axis=0)
+
+    def sinr(self, tx, rx):
+        """SINR in dB of links tx[k] -> rx[k] (index arrays)"""
+        tx = np.asarray(tx, dtype=int)
+        rx = np.asarray(rx, dtype=int)
+        signal = self.power[tx, rx]
+        own = (signal * channel_overlap(self.channel[tx], self.channel[rx])
+               * self.activity[tx])
+        interference = np.maximum(self.total[rx] - own, 0.0)
+        return to_dbm(signal) - to_dbm(interference + self.noise)
+
+    def links(self, pairs=None):
+        """Expected SINR, PER and PHY rate per link
+
+        `pairs` is a list of (tx name, rx name); by default every ordered
+        pair. The PHY rate is the OFDM rate with the best expected goodput
+        at that SINR, and PER is the packet error rate at that rate.
+        """
+        if pairs is None:
+            count = len(self.names)
+            tx, rx = np.nonzero(~np.eye(count, dtype=bool))
+        else:
+            tx = np.array([self.index[a] for a, _ in pairs], dtype=int)
+            rx = np.array([self.index[b] for _, b in pairs], dtype=int)
+        sinr = self.sinr(tx, rx)
+        rates, per = packet_error_rate(sinr, self.frame_bytes)
+        goodput = rates[:, None] * (1.0 - per)
+        best = np.argmax(goodput, axis=0)
+        columns = np.arange(len(tx))
+        return {
+            'tx': [self.names[i] for i in tx],
+            'rx': [self.names[i] for i in rx],
+            'sinr': sinr,
+            'per': per[best, columns],
+            'phy_rate': rates[best],
+            'goodput': goodput[best, columns],
+        }
+
+
+def format_links(links):
+    """Plain-text table of InterferenceEngine.links() output"""
+    lines = [f"{'link':<20} {'SINR dB':>8} {'PER':>7} {'PHY Mb/s':>9}"]
+    for k, (a, b) in enumerate(zip(links['tx'], links['rx'])):
+        lines.append(f"{a + ' -> ' + b:<20} {links['sinr'][k]:8.1f} "
+                     f"{links['per'][k]:7.3f} {links['phy_rate'][k]:9.0f}")
+    return '\n'.join(lines)
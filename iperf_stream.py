@@ -0,0 +1,255 @@
+"""Streaming ingestion of iperf3 per-interval output"""
+
+import json
+import re
+import subprocess
+
+from ringbuffer import RingBuffer
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use with recorded output
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+SAMPLE_FIELDS = [
+    ('start', 'f8'),
+    ('end', 'f8'),
+    ('bits_per_second', 'f8'),
+    ('bytes', 'i8'),
+    ('retransmits', 'i8'),
+    ('snd_cwnd', 'i8'),
+    ('rtt_us', 'f8'),
+    ('omitted', '?'),
+]
+
+# First iperf3 release with --json-stream
+JSON_STREAM_VERSION = (3, 17)
+
+# Output flags of iperf_client_command()
+OUTPUT_FLAGS = {'json-stream': ' --json-stream', 'json': ' -J', 'text': ' -f m --forceflush'}
+
+_UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+_BYTE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# [  5]   0.00-1.00   sec  11.2 MBytes  94.1 Mbits/sec    0    366 KBytes
+_TEXT_RE = re.compile(
+    r'^\[\s*(?P<id>\d+|SUM)\]\s+(?P<start>[\d.]+)-\s*(?P<end>[\d.]+)\s+sec\s+'
+    r'(?P<bytes>[\d.]+)\s+(?P<bunit>[KMGT]?)Bytes\s+'
+    r'(?P<rate>[\d.]+)\s+(?P<runit>[KMGT]?)bits/sec'
+    r'(?:\s+(?P<retr>\d+))?'
+    r'(?:\s+(?P<cwnd>[\d.]+)\s+(?P<cunit>[KMGT]?)Bytes)?'
+    r'\s*(?P<role>sender|receiver)?'
+    r'\s*(?P<omitted>\(omitted\))?\s*$')
+
+
+def parse_json_stream_line(line):
+    """Parse one `iperf3 --json-stream` line
+
+    Returns (event, payload): for 'interval' events the payload is a sample
+    dict, for 'end' the raw end block, for 'error' the message.
+    """
+    line = line.strip()
+    if not line:
+        return None, None
+    message = json.loads(line)
+    event = message.get('event')
+    data = message.get('data')
+    if event != 'interval':
+        return event, data
+    return event, interval_sample(data)
+
+
+def interval_sample(data):
+    """Sample dict of one entry of an iperf3 JSON 'intervals' list"""
+    total = data['sum']
+    streams = data.get('streams', [])
+    rtts = [s['rtt'] for s in streams if 'rtt' in s]
+    return {
+        'start': total['start'],
+        'end': total['end'],
+        'bits_per_second': total['bits_per_second'],
+        'bytes': total['bytes'],
+        'retransmits': total.get('retransmits', 0),
+        'snd_cwnd': sum(s.get('snd_cwnd', 0) for s in streams),
+        'rtt_us': sum(rtts) / len(rtts) if rtts else float('nan'),
+        'omitted': total.get('omitted', False),
+    }
+
+
+def parse_text_line(line, parallel=1):
+    """Parse one line of plain iperf3 client output into a sample dict
+
+    Summary lines (ending in sender/receiver) and, when several streams
+    run, the per-stream lines are skipped so one sample covers one interval.
+    """
+    match = _TEXT_RE.match(line.strip())
+    if not match or match.group('role'):
+        return None
+    is_sum = match.group('id') == 'SUM'
+    if (parallel > 1) != is_sum:
+        return None
+    cwnd = 0
+    if match.group('cwnd'):
+        cwnd = int(float(match.group('cwnd')) * _BYTE_UNITS[match.group('cunit')])
+    return {
+        'start': float(match.group('start')),
+        'end': float(match.group('end')),
+        'bits_per_second': float(match.group('rate')) * _UNITS[match.group('runit')],
+        'bytes': int(float(match.group('bytes')) * _BYTE_UNITS[match.group('bunit')]),
+        'retransmits': int(match.group('retr') or 0),
+        'snd_cwnd': cwnd,
+        'rtt_us': float('nan'),
+        'omitted': bool(match.group('omitted')),
+    }
+
+
+class IperfStream:
+    """Consume iperf3 output line by line into a bounded sample buffer
+
+    Every parsed interval is stored in a RingBuffer of `capacity` samples
+    and handed to `on_sample`. When `stall_bps` is set, the stream reports
+    a stall after `stall_intervals` consecutive intervals below it.
+    """
+
+    def __init__(self, capacity=512, json_stream=True, parallel=1,
+                 on_sample=None, stall_bps=None, stall_intervals=3):
+        self.samples = RingBuffer(capacity, SAMPLE_FIELDS)
+        self.json_stream = json_stream
+        self.parallel = parallel
+        self.on_sample = on_sample
+        self.stall_bps = stall_bps
+        self.stall_intervals = stall_intervals
+        self.summary = None
+        self.error = None
+        self.aborted = False
+        self._slow = 0
+
+    @property
+    def stalled(self):
+        return self.stall_bps is not None and self._slow >= self.stall_intervals
+
+    def feed(self, line):
+        """Parse one output line; returns the new sample or None"""
+        if self.json_stream:
+            try:
+                event, payload = parse_json_stream_line(line)
+            except ValueError:
+                return None
+            if event == 'end':
+                self.summary = payload
+            elif event == 'error':
+                self.error = payload
+            if event != 'interval':
+                return None
+            sample = payload
+        else:
+            sample = parse_text_line(line, self.parallel)
+            if sample is None:
+                return None
+        return self._add(sample)
+
+    def feed_document(self, document):
+        """Ingest a complete `iperf3 -J` result at once (iperf3 < 3.17)"""
+        for interval in document.get('intervals', []):
+            self._add(interval_sample(interval))
+        self.summary = document.get('end') or None
+        self.error = document.get('error')
+
+    def _add(self, sample):
+        self.samples.append(sample)
+        if self.stall_bps is not None and not sample['omitted']:
+            slow = sample['bits_per_second'] < self.stall_bps
+            self._slow = self._slow + 1 if slow else 0
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample
+
+    def consume(self, lines):
+        """Generator over samples parsed from an iterable of lines
+
+        Stops early (setting `aborted`) once the flow is stalled.
+        """
+        for line in lines:
+            sample = self.feed(line)
+            if sample is not None:
+                yield sample
+                if self.stalled:
+                    self.aborted = True
+                    return
+
+    def document(self):
+        """End block wrapped like `iperf3 -J` output, for analyze_tcp_results"""
+        return {'end': self.summary} if self.summary is not None else None
+
+
+def iperf3_version(node):
+    """(major, minor) of the iperf3 installed on a node, or None"""
+    match = re.search(r'iperf (\d+)\.(\d+)', node.cmd('iperf3 --version 2>&1'))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def supports_json_stream(node):
+    version = iperf3_version(node)
+    return version is not None and version >= JSON_STREAM_VERSION
+
+
+def iperf_client_command(server_ip, port=5001, duration=120, output='json-stream',
+                         parallel=1, udp=False, bitrate=None):
+    """iperf3 client command line reporting every interval
+
+    `output` is 'json-stream' or 'text' to get intervals as they
+    happen, or 'json' for one -J document at the end.
+    """
+    cmd = f'iperf3 -c {server_ip} -p {port} -t {duration} -i 1'
+    if parallel > 1:
+        cmd += f' -P {parallel}'
+    if udp:
+        cmd += ' -u'
+    if bitrate:
+        cmd += f' -b {bitrate}'
+    cmd += OUTPUT_FLAGS[output]
+    return cmd
+
+
+def stream_iperf(client_station, server_ip, port=5001, duration=120,
+                 json_stream=None, parallel=1, on_sample=None,
+                 stall_bps=None, stall_intervals=3, capacity=512):
+    """Run an iperf3 client and ingest its intervals while it runs
+
+    Returns the IperfStream; the client is terminated early if the flow
+    stalls. --json-stream needs iperf3 >= 3.17: by default the node's
+    iperf3 is checked and older ones run with -J, so the intervals only
+    arrive when the client exits but the end block is kept.
+    json_stream=False parses the plain text output live instead, which
+    has no end block.
+    """
+    if json_stream is None and not supports_json_stream(client_station):
+        info("*** iperf3 < 3.17 has no --json-stream, reading -J output\n")
+        stream = IperfStream(capacity, True, parallel, on_sample,
+                             stall_bps, stall_intervals)
+        output = client_station.cmd(
+            iperf_client_command(server_ip, port, duration, 'json', parallel))
+        try:
+            stream.feed_document(json.loads(output))
+        except ValueError:
+            stream.error = output.strip() or 'no output from iperf3'
+        return stream
+    json_stream = json_stream is not False
+    stream = IperfStream(capacity, json_stream, parallel, on_sample,
+                         stall_bps, stall_intervals)
+    cmd = iperf_client_command(server_ip, port, duration,
+                               'json-stream' if json_stream else 'text', parallel)
+    proc = client_station.popen(cmd, stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+    try:
+        for _ in stream.consume(iter(proc.stdout.readline, '')):
+            pass
+        if stream.aborted:
+            info(f"*** Flow to {server_ip}:{port} stalled, aborting\n")
+            proc.terminate()
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    return stream
@@ -0,0 +1,120 @@
+"""Sparse ad-hoc mesh planning with a spatial hash over node positions"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from coverage import parse_position
+from propagation import DEFAULT_ANTENNA_GAIN
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub networks
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+# Half of the 3x3 neighbourhood, so each pair of cells is visited once
+_FORWARD = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class SpatialHash:
+    """Bucket points into square cells for fixed-radius neighbour search"""
+
+    def __init__(self, points, cell):
+        self.points = np.asarray(points, dtype=float)
+        self.cell = float(cell)
+        keys = np.floor(self.points[:, :2] / self.cell).astype(np.int64)
+        self.buckets = defaultdict(list)
+        for index, key in enumerate(map(tuple, keys)):
+            self.buckets[key].append(index)
+        self.buckets = {key: np.array(members) for key, members in self.buckets.items()}
+
+    def pairs(self):
+        """(i, j, distance) arrays for point pairs in the same or adjacent cells
+
+        Only pairs closer than one cell can matter, so the work grows with
+        the number of nearby points rather than with N².
+        """
+        left, right = [], []
+        for (cx, cy), members in self.buckets.items():
+            for dx, dy in _FORWARD:
+                others = self.buckets.get((cx + dx, cy + dy))
+                if others is None:
+                    continue
+                i, j = np.meshgrid(members, others, indexing='ij')
+                i, j = i.ravel(), j.ravel()
+                keep = i < j if (dx, dy) == (0, 0) else np.ones(len(i), dtype=bool)
+                left.append(i[keep])
+                right.append(j[keep])
+        if not left:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        i, j = np.concatenate(left), np.concatenate(right)
+        distance = np.linalg.norm(self.points[i] - self.points[j], axis=1)
+        return i, j, distance
+
+
+class MeshPlan:
+    """Neighbour and interference-candidate pairs of an ad-hoc layout"""
+
+    def __init__(self, names, neighbors, interference, distance):
+        self.names = list(names)
+        self.neighbors = neighbors
+        self.interference = interference
+        self.distance = distance
+
+    def neighbor_map(self):
+        """{name: [names within range]}"""
+        result = {name: [] for name in self.names}
+        for a, b in self.neighbors:
+            result[a].append(b)
+            result[b].append(a)
+        return result
+
+    def isolated(self):
+        """Nodes with no neighbour in range"""
+        return [name for name, peers in self.neighbor_map().items() if not peers]
+
+
+def plan_mesh(nodes, exp=2.0, interference_factor=2.0, default_range=30.0):
+    """Find which node pairs can hear each other and which may interfere
+
+    `nodes` are addStation()-style dicts with 'name', 'position' (x, y and
+    antenna height) and optionally 'range' and 'antennaGain'. A pair's
+    reach is the larger of the two ranges, stretched by the pair's extra
+    antenna gain over the defaults using the path loss exponent `exp`.
+    Pairs beyond reach but within `interference_factor` times it are
+    reported as interference candidates.
+    """
+    names = [node['name'] for node in nodes]
+    if not nodes:
+        return MeshPlan([], [], [], {})
+    points = np.array([parse_position(node['position']) for node in nodes])
+    ranges = np.array([float(node.get('range', default_range)) for node in nodes])
+    gains = np.array([float(node.get('antennaGain', DEFAULT_ANTENNA_GAIN))
+                      for node in nodes])
+    # Largest reach any pair can have bounds the cell size
+    top_gain = 2 * gains.max() - 2 * DEFAULT_ANTENNA_GAIN
+    cell = ranges.max() * 10 ** (max(top_gain, 0) / (10 * exp)) * interference_factor
+    i, j, distance = SpatialHash(points, max(cell, 1e-3)).pairs()
+    extra = gains[i] + gains[j] - 2 * DEFAULT_ANTENNA_GAIN
+    reach = np.maximum(ranges[i], ranges[j]) * 10 ** (extra / (10 * exp))
+    near = distance <= reach
+    heard = near | (distance <= reach * interference_factor)
+    neighbors = [(names[a], names[b]) for a, b in zip(i[near], j[near])]
+    interference = [(names[a], names[b]) for a, b in zip(i[heard & ~near], j[heard & ~near])]
+    distances = {(names[a], names[b]): float(d)
+                 for a, b, d in zip(i[heard], j[heard], distance[heard])}
+    return MeshPlan(names, neighbors, interference, distances)
+
+
+def build_mesh(net, nodes, link_cls, **params):
+    """Join every node to the ad-hoc network with one addLink each
+
+    Mininet-WiFi's adhoc/mesh link classes configure the first node only,
+    so one call per node is what actually joins the IBSS; calling it for
+    every pair repeats work N times over and can miss nodes entirely.
+    """
+    info(f"*** Joining {len(nodes)} nodes to the ad-hoc network\n")
+    for node in nodes:
+        net.addLink(node, cls=link_cls, intf=f'{node.name}-wlan0', **params)
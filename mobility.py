@@ -0,0 +1,191 @@
+"""Vectorized mobility engine shared by the Mininet-WiFi scenarios"""
+
+import threading
+
+import numpy as np
+
+from profiling import profiled
+from scheduler import EventScheduler
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub nodes
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+def format_position(pos):
+    """Format an (x, y, z) triple the way setPosition expects it"""
+    return f'{pos[0]:.2f},{pos[1]:.2f},{pos[2]:.2f}'
+
+
+def _as_point(value):
+    """Accept 'x,y,z' strings or 2/3-element sequences"""
+    if isinstance(value, str):
+        value = [float(v) for v in value.split(',')]
+    point = [float(v) for v in value]
+    if len(point) == 2:
+        point.append(0.0)
+    if len(point) != 3:
+        raise ValueError(f"Expected a 2D or 3D position, got {value!r}")
+    return point
+
+
+class MobilityEngine:
+    """Move every station from one scheduler thread instead of one thread each
+
+    Trajectories are stored column-wise (start/end points, start/end times and
+    speed bounds, as in Table 2 of Readme.md) so each tick computes all
+    positions in a single NumPy step. Only stations whose position changed
+    since the previous tick get a setPosition call.
+    """
+
+    def __init__(self, rate=1.0):
+        if rate <= 0:
+            raise ValueError("Tick rate must be positive")
+        self.rate = float(rate)
+        self.nodes = []
+        self._specs = []
+        self._arrays = None
+        self._last = None
+        self._started = None
+        self._finished = None
+        self._thread = None
+        self._scheduler = None
+        self._done = threading.Event()
+
+    def add_trajectory(self, node, start, end, start_time, end_time,
+                       min_v=None, max_v=None):
+        """Register a linear move from start to end between two timestamps"""
+        if end_time < start_time:
+            raise ValueError(f"{node.name}: end time before start time")
+        self.nodes.append(node)
+        self._specs.append((_as_point(start), _as_point(end),
+                            float(start_time), float(end_time),
+                            np.nan if min_v is None else float(min_v),
+                            np.nan if max_v is None else float(max_v)))
+        self._arrays = None
+        return len(self.nodes) - 1
+
+    def _freeze(self):
+        """Build the trajectory arrays from the registered specs"""
+        if self._arrays is None:
+            count = len(self._specs)
+            start = np.array([s[0] for s in self._specs], dtype=float).reshape(count, 3)
+            end = np.array([s[1] for s in self._specs], dtype=float).reshape(count, 3)
+            t0 = np.array([s[2] for s in self._specs], dtype=float)
+            t1 = np.array([s[3] for s in self._specs], dtype=float)
+            self._arrays = {
+                'start': start,
+                'end': end,
+                't0': t0,
+                'span': np.maximum(t1 - t0, 1e-9),
+                't1': t1,
+                'min_v': np.array([s[4] for s in self._specs], dtype=float),
+                'max_v': np.array([s[5] for s in self._specs], dtype=float),
+            }
+            # Stations are assumed to sit at their start point already
+            self._last = start.copy()
+            self._started = np.zeros(count, dtype=bool)
+            self._finished = np.zeros(count, dtype=bool)
+        return self._arrays
+
+    @property
+    def duration(self):
+        """Time at which the last trajectory ends"""
+        arrays = self._freeze()
+        return float(arrays['t1'].max()) if len(self.nodes) else 0.0
+
+    def positions(self, t):
+        """Return an (N, 3) array with every station's position at time t"""
+        arrays = self._freeze()
+        frac = np.clip((t - arrays['t0']) / arrays['span'], 0.0, 1.0)
+        # Zero-length intervals arrive at their end time, not just after it
+        frac[t >= arrays['t1']] = 1.0
+        return arrays['start'] + (arrays['end'] - arrays['start']) * frac[:, None]
+
+    def speeds(self):
+        """Constant speed each station needs to finish its trajectory on time"""
+        arrays = self._freeze()
+        distance = np.linalg.norm(arrays['end'] - arrays['start'], axis=1)
+        return distance / arrays['span']
+
+    def speed_violations(self):
+        """Names of stations whose implied speed falls outside min_v/max_v"""
+        arrays = self._freeze()
+        speeds = self.speeds()
+        with np.errstate(invalid='ignore'):
+            bad = (speeds < arrays['min_v']) | (speeds > arrays['max_v'])
+        return [self.nodes[i].name for i in np.flatnonzero(bad)]
+
+    @profiled('mobility.tick', 'mobility')
+    def tick(self, t):
+        """Apply one batch of position updates for time t
+
+        Returns the number of setPosition calls issued.
+        """
+        arrays = self._freeze()
+        if not self.nodes:
+            return 0
+        pos = self.positions(t)
+        moved = np.any(pos != self._last, axis=1)
+        for i in np.flatnonzero(moved):
+            self.nodes[i].setPosition(format_position(pos[i]))
+        self._last[moved] = pos[moved]
+
+        starting = ~self._started & (t >= arrays['t0'])
+        for i in np.flatnonzero(starting):
+            info(f"*** {self.nodes[i].name.upper()} starting mobility\n")
+        self._started |= starting
+        finishing = ~self._finished & (t >= arrays['t1'])
+        for i in np.flatnonzero(finishing):
+            info(f"*** {self.nodes[i].name.upper()} mobility completed\n")
+        self._finished |= finishing
+        return int(moved.sum())
+
+    def schedule(self, scheduler, start=None, duration=None):
+        """Put this engine's ticks on an EventScheduler timeline
+
+        Ticks run every 1/rate seconds from `start` (default: now) and a
+        final tick lands exactly when the last trajectory ends.
+        """
+        start = scheduler.now() if start is None else start
+        duration = self.duration if duration is None else duration
+        end = start + duration
+
+        def tick():
+            self.tick(min(scheduler.now() - start, duration))
+
+        scheduler.every(1.0 / self.rate, tick, start=start, until=end,
+                        name='mobility-tick')
+        if (duration * self.rate) % 1:
+            scheduler.at(end, tick, name='mobility-tick')
+        return end
+
+    def run(self, duration=None):
+        """Tick at the configured rate until every trajectory has finished"""
+        try:
+            self.schedule(self._scheduler, duration=duration)
+            self._scheduler.run()
+        finally:
+            self._done.set()
+
+    def start(self, clock=None):
+        """Run the engine in a single background thread"""
+        self._freeze()
+        self._scheduler = EventScheduler(clock)
+        self._done.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread after the current tick"""
+        if self._scheduler is not None:
+            self._scheduler.stop()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait(self, timeout=None):
+        """Block until the engine has applied its final positions"""
+        return self._done.wait(timeout)
@@ -0,0 +1,320 @@
+"""Keep built networks alive and reset them between repeated runs
+
+Building a Mininet-WiFi topology (configureWifiNodes, build, start)
+takes tens of seconds, while most of what an experiment changes is a
+small amount of mutable state: station positions, daemons such as olsrd
+and iperf3, routes and ARP entries, and which AP each station is
+associated with. NetworkPool builds a topology once, snapshots that
+state, and on every later acquire() puts it back, checks that nothing
+is left over, and reports what the reset cost. A network that does not
+come back clean is torn down and rebuilt.
+
+Mininet nodes share the host's process table, so stopping daemons and
+Mininet's cleanup() reach every emulated network on the host. The pool
+therefore holds at most one emulated network at a time, and cleanup()
+runs only when the pool is closed.
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+
+from association import NOT_CONNECTED, int_to_mac, parse_iw_link
+from coverage import parse_position
+from executor import run_batch
+from mobility import format_position
+from profiling import phase
+from propagation import channel_frequency
+from scenario import load_scenario
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use without Mininet
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+# Processes an experiment may leave running in node namespaces
+RESET_DAEMONS = ('olsrd', 'iperf3', 'tcpdump')
+
+# setPosition takes centimetre precision
+POSITION_TOLERANCE = 0.01
+
+
+def _wireless(net):
+    return list(getattr(net, 'aps', [])) + list(getattr(net, 'stations', []))
+
+
+def _position(node):
+    position = getattr(node, 'position', None)
+    if position is None:
+        position = node.params.get('position', '0,0,0')
+    return tuple(float(v) for v in parse_position(position))
+
+
+def _interface(node):
+    return node.wintfs[0].name
+
+
+def _routes(output):
+    """Route entries of `route -n` output as a set of (dest, gateway, mask, iface)"""
+    entries = set()
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) >= 8 and fields[0][0].isdigit():
+            entries.add((fields[0], fields[1], fields[2], fields[7]))
+    return entries
+
+
+def _prefix(mask):
+    return sum(bin(int(part)).count('1') for part in mask.split('.'))
+
+
+class NetworkSnapshot:
+    """Mutable state of a freshly started network, to return to after each run"""
+
+    def __init__(self, net):
+        self.positions = {node.name: _position(node) for node in _wireless(net)}
+        self.bssids = {intf.mac: ap for ap in getattr(net, 'aps', [])
+                       for intf in ap.wintfs.values() if intf.mac}
+        stations = list(getattr(net, 'stations', []))
+        outputs = run_batch({sta: ['route -n', f'iw dev {_interface(sta)} link']
+                             for sta in stations}, timeout=5)
+        self.routes = {name: _routes(results[0].output) for name, results in outputs.items()}
+        self.associations = {name: self.serving_ap(results[1].output)
+                             for name, results in outputs.items()}
+
+    def serving_ap(self, output):
+        """Name of the AP (or the raw BSSID) an `iw dev ... link` output reports"""
+        bssid = parse_iw_link(output)[0]
+        if bssid == NOT_CONNECTED:
+            return None
+        ap = self.bssids.get(int_to_mac(bssid))
+        return ap.name if ap is not None else int_to_mac(bssid)
+
+
+class NetworkPool:
+    """Built networks keyed by name, reset instead of rebuilt on reuse
+
+    `factory` is whatever creates and starts the network (for example
+    create_network or create_adhoc_network). Each acquire() returns the
+    network together with a report: {'built': bool, 'elapsed': seconds,
+    'steps': {step: seconds}, 'clean': bool, 'problems': [...]}.
+    Building an emulated network releases any other emulated one first;
+    simulated networks can be pooled side by side.
+    """
+
+    def __init__(self, daemons=RESET_DAEMONS, timeout=5.0):
+        self.daemons = tuple(daemons)
+        self.timeout = timeout
+        self._entries = {}
+        self.reports = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def acquire(self, key, factory, *args, **kwargs):
+        """The pooled network for `key`, built on first use and reset after"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            report = self.reset(key)
+            if report['clean']:
+                return entry[0], report
+            info(f"*** Pool: {key} not clean after reset ({'; '.join(report['problems'])}), "
+                 f"rebuilding\n")
+            self.discard(key)
+        for other, (pooled, _) in list(self._entries.items()):
+            if not getattr(pooled, 'simulated', False):
+                info(f"*** Pool: releasing {other}, only one emulated network is pooled\n")
+                self.discard(other)
+        began = time.monotonic()
+        with phase('pool.build', 'pool'):
+            net = factory(*args, **kwargs)
+            snapshot = NetworkSnapshot(net)
+        self._entries[key] = (net, snapshot)
+        elapsed = time.monotonic() - began
+        report = {'key': key, 'built': True, 'elapsed': elapsed,
+                  'steps': {'build': elapsed}, 'clean': True, 'problems': []}
+        self.reports.append(report)
+        info(f"*** Pool: built {key} in {elapsed:.2f}s\n")
+        return net, report
+
+    def reset(self, key):
+        """Return the network for `key` to its snapshot and verify it"""
+        net, snapshot = self._entries[key]
+        steps = {}
+        began = time.monotonic()
+        with phase('pool.reset', 'pool'):
+            for step in (self._stop_daemons, self._restore_positions,
+                         self._restore_routes, self._restore_associations):
+                started = time.monotonic()
+                step(net, snapshot)
+                steps[step.__name__.strip('_')] = time.monotonic() - started
+            started = time.monotonic()
+            problems = self.verify(net, snapshot)
+            steps['verify'] = time.monotonic() - started
+        elapsed = time.monotonic() - began
+        report = {'key': key, 'built': False, 'elapsed': elapsed, 'steps': steps,
+                  'clean': not problems, 'problems': problems}
+        self.reports.append(report)
+        info(f"*** Pool: reset {key} in {elapsed * 1e3:.0f} ms"
+             f"{'' if not problems else f' with {len(problems)} problems'}\n")
+        return report
+
+    def _nodes(self, net):
+        return _wireless(net) + list(getattr(net, 'hosts', []))
+
+    def _stop_daemons(self, net, snapshot):
+        kill = '; '.join(f'pkill -x {name}' for name in self.daemons)
+        run_batch({node: kill for node in self._nodes(net)}, timeout=self.timeout)
+        # Daemons exit asynchronously; wait until none is left
+        deadline = time.monotonic() + self.timeout
+        while self._running(net) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _running(self, net):
+        plan = {node: [f'pgrep -x {name}' for name in self.daemons]
+                for node in self._nodes(net)}
+        found = []
+        for name, results in run_batch(plan, timeout=self.timeout).items():
+            found += [f'{daemon} on {name}' for daemon, result in zip(self.daemons, results)
+                      if result.output.strip()]
+        return found
+
+    def _restore_positions(self, net, snapshot):
+        for node in _wireless(net):
+            position = snapshot.positions[node.name]
+            if max(abs(a - b) for a, b in zip(_position(node), position)) > POSITION_TOLERANCE:
+                node.setPosition(format_position(position))
+
+    def _restore_routes(self, net, snapshot):
+        plan = {}
+        outputs = run_batch({sta: 'route -n' for sta in net.stations}, timeout=self.timeout)
+        for sta in net.stations:
+            commands = ['ip neigh flush all']
+            current = _routes(outputs[sta.name][0].output)
+            for dest, gateway, mask, iface in current - snapshot.routes[sta.name]:
+                via = '' if gateway == '0.0.0.0' else f' via {gateway}'
+                commands.append(f'ip route del {dest}/{_prefix(mask)}{via} dev {iface}')
+            for dest, gateway, mask, iface in snapshot.routes[sta.name] - current:
+                via = '' if gateway == '0.0.0.0' else f' via {gateway}'
+                commands.append(f'ip route add {dest}/{_prefix(mask)}{via} dev {iface}')
+            plan[sta] = commands
+        run_batch(plan, timeout=self.timeout)
+
+    def _associations(self, net, snapshot):
+        outputs = run_batch({sta: f'iw dev {_interface(sta)} link' for sta in net.stations},
+                            timeout=self.timeout)
+        return {name: snapshot.serving_ap(results[0].output)
+                for name, results in outputs.items()}
+
+    def _restore_associations(self, net, snapshot):
+        current = self._associations(net, snapshot)
+        plan = {}
+        for sta in net.stations:
+            wanted = snapshot.associations[sta.name]
+            if current[sta.name] == wanted:
+                continue
+            intf = _interface(sta)
+            commands = [f'iw dev {intf} disconnect']
+            if wanted is not None:
+                ap = net.get(wanted)
+                freq = int(round(channel_frequency(ap.params.get('channel', 1)) * 1000))
+                commands.append(f"iw dev {intf} connect {ap.params.get('ssid', '')} "
+                                f"{freq} {ap.wintfs[0].mac}")
+            plan[sta] = commands
+        if plan:
+            run_batch(plan, timeout=self.timeout)
+
+    def verify(self, net, snapshot):
+        """Descriptions of everything that differs from the snapshot"""
+        problems = [f'{entry} still running' for entry in self._running(net)]
+        for node in _wireless(net):
+            position = _position(node)
+            if max(abs(a - b) for a, b in zip(position, snapshot.positions[node.name])) > POSITION_TOLERANCE:
+                problems.append(f'{node.name} at {format_position(position)}')
+        outputs = run_batch({sta: 'route -n' for sta in net.stations}, timeout=self.timeout)
+        for name, results in outputs.items():
+            routes = _routes(results[0].output)
+            if routes != snapshot.routes[name]:
+                problems.append(f'{name} has {len(routes - snapshot.routes[name])} extra and '
+                                f'{len(snapshot.routes[name] - routes)} missing routes')
+        for name, serving in self._associations(net, snapshot).items():
+            if serving != snapshot.associations[name]:
+                problems.append(f'{name} associated with {serving}, '
+                                f'expected {snapshot.associations[name]}')
+        return problems
+
+    def discard(self, key):
+        """Stop and forget the network for `key`"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[0].stop()
+
+    def close(self):
+        """Stop every pooled network, then clean up after emulation"""
+        emulated = any(not getattr(net, 'simulated', False)
+                       for net, _ in self._entries.values())
+        for key in list(self._entries):
+            self.discard(key)
+        if emulated:
+            from mininet.clean import cleanup
+            cleanup()
+
+    def summary(self):
+        """Build vs reset cost over every acquire() so far"""
+        builds = [r['elapsed'] for r in self.reports if r['built']]
+        resets = [r['elapsed'] for r in self.reports if not r['built']]
+        return {'builds': len(builds), 'resets': len(resets),
+                'build_time': sum(builds) / len(builds) if builds else 0.0,
+                'reset_time': sum(resets) / len(resets) if resets else 0.0,
+                'dirty_resets': sum(1 for r in self.reports if not r['clean'])}
+
+
+def _load_task(task, scenario=None):
+    """(factory, experiment) for Task 1 or Task 2"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    if task == 1:
+        import task1_wifi_network as module
+        loaded = load_scenario(scenario) if scenario else None
+        return module.create_network, lambda net: module.run_experiment(net, scenario=loaded)
+    path = os.path.join(here, 'Task 2', 'task2_wifi_network.py')
+    spec = importlib.util.spec_from_file_location('task2_wifi_network', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    def experiment(net):
+        module.configure_olsr(net)
+        return module.test_icmp_connectivity(net)
+    return module.create_adhoc_network, experiment
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Repeat a task on one pooled network')
+    parser.add_argument('task', type=int, choices=(1, 2))
+    parser.add_argument('scenario', nargs='?', help='optional scenario file')
+    parser.add_argument('--trials', type=int, default=3)
+    args = parser.parse_args()
+    factory, experiment = _load_task(args.task, args.scenario)
+    with NetworkPool() as pool:
+        for trial in range(args.trials):
+            net, report = pool.acquire(f'task{args.task}', factory, args.scenario)
+            experiment(net)
+            steps = ', '.join(f'{step} {seconds * 1e3:.0f} ms'
+                              for step, seconds in report['steps'].items())
+            print(f"trial {trial + 1}: {'built' if report['built'] else 'reset'} in "
+                  f"{report['elapsed']:.2f}s ({steps})"
+                  + ('' if report['clean'] else f"; {'; '.join(report['problems'])}"))
+        summary = pool.summary()
+    print(f"build {summary['build_time']:.2f}s, reset {summary['reset_time'] * 1e3:.0f} ms "
+          f"on average over {summary['resets']} resets")
+
+
+if __name__ == '__main__':
+    main()
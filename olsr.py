@@ -0,0 +1,289 @@
+"""OLSR daemon startup and txtinfo-based convergence detection"""
+
+import time
+
+from executor import BatchExecutor
+from profiling import profiled
+from scheduler import RealTimeClock
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub nodes
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+TXTINFO_PORT = 2006
+
+
+def parse_txtinfo(text):
+    """Split olsrd txtinfo output into {table name: [row dicts]}
+
+    Works for /neighbors, /links, /routes and /topology (and any other
+    'Table: X' section); HTTP headers before the first table are ignored.
+    """
+    tables = {}
+    rows = header = None
+    for line in text.splitlines():
+        line = line.rstrip('\r')
+        if line.startswith('Table: '):
+            rows = tables.setdefault(line[7:].strip(), [])
+            header = None
+        elif rows is None:
+            continue
+        elif not line.strip():
+            # A blank line after the rows closes the table
+            if header is not None:
+                rows = header = None
+        elif header is None:
+            header = [column.strip() for column in line.split('\t')]
+        else:
+            values = [value.strip() for value in line.split('\t')]
+            rows.append(dict(zip(header, values)))
+    return tables
+
+
+def txtinfo_command(paths='/neighbors/routes', port=TXTINFO_PORT):
+    """Shell command querying the local txtinfo plugin"""
+    return f'echo "{paths}" | nc -w 1 127.0.0.1 {port} 2>/dev/null'
+
+
+def query_txtinfo(node, paths='/neighbors/routes', port=TXTINFO_PORT):
+    """Ask one node's olsrd for the given txtinfo tables"""
+    return parse_txtinfo(node.cmd(txtinfo_command(paths, port)))
+
+
+def route_destinations(tables):
+    """Set of destination IPs (without prefix length) in a Routes table"""
+    return {row.get('Destination', '').split('/')[0]
+            for row in tables.get('Routes', [])}
+
+
+@profiled('olsr.start')
+def start_olsr(stations, config_files, workers=16):
+    """Launch olsrd on every station in parallel; returns elapsed seconds"""
+    began = time.monotonic()
+    info(f"*** Starting OLSR on {', '.join(s.name for s in stations)}\n")
+    batch = {station: f"olsrd -f {config_files[station.name]} -d 1 &"
+             for station in stations}
+    with BatchExecutor(workers=max(1, min(workers, len(stations)))) as executor:
+        executor.run(batch)
+    return time.monotonic() - began
+
+
+@profiled('olsr.convergence')
+def wait_for_convergence(stations, timeout=60, interval=0.5, stable_polls=3,
+                         workers=16, clock=None):
+    """Poll txtinfo on all nodes until neighbor and route tables settle
+
+    A node is complete when it has at least one neighbor and a route to
+    every other station; the network has converged once every node is
+    complete and no route set changed for `stable_polls` polls in a row.
+    Returns a metrics dict with the convergence time (the first poll of
+    that stable run, or the last node's completion if later) and
+    per-node times.
+    Times are read from `clock` (real time by default).
+    """
+    clock = RealTimeClock() if clock is None else clock
+    ips = {station.name: station.IP() for station in stations}
+    complete_at = {}
+    previous = None
+    unchanged = 0
+    stable_since = 0.0
+    began = clock.now()
+    elapsed = 0.0
+    converged = False
+
+    query = {station: txtinfo_command() for station in stations}
+    with BatchExecutor(workers=max(1, min(workers, len(stations)))) as executor:
+        while elapsed <= timeout:
+            snapshot = {name: parse_txtinfo(output)
+                        for name, output in executor.outputs(query).items()}
+            elapsed = clock.now() - began
+            routes = {}
+            for name, tables in snapshot.items():
+                routes[name] = frozenset(route_destinations(tables))
+                others = set(ips.values()) - {ips[name]}
+                if tables.get('Neighbors') and others <= routes[name]:
+                    complete_at.setdefault(name, elapsed)
+                else:
+                    complete_at.pop(name, None)
+            if routes == previous:
+                unchanged += 1
+            else:
+                unchanged, stable_since = 0, elapsed
+            previous = routes
+            if len(complete_at) == len(stations) and unchanged >= stable_polls - 1:
+                converged = True
+                # The tables were already settled when the stable run began
+                elapsed = max([stable_since] + list(complete_at.values()))
+                break
+            clock.sleep_until(clock.now() + interval)
+
+    return {
+        'converged': converged,
+        'convergence_time': elapsed,
+        'node_complete_time': complete_at,
+        'routes': {name: sorted(dests) for name, dests in (previous or {}).items()},
+    }
+
+
+def _field(row, *prefixes):
+    """Value of the first column whose name starts with one of prefixes"""
+    for prefix in prefixes:
+        for key, value in row.items():
+            if key.startswith(prefix):
+                return value
+    return None
+
+
+def _number(value):
+    """txtinfo numbers, with INFINITE/missing costs mapped to inf"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('inf')
+
+
+class RoutingGraph:
+    """Routes, links and topology of every node at one point in time
+
+    routes:   {node: {destination: (gateway, metric, etx, interface)}}
+    links:    {(node, remote ip): (lq, nlq, cost)}
+    topology: {(destination ip, last hop ip): cost}, merged across nodes
+    """
+
+    def __init__(self, timestamp=None):
+        self.timestamp = timestamp
+        self.routes = {}
+        self.links = {}
+        self.topology = {}
+
+    @classmethod
+    def from_tables(cls, tables_by_node, timestamp=None):
+        """Build a graph from {node name: parse_txtinfo() result}"""
+        graph = cls(timestamp)
+        for node, tables in tables_by_node.items():
+            routes = graph.routes.setdefault(node, {})
+            for row in tables.get('Routes', []):
+                destination = _field(row, 'Destination')
+                routes[destination] = (_field(row, 'Gateway'),
+                                       _number(_field(row, 'Metric')),
+                                       _number(_field(row, 'ETX')),
+                                       _field(row, 'Interface'))
+            for row in tables.get('Links', []):
+                graph.links[(node, _field(row, 'Remote IP'))] = (
+                    _number(_field(row, 'LQ')), _number(_field(row, 'NLQ')),
+                    _number(_field(row, 'Cost')))
+            for row in tables.get('Topology', []):
+                graph.topology[(_field(row, 'Dest'), _field(row, 'Last hop'))] = (
+                    _number(_field(row, 'Cost')))
+        return graph
+
+    def edges(self):
+        """(node, remote ip, cost) for every one-hop link"""
+        return [(node, remote, values[2])
+                for (node, remote), values in self.links.items()]
+
+    def diff(self, newer):
+        """Changes from this snapshot to a newer one
+
+        Returns a dict with added/removed/changed routes per node, link
+        quality deltas and topology edges that appeared or vanished.
+        Empty lists everywhere mean nothing changed.
+        """
+        changes = {'added': [], 'removed': [], 'changed': [],
+                   'link_deltas': [], 'topology_added': [],
+                   'topology_removed': []}
+        for node in sorted(set(self.routes) | set(newer.routes)):
+            old = self.routes.get(node, {})
+            new = newer.routes.get(node, {})
+            for destination in sorted(set(new) - set(old)):
+                changes['added'].append((node, destination, new[destination]))
+            for destination in sorted(set(old) - set(new)):
+                changes['removed'].append((node, destination, old[destination]))
+            for destination in sorted(set(old) & set(new)):
+                if old[destination] != new[destination]:
+                    changes['changed'].append(
+                        (node, destination, old[destination], new[destination]))
+        for key in sorted(set(self.links) | set(newer.links)):
+            old = self.links.get(key)
+            new = newer.links.get(key)
+            if old != new:
+                old_lq = old[0] if old else 0.0
+                new_lq = new[0] if new else 0.0
+                changes['link_deltas'].append(
+                    (key[0], key[1], old_lq, new_lq, new_lq - old_lq))
+        changes['topology_added'] = sorted(set(newer.topology) - set(self.topology))
+        changes['topology_removed'] = sorted(set(self.topology) - set(newer.topology))
+        return changes
+
+
+def has_changes(changes):
+    """True when a RoutingGraph.diff() result is not empty"""
+    return any(changes.values())
+
+
+class TxtinfoClient:
+    """Pooled txtinfo client querying every node's olsrd concurrently
+
+    The worker pool is created once and reused for every snapshot, so
+    sampling during mobility costs one parallel round of shell commands.
+    sample() waits between polls on `clock` (real time by default; pass
+    clock_for(net) so simulated runs do not sleep).
+    """
+
+    def __init__(self, stations, workers=16, port=TXTINFO_PORT,
+                 paths='/links/routes/topology', clock=None):
+        self.stations = list(stations)
+        self.port = port
+        self.paths = paths
+        self.clock = RealTimeClock() if clock is None else clock
+        self._executor = BatchExecutor(
+            workers=max(1, min(workers, len(self.stations))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.close()
+
+    def run(self, command):
+        """Run one shell command on every node; returns {name: output}"""
+        return self._executor.outputs({station: command
+                                       for station in self.stations})
+
+    def snapshot(self):
+        """Query all nodes at once and return a RoutingGraph stamped with clock.now()"""
+        timestamp = self.clock.now()
+        outputs = self.run(txtinfo_command(self.paths, self.port))
+        tables = {name: parse_txtinfo(text) for name, text in outputs.items()}
+        return RoutingGraph.from_tables(tables, timestamp)
+
+    def sample(self, interval=1.0, count=None, stop=None):
+        """Yield (graph, changes) whenever routes or links change
+
+        Polls every `interval` seconds for `count` polls (forever when
+        None) or until the `stop` threading.Event is set. The first
+        snapshot is always yielded with changes relative to an empty graph.
+        """
+        previous = RoutingGraph()
+        polls = 0
+        while count is None or polls < count:
+            if stop is not None and stop.is_set():
+                return
+            began = self.clock.now()
+            graph = self.snapshot()
+            changes = previous.diff(graph)
+            if has_changes(changes):
+                yield graph, changes
+            previous = graph
+            polls += 1
+            if stop is not None and isinstance(self.clock, RealTimeClock):
+                # Return as soon as stop is set rather than at the next poll
+                stop.wait(max(began + interval - self.clock.now(), 0.0))
+            else:
+                self.clock.sleep_until(began + interval)
@@ -0,0 +1,211 @@
+"""Memory-mapped pcap reader with a compact, cached sidecar index"""
+
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from capture import PCAP_MAGIC, parse_packet
+
+
+INDEX_VERSION = 1
+
+FLOW_DTYPE = np.dtype([
+    ('proto', 'u1'),
+    ('src', 'U15'),
+    ('sport', 'u2'),
+    ('dst', 'U15'),
+    ('dport', 'u2'),
+])
+
+
+class PcapIndex:
+    """Random access to a pcap file by time window and by 5-tuple
+
+    The index holds one row per packet in parallel arrays (timestamp,
+    file offset, captured/original length, flow id) and is saved next to
+    the pcap as `<pcap>.idx.npz`; it is rebuilt automatically when the
+    pcap's size or mtime changes. Packet payloads are returned as
+    memoryview slices of the mapped file, so nothing is copied.
+    """
+
+    def __init__(self, path, index_path=None, rebuild=False):
+        self.path = path
+        self.index_path = index_path or path + '.idx.npz'
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        header = self._map[:24]
+        if header[:4] not in PCAP_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a pcap file")
+        self._endian, self._scale = PCAP_MAGIC[header[:4]]
+        self.linktype = struct.unpack(self._endian + 'I', header[20:24])[0]
+        if rebuild or not self._load():
+            self._build()
+            self._save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def close(self):
+        view, self._view = getattr(self, '_view', None), None
+        try:
+            if view is not None:
+                view.release()
+            if getattr(self, '_map', None) is not None:
+                self._map.close()
+        except BufferError:  # packet views still alive; freed with them
+            pass
+        finally:
+            self._map = None
+            self._file.close()
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns],
+                        dtype=np.int64)
+
+    def _load(self):
+        try:
+            with np.load(self.index_path) as data:
+                if not np.array_equal(data['signature'], self._signature()):
+                    return False
+                self.timestamps = data['timestamps']
+                self.offsets = data['offsets']
+                self.caplens = data['caplens']
+                self.lengths = data['lengths']
+                self.flow_ids = data['flow_ids']
+                self.flows = data['flows']
+        except (OSError, KeyError, ValueError):
+            return False
+        self._flow_lookup = {tuple(row): i for i, row in enumerate(self.flows.tolist())}
+        return True
+
+    def _build(self):
+        """Walk the mapped file once, recording where every packet lives"""
+        record = struct.Struct(self._endian + 'IIII')
+        size = len(self._map)
+        timestamps, offsets, caplens, lengths, flow_ids = [], [], [], [], []
+        self._flow_lookup = {}
+        position = 24
+        while position + 16 <= size:
+            seconds, fraction, caplen, length = record.unpack_from(self._map, position)
+            start = position + 16
+            if start + caplen > size:
+                break  # truncated final record
+            parsed = parse_packet(self._view[start:start + caplen], self.linktype)
+            flow = -1
+            if parsed is not None:
+                key = (parsed[0], parsed[1], parsed[3], parsed[2], parsed[4])
+                flow = self._flow_lookup.setdefault(key, len(self._flow_lookup))
+            timestamps.append(seconds + fraction * self._scale)
+            offsets.append(start)
+            caplens.append(caplen)
+            lengths.append(length)
+            flow_ids.append(flow)
+            position = start + caplen
+        self.timestamps = np.array(timestamps, dtype=np.float64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.caplens = np.array(caplens, dtype=np.uint32)
+        self.lengths = np.array(lengths, dtype=np.uint32)
+        self.flow_ids = np.array(flow_ids, dtype=np.int32)
+        flows = sorted(self._flow_lookup.items(), key=lambda item: item[1])
+        self.flows = np.array([key for key, _ in flows], dtype=FLOW_DTYPE)
+        # Captures are normally in time order; sort if a writer was not
+        if len(self.timestamps) and np.any(np.diff(self.timestamps) < 0):
+            order = np.argsort(self.timestamps, kind='stable')
+            for name in ('timestamps', 'offsets', 'caplens', 'lengths', 'flow_ids'):
+                setattr(self, name, getattr(self, name)[order])
+
+    def _save(self):
+        try:
+            with open(self.index_path, 'wb') as handle:
+                np.savez_compressed(handle, signature=self._signature(),
+                                    timestamps=self.timestamps,
+                                    offsets=self.offsets, caplens=self.caplens,
+                                    lengths=self.lengths,
+                                    flow_ids=self.flow_ids, flows=self.flows)
+        except OSError:
+            pass  # read-only location: keep the in-memory index only
+
+    @property
+    def start_time(self):
+        return float(self.timestamps[0]) if len(self) else 0.0
+
+    def flow_id(self, proto, src, sport, dst, dport):
+        """Index of a 5-tuple in `flows`, or -1 when it never appears"""
+        proto = {'tcp': 6, 'udp': 17}.get(proto, proto)
+        return self._flow_lookup.get((proto, src, sport, dst, dport), -1)
+
+    def window(self, t0=None, t1=None, relative=True):
+        """Slice of packet rows with t0 <= timestamp < t1
+
+        Times are seconds from the first packet unless relative=False.
+        """
+        base = self.start_time if relative else 0.0
+        lo = 0 if t0 is None else np.searchsorted(self.timestamps, base + t0, 'left')
+        hi = len(self) if t1 is None else np.searchsorted(self.timestamps, base + t1, 'left')
+        return slice(int(lo), int(hi))
+
+    def select(self, t0=None, t1=None, flow=None, relative=True):
+        """Row indices in a time window, optionally limited to one flow
+
+        `flow` is a flow id or a (proto, src, sport, dst, dport) tuple.
+        """
+        rows = self.window(t0, t1, relative)
+        if flow is None:
+            return np.arange(rows.start, rows.stop)
+        if not isinstance(flow, (int, np.integer)):
+            flow = self.flow_id(*flow)
+        return rows.start + np.flatnonzero(self.flow_ids[rows] == flow)
+
+    def packet(self, row):
+        """Zero-copy memoryview of one packet's captured bytes"""
+        start = int(self.offsets[row])
+        return self._view[start:start + int(self.caplens[row])]
+
+    def packets(self, rows):
+        """Yield (timestamp, memoryview) for each selected row"""
+        for row in rows:
+            yield float(self.timestamps[row]), self.packet(row)
+
+    def aggregate(self, interval=1.0, t0=None, t1=None, flow=None, relative=True):
+        """Per-window packet and byte counts for the selected packets
+
+        Returns a dict with window start times plus 'packets', 'bytes' and
+        'throughput_bps' arrays, and 'per_flow_bytes' shaped
+        (flows, windows) so every flow is aggregated in one pass.
+        """
+        rows = self.select(t0, t1, flow, relative)
+        base = self.start_time if relative else 0.0
+        # Without t0, windows start at the first packet in either mode
+        origin = base + t0 if t0 is not None else self.start_time
+        if len(rows):
+            end = base + t1 if t1 is not None else self.timestamps[rows[-1]]
+        else:
+            end = origin
+        windows = max(int(np.ceil((end - origin) / interval)), 1)
+        bins = ((self.timestamps[rows] - origin) // interval).astype(np.int64)
+        bins = np.clip(bins, 0, windows - 1)
+        sizes = self.lengths[rows].astype(np.float64)
+        packets = np.bincount(bins, minlength=windows)
+        volume = np.bincount(bins, weights=sizes, minlength=windows)
+        flow_ids = self.flow_ids[rows]
+        known = flow_ids >= 0
+        per_flow = np.zeros((len(self.flows), windows))
+        np.add.at(per_flow, (flow_ids[known], bins[known]), sizes[known])
+        return {
+            'window_start': origin - base + interval * np.arange(windows),
+            'packets': packets,
+            'bytes': volume,
+            'throughput_bps': volume * 8 / interval,
+            'per_flow_bytes': per_flow,
+        }
@@ -0,0 +1,222 @@
+"""Channel and transmit-power planning for AP layouts"""
+
+import numpy as np
+
+from coverage import parse_position
+from interference import channel_overlap, packet_error_rate
+from propagation import (DEFAULT_ANTENNA_GAIN, DEFAULT_TXPOWER, PropagationModel,
+                         channel_frequency, node_txpower, to_dbm, to_mw)
+
+CHANNELS_24GHZ = (1, 6, 11)
+CHANNELS_5GHZ = (36, 40, 44, 48)
+# hostapd modes tied to one band; n and ax follow the configured channel
+MODES_24GHZ = ('b', 'g')
+MODES_5GHZ = ('a', 'ac')
+TXPOWER_LEVELS = (8, 11, 14, 17, 20)
+
+# Best expected goodput (Mbit/s) over the OFDM rates, tabulated by SINR
+_SINR_GRID = np.arange(-10.0, 50.0, 0.1)
+_rates, _per = packet_error_rate(_SINR_GRID)
+_GOODPUT = (_rates[:, None] * (1.0 - _per)).max(axis=0)
+
+
+def goodput(sinr_db):
+    """Expected MAC-less goodput in Mbit/s at the given SINR"""
+    return np.interp(sinr_db, _SINR_GRID, _GOODPUT, left=0.0)
+
+
+class ChannelPlan:
+    """Channel and tx power per AP with its estimated aggregate throughput"""
+
+    def __init__(self, names, channels, txpower, throughput, baseline=None):
+        self.names = list(names)
+        self.channels = [int(c) for c in channels]
+        self.txpower = [float(p) for p in txpower]
+        self.throughput = float(throughput)
+        self.baseline = baseline
+
+    def overrides(self):
+        """{ap name: {'channel': ..., 'txpower': ...}} for Scenario.with_overrides"""
+        return {name: {'channel': str(channel), 'txpower': power}
+                for name, channel, power in zip(self.names, self.channels, self.txpower)}
+
+    def format(self):
+        lines = [f"{name}: channel {channel}, txpower {power:g} dBm"
+                 for name, channel, power in zip(self.names, self.channels, self.txpower)]
+        lines.append(f"estimated aggregate throughput: {self.throughput:.1f} Mbit/s")
+        if self.baseline is not None:
+            lines.append(f"hand-configured layout: {self.baseline:.1f} Mbit/s")
+        return '\n'.join(lines)
+
+
+class ChannelPlanner:
+    """Score channel/power assignments for a fixed AP and station layout
+
+    Path loss for every candidate channel is computed once; an assignment
+    is then scored with pure array indexing. Stations attach to their
+    strongest AP and get the goodput of their SINR shared with the other
+    stations of that AP and with every co-channel AP it can hear.
+    Batches of assignments are scored together, which is what makes the
+    local search cheap.
+    """
+
+    def __init__(self, aps, stations, model=None, channels=CHANNELS_24GHZ,
+                 txpower=TXPOWER_LEVELS, activity=0.5, cs_threshold=None):
+        self.model = PropagationModel() if model is None else model
+        self._aps, self._stations = list(aps), list(stations)
+        self.names = [ap['name'] for ap in aps]
+        self.channels = np.array(channels, dtype=int)
+        self.levels = np.array(txpower, dtype=float)
+        self.activity = float(activity)
+        self.cs_threshold = self.model.noise_th if cs_threshold is None else cs_threshold
+        ap_pos = np.array([parse_position(ap['position']) for ap in aps]).reshape(-1, 3)
+        sta_pos = np.array([parse_position(s['position']) for s in stations]).reshape(-1, 3)
+        self.ap_gain = np.array([float(ap.get('antennaGain', DEFAULT_ANTENNA_GAIN))
+                                 for ap in aps])
+        sta_gain = np.array([float(s.get('antennaGain', DEFAULT_ANTENNA_GAIN))
+                             for s in stations])
+        freq = np.array([channel_frequency(c) for c in self.channels])
+        d_as = np.linalg.norm(ap_pos[:, None] - sta_pos[None], axis=-1)
+        d_aa = np.linalg.norm(ap_pos[:, None] - ap_pos[None], axis=-1)
+        # (channels, APs, stations) and (channels, APs, APs) link budgets
+        self._as = (self.ap_gain[None, :, None] + sta_gain[None, None, :]
+                    - self.model.path_loss(d_as[None], freq[:, None, None])
+                    - self.model.fading_cof)
+        self._aa = (self.ap_gain[None, :, None] + self.ap_gain[None, None, :]
+                    - self.model.path_loss(d_aa[None], freq[:, None, None])
+                    - self.model.fading_cof)
+        self._rows = np.arange(len(aps))
+
+    def score(self, channel_idx, power_idx):
+        """Aggregate throughput (Mbit/s) of (K, APs) index assignments"""
+        channel_idx = np.atleast_2d(channel_idx)
+        power_idx = np.atleast_2d(power_idx)
+        count = channel_idx.shape[0]
+        power = self.levels[power_idx]
+        channel = self.channels[channel_idx]
+        rx = power[:, :, None] + self._as[channel_idx, self._rows]
+        serving = np.argmax(rx, axis=1)
+        signal = np.take_along_axis(rx, serving[:, None], axis=1)[:, 0]
+        serving_channel = np.take_along_axis(channel, serving, axis=1)
+        overlap = channel_overlap(channel[:, :, None], serving_channel[:, None, :])
+        heard = to_mw(rx) * overlap * self.activity
+        own = np.take_along_axis(heard, serving[:, None], axis=1)[:, 0]
+        interference = np.maximum(heard.sum(axis=1) - own, 0.0)
+        sinr = signal - to_dbm(interference + to_mw(self.model.noise_th))
+        rate = np.where(signal >= self.model.noise_th, goodput(sinr), 0.0)
+
+        # Co-channel APs within carrier sense range share airtime
+        rx_aa = power[:, :, None] + self._aa[channel_idx, self._rows]
+        sense = rx_aa >= self.cs_threshold
+        sense &= channel_overlap(channel[:, :, None], channel[:, None, :]) > 0
+        sense |= np.swapaxes(sense, 1, 2)
+        sense[:, self._rows, self._rows] = False
+        contention = 1 + sense.sum(axis=2)
+        load = np.zeros((count, len(self._rows)))
+        np.add.at(load, (np.arange(count)[:, None], serving), 1.0)
+        share = (np.take_along_axis(load, serving, axis=1)
+                 * np.take_along_axis(contention, serving, axis=1))
+        return (rate / share).sum(axis=1)
+
+    def color(self):
+        """Greedy graph colouring: strongest-coupled APs pick channels first"""
+        coupling = to_mw(self.levels.max() + self._aa.max(axis=0))
+        np.fill_diagonal(coupling, 0.0)
+        overlap = channel_overlap(self.channels[:, None], self.channels[None, :])
+        assigned = np.full(len(self._rows), -1)
+        for ap in np.argsort(-coupling.sum(axis=1)):
+            done = assigned >= 0
+            cost = (coupling[ap, done][None, :]
+                    * overlap[:, assigned[done]]).sum(axis=1)
+            assigned[ap] = int(np.argmin(cost))
+        return assigned
+
+    def plan(self, channels=None, txpower=None, max_rounds=20):
+        """Colour, then improve one AP at a time until a sweep changes nothing
+
+        Each AP's channel/power options are scored as one batch and the
+        best is kept. `channels`/`txpower` describe the hand-configured
+        layout; when given, its throughput is reported as the baseline.
+        """
+        count = len(self._rows)
+        channel_idx = self.color()
+        power_idx = np.full(count, len(self.levels) - 1)
+        best = self.score(channel_idx, power_idx)[0]
+        option_c, option_p = np.meshgrid(np.arange(len(self.channels)),
+                                         np.arange(len(self.levels)), indexing='ij')
+        option_c, option_p = option_c.ravel(), option_p.ravel()
+        for _ in range(max_rounds):
+            improved = False
+            for ap in range(count):
+                cand_c = np.repeat(channel_idx[None], len(option_c), axis=0)
+                cand_p = np.repeat(power_idx[None], len(option_p), axis=0)
+                cand_c[:, ap] = option_c
+                cand_p[:, ap] = option_p
+                scores = self.score(cand_c, cand_p)
+                k = int(np.argmax(scores))
+                if scores[k] > best + 1e-9:
+                    best = scores[k]
+                    channel_idx, power_idx = cand_c[k], cand_p[k]
+                    improved = True
+            if not improved:
+                break
+        baseline = None
+        if channels is not None:
+            baseline = self.evaluate(channels, txpower)
+        return ChannelPlan(self.names, self.channels[channel_idx],
+                           self.levels[power_idx], best, baseline)
+
+    def evaluate(self, channels, txpower=None):
+        """Throughput of an explicit assignment (channel numbers, dBm)"""
+        channels = [int(c) for c in channels]
+        txpower = [float(p) for p in (txpower or [DEFAULT_TXPOWER] * len(channels))]
+        known_c, known_p = self.channels.tolist(), self.levels.tolist()
+        if set(channels) - set(known_c) or set(txpower) - set(known_p):
+            # Outside the candidate sets: score with a widened planner
+            planner = ChannelPlanner(self._aps, self._stations, self.model,
+                                     sorted(set(known_c) | set(channels)),
+                                     sorted(set(known_p) | set(txpower)),
+                                     self.activity, self.cs_threshold)
+            return planner.evaluate(channels, txpower)
+        channel_idx = [known_c.index(c) for c in channels]
+        power_idx = [known_p.index(p) for p in txpower]
+        return float(self.score(channel_idx, power_idx)[0])
+
+
+def band_channels(aps):
+    """Non-overlapping channels of the band the APs' `mode` runs in
+
+    hostapd only accepts b/g on 2.4 GHz and a/ac on 5 GHz; for n and ax
+    the current channel decides. All APs must agree on one band.
+    """
+    bands = set()
+    for ap in aps:
+        mode = str(ap.get('mode', 'g'))
+        if mode in MODES_5GHZ:
+            bands.add(CHANNELS_5GHZ)
+        elif mode in MODES_24GHZ:
+            bands.add(CHANNELS_24GHZ)
+        else:
+            bands.add(CHANNELS_5GHZ if int(ap.get('channel', 1)) > 14 else CHANNELS_24GHZ)
+    if len(bands) > 1:
+        raise ValueError("APs run in different bands; pass the candidate channels")
+    return bands.pop() if bands else CHANNELS_24GHZ
+
+
+def plan_scenario(scenario, channels=None, txpower=TXPOWER_LEVELS, activity=0.5):
+    """Plan a Scenario's APs and return (plan, planned Scenario)
+
+    Candidate channels default to the non-overlapping set of the band
+    the APs' mode runs in (see band_channels). The returned scenario
+    carries the planned channel and txpower of every AP and can be
+    built or saved as is.
+    """
+    aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+    stations = [spec for spec in scenario.nodes if spec['kind'] == 'station']
+    current = [int(ap.get('channel', 1)) for ap in aps]
+    if channels is None:
+        channels = band_channels(aps)
+    model = scenario.propagation_model()
+    planner = ChannelPlanner(aps, stations, model, channels, txpower, activity)
+    plan = planner.plan(current, [node_txpower(ap, model) for ap in aps])
+    return plan, scenario.with_overrides(plan.overrides())
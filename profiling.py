@@ -0,0 +1,281 @@
+"""Phase timers, latency histograms and trace export for emulation runs
+
+A Profiler records spans (name, category, thread, start, duration) and
+keeps a log-bucketed histogram per span name. Spans come from
+`profiler.phase(...)` blocks, from functions decorated with @profiled
+(plot_network and each throttled frame among them), and from
+instrument_net(), which times every node's cmd() call. The
+result can be saved as a JSON summary and as a Chrome trace-event file
+(open it in chrome://tracing or https://ui.perfetto.dev).
+
+Profiling is off until enable() is called (WIFI_PROFILE=<prefix> does
+that in both task scripts); decorated functions then cost one global
+lookup per call.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Latency buckets: 10 us .. 1000 s, log spaced, plus overflow
+LATENCY_BINS = np.logspace(-5, 3, 33)
+
+_active = None
+
+
+class Histogram:
+    """Count, sum, min/max and log-bucketed counts of durations in seconds"""
+
+    def __init__(self):
+        self.counts = np.zeros(len(LATENCY_BINS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[np.searchsorted(LATENCY_BINS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Upper bucket edge below which `q` percent of samples fall"""
+        if not self.count:
+            return float('nan')
+        k = int(np.searchsorted(np.cumsum(self.counts), self.count * q / 100.0))
+        return float(LATENCY_BINS[k]) if k < len(LATENCY_BINS) else self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else float('nan'),
+            'min': self.min if self.count else float('nan'),
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {f'{edge:.0e}': int(n) for edge, n
+                        in zip(LATENCY_BINS, self.counts) if n},
+        }
+
+
+class Profiler:
+    """Thread-safe collector of timed spans"""
+
+    def __init__(self, max_spans=1000000):
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self.histograms = {}
+        self.threads = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def now(self):
+        return time.perf_counter() - self._origin
+
+    def record(self, name, category, start, end, args=None, depth=0):
+        """Add one finished span; times are seconds on this profiler's clock"""
+        thread = threading.current_thread()
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.histograms.setdefault(name, Histogram()).add(end - start)
+            if len(self.spans) < self.max_spans:
+                self.spans.append((name, category, thread.ident, start, end - start,
+                                   depth, args))
+            else:
+                self.dropped += 1
+
+    @contextmanager
+    def phase(self, name, category='phase', **args):
+        """Time the enclosed block as one span"""
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = self.now()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            self.record(name, category, start, self.now(), args or None, depth)
+
+    def wall_time(self):
+        with self._lock:
+            if not self.spans:
+                return 0.0
+            return max(s[3] + s[4] for s in self.spans) - min(s[3] for s in self.spans)
+
+    def utilization(self):
+        """{thread name: share of the profiled wall time spent inside spans}
+
+        Only outermost spans count, so nested phases are not double counted.
+        Executor workers show up by their thread names.
+        """
+        wall = self.wall_time()
+        busy = {}
+        with self._lock:
+            for _, _, ident, _, duration, depth, _ in self.spans:
+                if depth == 0:
+                    busy[ident] = busy.get(ident, 0.0) + duration
+            names = dict(self.threads)
+        return {names[ident]: (total / wall if wall else 0.0)
+                for ident, total in busy.items()}
+
+    def summary(self):
+        with self._lock:
+            histograms = {name: h.as_dict() for name, h in self.histograms.items()}
+        return {
+            'wall_time': self.wall_time(),
+            'spans': len(self.spans),
+            'dropped_spans': self.dropped,
+            'histograms': histograms,
+            'utilization': self.utilization(),
+        }
+
+    def save_json(self, path):
+        """Summary plus every span as plain JSON"""
+        with self._lock:
+            spans = [{'name': name, 'cat': category, 'thread': self.threads[ident],
+                      'start': start, 'duration': duration, 'depth': depth,
+                      'args': args or {}}
+                     for name, category, ident, start, duration, depth, args in self.spans]
+        document = dict(self.summary(), span_list=spans)
+        with open(path, 'w') as handle:
+            json.dump(document, handle, indent=1, default=str)
+        return path
+
+    def chrome_trace(self):
+        """Trace-event document: one complete ('X') event per span"""
+        pid = os.getpid()
+        with self._lock:
+            events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident,
+                       'args': {'name': name}} for ident, name in self.threads.items()]
+            for name, category, ident, start, duration, _, args in self.spans:
+                events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid,
+                               'tid': ident, 'ts': start * 1e6, 'dur': duration * 1e6,
+                               'args': args or {}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as handle:
+            json.dump(self.chrome_trace(), handle, default=str)
+        return path
+
+    def save(self, prefix):
+        """Write <prefix>.json and <prefix>.trace.json; returns both paths"""
+        return (self.save_json(prefix + '.json'),
+                self.save_chrome_trace(prefix + '.trace.json'))
+
+
+def enable(profiler=None):
+    """Make `profiler` (or a new one) the target of @profiled and instrument_net"""
+    global _active
+    _active = Profiler() if profiler is None else profiler
+    return _active
+
+
+def disable():
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active():
+    return _active
+
+
+def enable_from_env(variable='WIFI_PROFILE'):
+    """enable() when the variable is set; returns (profiler, output prefix)"""
+    prefix = os.environ.get(variable)
+    if not prefix:
+        return None, None
+    return enable(), prefix
+
+
+@contextmanager
+def phase(name, category='phase', **args):
+    """Profiler.phase on the active profiler, or nothing when disabled"""
+    if _active is None:
+        yield
+    else:
+        with _active.phase(name, category, **args):
+            yield
+
+
+def profiled(name=None, category='phase'):
+    """Decorator timing every call of a function as a span"""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with _active.phase(label, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# The scripts draw through renderer.plot_network, which records its own spans
+LIFECYCLE = ('configureWifiNodes', 'build', 'start', 'stop')
+
+
+def instrument_net(net, profiler=None):
+    """Time the network's lifecycle calls and every node's cmd()
+
+    cmd spans are named 'cmd <node>' so each node gets its own latency
+    histogram; the first word of the command is kept as an argument.
+    Wrappers are instance attributes and disappear with the network;
+    calling this again (e.g. once nodes exist) wraps only what is new.
+    """
+    profiler = profiler or _active
+    if profiler is None:
+        return net
+
+    def wrap(method, label, category, describe=None):
+        if getattr(method, '_profiled', False):
+            return method
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            extra = describe(args) if describe else {}
+            with profiler.phase(label, category, **extra):
+                return method(*args, **kwargs)
+        wrapper._profiled = True
+        return wrapper
+
+    for attribute in LIFECYCLE:
+        method = getattr(net, attribute, None)
+        if method is not None:
+            setattr(net, attribute, wrap(method, f'net.{attribute}', 'lifecycle'))
+
+    def command(args):
+        text = args[0] if args else ''
+        return {'command': (text if isinstance(text, str) else ' '.join(text)).split(' ')[0]}
+
+    nodes = list(getattr(net, 'stations', [])) + list(getattr(net, 'aps', []))
+    nodes += list(getattr(net, 'hosts', []))
+    for node in nodes:
+        node.cmd = wrap(node.cmd, f'cmd {node.name}', 'cmd', command)
+    return net
+
+
+def format_summary(summary, limit=20):
+    """Plain-text table of the slowest span names by total time"""
+    rows = sorted(summary['histograms'].items(), key=lambda item: -item[1]['total'])
+    lines = [f"{'span':<32} {'count':>6} {'total s':>9} {'mean ms':>9} {'p90 ms':>9}"]
+    for name, h in rows[:limit]:
+        lines.append(f"{name:<32} {h['count']:6d} {h['total']:9.3f} "
+                     f"{h['mean'] * 1e3:9.2f} {h['p90'] * 1e3:9.2f}")
+    for thread, share in sorted(summary['utilization'].items()):
+        lines.append(f"thread {thread}: {share:.0%} busy")
+    return '\n'.join(lines)
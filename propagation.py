@@ -0,0 +1,115 @@
+"""Vectorized propagation models following Mininet-WiFi's conventions"""
+
+import numpy as np
+
+SPEED_OF_LIGHT = 299792458.0
+
+# Mininet-WiFi defaults for wireless interfaces
+DEFAULT_TXPOWER = 14
+DEFAULT_ANTENNA_GAIN = 5
+
+
+def channel_frequency(channel):
+    """Centre frequency in GHz of a 2.4 GHz or 5 GHz channel number"""
+    channel = int(channel)
+    if channel == 14:
+        return 2.484
+    if 1 <= channel <= 13:
+        return 2.407 + 0.005 * channel
+    return 5.0 + 0.005 * channel
+
+
+def to_mw(dbm):
+    return np.power(10.0, np.asarray(dbm, dtype=float) / 10.0)
+
+
+def to_dbm(mw):
+    with np.errstate(divide='ignore'):
+        return 10.0 * np.log10(mw)
+
+
+class PropagationModel:
+    """Path loss and RSSI for arrays of distances
+
+    Mirrors the models Mininet-WiFi uses with setPropagationModel():
+    'friis' (free space with system loss `sl`) and 'logDistance' (free
+    space up to 1 m, then `exp` decay). `noise_th` and `fading_cof` are the
+    values handed to Mininet_wifi() and are used as the receiver floor
+    and the fading margin in dB.
+    """
+
+    def __init__(self, model='logDistance', exp=2.0, sl=1.0, noise_th=-91.0,
+                 fading_cof=0.0):
+        if model not in ('friis', 'logDistance'):
+            raise ValueError(f"Unsupported propagation model {model!r}")
+        self.model = model
+        self.exp = float(exp)
+        self.sl = float(sl)
+        self.noise_th = float(noise_th)
+        self.fading_cof = float(fading_cof)
+
+    def params(self):
+        """Plain dict of the parameters, e.g. for cache keys"""
+        return {'model': self.model, 'exp': self.exp, 'sl': self.sl,
+                'noise_th': self.noise_th, 'fading_cof': self.fading_cof}
+
+    def free_space_loss(self, distance, freq):
+        wavelength = SPEED_OF_LIGHT / (np.asarray(freq, dtype=float) * 1e9)
+        distance = np.maximum(np.asarray(distance, dtype=float), 0.1)
+        return 10.0 * np.log10((4 * np.pi * distance) ** 2 * self.sl / wavelength ** 2)
+
+    def path_loss(self, distance, freq):
+        """Path loss in dB; accepts arrays and broadcasts freq"""
+        if self.model == 'friis':
+            return self.free_space_loss(distance, freq)
+        reference = self.free_space_loss(1.0, freq)
+        distance = np.maximum(np.asarray(distance, dtype=float), 0.1)
+        return reference + 10.0 * self.exp * np.log10(distance)
+
+    def rssi(self, distance, freq, txpower=DEFAULT_TXPOWER,
+             tx_gain=DEFAULT_ANTENNA_GAIN, rx_gain=DEFAULT_ANTENNA_GAIN):
+        """Received signal strength in dBm"""
+        return (np.asarray(txpower, dtype=float) + tx_gain + rx_gain
+                - self.path_loss(distance, freq))
+
+    def max_distance(self, freq, txpower=DEFAULT_TXPOWER,
+                     tx_gain=DEFAULT_ANTENNA_GAIN, rx_gain=DEFAULT_ANTENNA_GAIN,
+                     threshold=None):
+        """Distance at which RSSI minus the fading margin hits the threshold"""
+        threshold = self.noise_th if threshold is None else threshold
+        budget = (np.asarray(txpower, dtype=float) + tx_gain + rx_gain
+                  - self.fading_cof - threshold)
+        reference = self.free_space_loss(1.0, freq)
+        exp = 2.0 if self.model == 'friis' else self.exp
+        return np.power(10.0, (budget - reference) / (10.0 * exp))
+
+    def range_txpower(self, distance, freq, gain=DEFAULT_ANTENNA_GAIN):
+        """Transmit power that puts the receiver floor at `distance`
+
+        Inverse of max_distance() for a receiver with the same antenna
+        gain, which is how a node's `range` sets its txpower.
+        """
+        return self.noise_th + self.fading_cof + self.path_loss(distance, freq) - 2 * gain
+
+
+def node_txpower(params, model, channel=None):
+    """txpower in dBm of an addAccessPoint()/addStation() keyword dict
+
+    An explicit 'txpower' wins; otherwise 'range' is converted with
+    model.range_txpower(), and DEFAULT_TXPOWER is used without either.
+    `channel` defaults to the node's own 'channel'.
+    """
+    if 'txpower' in params:
+        return float(params['txpower'])
+    if 'range' not in params:
+        return float(DEFAULT_TXPOWER)
+    channel = params.get('channel', 1) if channel is None else channel
+    gain = float(params.get('antennaGain', DEFAULT_ANTENNA_GAIN))
+    return float(model.range_txpower(float(params['range']), channel_frequency(channel), gain))
+
+
+def pairwise_distances(a, b):
+    """(len(a), len(b)) Euclidean distances between two point arrays"""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    return np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1))
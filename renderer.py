@@ -0,0 +1,428 @@
+"""Throttled off-screen topology rendering, decoupled from position updates
+
+Mininet-WiFi's plotGraph redraws the live matplotlib figure on every
+setPosition call, from whichever thread moved the node. ThrottledPlot
+instead only notes the latest position of each station; a render
+thread turns the pending moves into at most `fps` frames per second on
+an off-screen Agg canvas. Each frame restores the cached static
+background (axes, APs and their ranges) only under the rectangles the
+moved stations left and entered, and redraws just the artists there.
+
+render_trace() draws a recorded trace (traces.py) to a PNG sequence or,
+with ffmpeg installed, a video after the run.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from coverage import parse_position
+from profiling import phase, profiled
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use without Mininet
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+PLOT_MODES = ('live', 'throttled', 'off')
+
+
+def _matplotlib():
+    """Agg figure classes; imported lazily so headless tools need no display"""
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Circle
+        from matplotlib.transforms import Bbox
+    except ImportError as e:
+        raise RuntimeError("off-screen rendering needs matplotlib "
+                           "(pip install matplotlib)") from e
+    return Figure, FigureCanvasAgg, Circle, Bbox
+
+
+def node_spec(node):
+    """{'name', 'position', 'range'} for a Mininet-WiFi (or simulated) node"""
+    position = getattr(node, 'position', None)
+    if position is None:
+        position = node.params.get('position', '0,0,0')
+    intf = getattr(node, 'wintfs', {}).get(0)
+    radius = getattr(intf, 'range', None) or node.params.get('range')
+    return {'name': node.name, 'position': parse_position(position),
+            'range': float(radius) if radius else None}
+
+
+def _overlaps(a, b):
+    """Whether [x0, y0, x1, y1] boxes share any area; `a` may be columns"""
+    return (a[0] < b[2]) & (b[0] < a[2]) & (a[1] < b[3]) & (b[1] < a[3])
+
+
+class FrameRenderer:
+    """Off-screen figure with a static background and movable station artists"""
+
+    def __init__(self, aps, stations, max_x, max_y, min_x=0, min_y=0,
+                 size=(8, 5), dpi=80, show_range=True):
+        Figure, FigureCanvasAgg, Circle, self._Bbox = _matplotlib()
+        self.figure = Figure(figsize=size, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(1, 1, 1)
+        self.ax.set_xlim(min_x, max_x)
+        self.ax.set_ylim(min_y, max_y)
+        self.ax.set_xlabel('meters')
+        self.ax.set_ylabel('meters')
+        for ap in aps:
+            x, y = ap['position'][:2]
+            self.ax.plot([x], [y], 's', color='tab:blue')
+            self.ax.text(x, y, ap['name'], fontsize=8, ha='left', va='bottom')
+            if show_range and ap.get('range'):
+                self.ax.add_patch(Circle((x, y), ap['range'], fill=False,
+                                         color='tab:blue', alpha=0.3))
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+        self.artists = {}
+        for sta in stations:
+            x, y = sta['position'][:2]
+            group = [self.ax.plot([x], [y], 'o', color='tab:red', animated=True)[0],
+                     self.ax.text(x, y, sta['name'], fontsize=8, ha='left',
+                                  va='bottom', animated=True, clip_on=True)]
+            if show_range and sta.get('range'):
+                group.append(self.ax.add_patch(Circle((x, y), sta['range'], fill=False,
+                                                      color='tab:red', alpha=0.3,
+                                                      animated=True)))
+            self.artists[sta['name']] = group
+        self._renderer = self.canvas.get_renderer()
+        self._extents = {name: self._extent(name) for name in self.artists}
+        for group in self.artists.values():
+            for artist in group:
+                self.ax.draw_artist(artist)
+        self.frames = 0
+
+    @property
+    def shape(self):
+        width, height = self.canvas.get_width_height()
+        return height, width, 4
+
+    def _extent(self, name):
+        """Pixel-aligned box around a station's artists, or None off-canvas"""
+        boxes = [artist.get_window_extent(self._renderer) for artist in self.artists[name]]
+        box = self._Bbox.intersection(self._Bbox.union(boxes).padded(2), self.figure.bbox)
+        if box is None:
+            return None
+        return self._Bbox.from_extents(*np.floor(box.extents[:2]), *np.ceil(box.extents[2:]))
+
+    def _closure(self, boxes):
+        """Grow and merge dirty boxes until no station's artists cross an edge
+
+        Every artist touching a box then lies wholly inside it, so the box
+        can be restored and redrawn without clipping and matches a full
+        redraw pixel for pixel. Boxes are [x0, y0, x1, y1] arrays.
+        """
+        extents = np.array([box.extents for box in self._extents.values()
+                            if box is not None]).reshape(-1, 4)
+        boxes = [np.array(box.extents) for box in boxes]
+        changed = True
+        while changed:
+            changed = False
+            merged = []
+            for box in boxes:
+                for i, other in enumerate(merged):
+                    if _overlaps(other, box):
+                        merged[i] = np.r_[np.minimum(other[:2], box[:2]),
+                                          np.maximum(other[2:], box[2:])]
+                        changed = True
+                        break
+                else:
+                    merged.append(box)
+            boxes = merged
+            for i, box in enumerate(boxes):
+                touching = extents[_overlaps(extents.T, box)]
+                grown = np.r_[np.minimum(box[:2], touching[:, :2].min(axis=0, initial=box[0])),
+                              np.maximum(box[2:], touching[:, 2:].max(axis=0, initial=box[2]))]
+                if (grown != box).any():
+                    boxes[i] = grown
+                    changed = True
+        return boxes
+
+    def _move(self, name, x, y):
+        marker, label, *circle = self.artists[name]
+        marker.set_data([x], [y])
+        label.set_position((x, y))
+        if circle:
+            circle[0].set_center((x, y))
+
+    def render(self, moves):
+        """Apply {name: (x, y, ...)} moves and return the frame as RGBA pixels
+
+        Only the rectangles covering each moved station's old and new
+        extent (grown to whole neighbouring stations) are restored and
+        redrawn; when those cover most of the plot it redraws everything.
+        """
+        dirty = []
+        for name, position in moves.items():
+            if name not in self.artists:
+                continue
+            dirty.append(self._extents[name])
+            self._move(name, position[0], position[1])
+            self._extents[name] = self._extent(name)
+            dirty.append(self._extents[name])
+        boxes = self._closure([box for box in dirty if box is not None])
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+        if area > 0.5 * self.ax.bbox.width * self.ax.bbox.height:
+            # Dense clusters: a full redraw is cheaper than many merged boxes
+            self.frames += 1
+            return self.redraw()
+        height = self.figure.bbox.height
+        for box in boxes:
+            # Saved regions count rows from the top, display boxes from the bottom
+            x0, y0, x1, y1 = box
+            self.canvas.restore_region(self._background,
+                                       bbox=(x0, height - y1, x1, height - y0), xy=(0, 0))
+            for name, extent in self._extents.items():
+                if extent is not None and _overlaps(extent.extents, box):
+                    for artist in self.artists[name]:
+                        self.ax.draw_artist(artist)
+        self.frames += 1
+        return self.frame()
+
+    def frame(self):
+        return np.asarray(self.canvas.buffer_rgba()).copy()
+
+    def redraw(self):
+        """Restore the background and draw every station"""
+        self.canvas.restore_region(self._background)
+        for group in self.artists.values():
+            for artist in group:
+                self.ax.draw_artist(artist)
+        return self.frame()
+
+
+class FrameSink:
+    """Writes frames as a PNG sequence, a continuously replaced PNG, or a video"""
+
+    def __init__(self, output, fps, shape):
+        self.output = output
+        self.count = 0
+        self._ffmpeg = None
+        if output.endswith(('.mp4', '.webm', '.gif')):
+            ffmpeg = shutil.which('ffmpeg')
+            if ffmpeg is None:
+                raise RuntimeError("video output needs ffmpeg; use a directory "
+                                   "for a PNG sequence instead")
+            height, width, _ = shape
+            self._ffmpeg = subprocess.Popen(
+                [ffmpeg, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                 '-s', f'{width}x{height}', '-r', str(fps), '-i', '-', output],
+                stdin=subprocess.PIPE)
+        elif not output.endswith('.png'):
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, frame):
+        from matplotlib.image import imsave
+        if self._ffmpeg is not None:
+            self._ffmpeg.stdin.write(frame.tobytes())
+        elif self.output.endswith('.png'):
+            # Replace atomically so image viewers never see half a file
+            tmp = self.output + '.tmp.png'
+            imsave(tmp, frame)
+            os.replace(tmp, self.output)
+        else:
+            imsave(os.path.join(self.output, f'frame_{self.count:06d}.png'), frame)
+        self.count += 1
+
+    def close(self):
+        if self._ffmpeg is not None:
+            self._ffmpeg.stdin.close()
+            self._ffmpeg.wait()
+            self._ffmpeg = None
+
+
+class ThrottledPlot:
+    """Render station moves off-screen at a capped frame rate
+
+    setPosition on every station is wrapped to record the latest target
+    position only; no drawing happens on the caller's thread. Moves
+    arriving between two frames are coalesced into one. `output` is a
+    .png path rewritten with each frame (open it in an image viewer that
+    auto-reloads), a directory for a numbered PNG sequence, or a video
+    file.
+    """
+
+    def __init__(self, net, max_x, max_y, fps=5.0, output='topology.png',
+                 min_x=0, min_y=0, show_range=True):
+        self.fps = float(fps)
+        self.stations = list(net.stations)
+        self.renderer = FrameRenderer([node_spec(ap) for ap in net.aps],
+                                      [node_spec(sta) for sta in self.stations],
+                                      max_x, max_y, min_x, min_y,
+                                      show_range=show_range)
+        self.sink = FrameSink(output, self.fps, self.renderer.shape) if output else None
+        self.updates = 0
+        self.render_time = 0.0
+        self._pending = {}
+        self._previous = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _hook(self):
+        for node in self.stations:
+            # Keep any hook already installed so unhooking restores it
+            self._previous[node] = vars(node).get('setPosition')
+            original = node.setPosition
+
+            def hooked(position, *args, _node=node, _original=original, **kwargs):
+                result = _original(position, *args, **kwargs)
+                with self._lock:
+                    self._pending[_node.name] = parse_position(position)
+                    self.updates += 1
+                return result
+
+            node.setPosition = hooked
+
+    def _unhook(self):
+        for node, saved in self._previous.items():
+            if saved is not None:
+                node.setPosition = saved
+            else:
+                vars(node).pop('setPosition', None)
+        self._previous = {}
+
+    def render_pending(self):
+        """Draw one frame from the moves collected so far; False if none"""
+        with self._lock:
+            moves, self._pending = self._pending, {}
+        if not moves:
+            return False
+        began = time.perf_counter()
+        with phase('plot.frame', 'render', stations=len(moves)):
+            frame = self.renderer.render(moves)
+            if self.sink is not None:
+                self.sink.write(frame)
+        self.render_time += time.perf_counter() - began
+        return True
+
+    def _run(self):
+        period = 1.0 / self.fps
+        while not self._stop.wait(period):
+            self.render_pending()
+
+    def start(self):
+        self._hook()
+        if self.sink is not None:
+            self.sink.write(self.renderer.frame())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        info(f"*** Rendering topology off-screen at up to {self.fps:g} fps\n")
+        return self
+
+    def stop(self):
+        """Stop rendering after drawing whatever is still pending"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._unhook()
+        self.render_pending()
+        if self.sink is not None:
+            self.sink.close()
+        return self.stats()
+
+    def stats(self):
+        frames = self.renderer.frames
+        return {'updates': self.updates, 'frames': frames,
+                'coalesced': self.updates - frames if frames else self.updates,
+                'render_time': self.render_time,
+                'ms_per_frame': 1e3 * self.render_time / frames if frames else 0.0}
+
+
+@profiled('plot.network', 'render')
+def plot_network(net, max_x, max_y, mode=None, **options):
+    """plotGraph replacement honouring WIFI_PLOT=live|throttled|off
+
+    'live' calls Mininet-WiFi's own plotGraph, 'throttled' starts a
+    ThrottledPlot that net.stop() also stops, 'off' draws nothing.
+    WIFI_PLOT_FPS and WIFI_PLOT_OUTPUT set the throttled frame rate and
+    output.
+    """
+    mode = mode or os.environ.get('WIFI_PLOT', 'live')
+    if mode not in PLOT_MODES:
+        raise ValueError(f"unknown plot mode {mode!r}; expected one of {PLOT_MODES}")
+    if mode == 'live':
+        net.plotGraph(max_x=max_x, max_y=max_y, **options)
+        return None
+    if mode == 'off':
+        return None
+    options.setdefault('fps', float(os.environ.get('WIFI_PLOT_FPS', 5)))
+    options.setdefault('output', os.environ.get('WIFI_PLOT_OUTPUT', 'topology.png'))
+    plot = ThrottledPlot(net, max_x, max_y, **options).start()
+    original = net.stop
+
+    # Stopping the network flushes the last frame and ends the render thread
+    def stop(*args, **kwargs):
+        stats = plot.stop()
+        info(f"*** Topology: {stats['updates']} position updates drawn in "
+             f"{stats['frames']} frames ({stats['ms_per_frame']:.1f} ms/frame)\n")
+        return original(*args, **kwargs)
+
+    net.stop = stop
+    return plot
+
+
+def render_trace(trace, aps, max_x, max_y, output, fps=10.0, speed=1.0,
+                 start=None, end=None, show_range=True):
+    """Draw a recorded trace headlessly, one frame per 1/fps of trace time
+
+    `aps` are AP spec dicts (name, position, range); `speed` > 1 plays
+    the trace faster. Returns the number of frames written.
+    """
+    from traces import TraceCursor, TraceReader
+
+    with TraceReader(trace) as reader:
+        cursor = TraceCursor(reader)
+        start = reader.start_time if start is None else start
+        end = reader.end_time if end is None else end
+        first = cursor.advance(start)
+        stations = [{'name': name, 'position': np.nan_to_num(first[i], nan=-1e6),
+                     'range': None} for i, name in enumerate(reader.names)]
+        renderer = FrameRenderer([dict(ap, position=parse_position(ap['position']))
+                                  for ap in aps], stations, max_x, max_y,
+                                 show_range=show_range)
+        sink = FrameSink(output, fps, renderer.shape)
+        sink.write(renderer.frame())
+        last = first
+        for t in np.arange(start, end, speed / fps)[1:]:
+            positions = cursor.advance(t)
+            moved = np.flatnonzero(np.isfinite(positions).all(axis=1)
+                                   & np.any(positions != last, axis=1))
+            sink.write(renderer.render({reader.names[i]: positions[i] for i in moved}))
+            last = positions
+        sink.close()
+        return sink.count
+
+
+def main():
+    import argparse
+    from scenario import load_scenario
+
+    parser = argparse.ArgumentParser(description='Render a recorded trace over a scenario\'s APs')
+    parser.add_argument('trace', help='trace file written by traces.py')
+    parser.add_argument('scenario', help='scenario file providing APs and the plot area')
+    parser.add_argument('output', help='directory for PNG frames, or a video file')
+    parser.add_argument('--fps', type=float, default=10.0)
+    parser.add_argument('--speed', type=float, default=1.0)
+    args = parser.parse_args()
+    scenario = load_scenario(args.scenario)
+    area = scenario.data.get('plot') or {}
+    aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+    count = render_trace(args.trace, aps, area.get('max_x', 100), area.get('max_y', 100),
+                         args.output, fps=args.fps, speed=args.speed)
+    print(f"{count} frames written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""Append-only columnar store for run manifests and measurements
+
+Each run is a directory under the store root:
+
+    <root>/<run id>/manifest.json            scenario parameters, git hash, timings
+    <root>/<run id>/<table>/chunk-000000.npz compressed columns of one chunk
+
+Tables are appended to row-wise through ResultsWriter, whose append()
+only enqueues the rows; a writer thread turns them into columns and
+writes a compressed chunk whenever a table has `chunk_rows` rows or has
+held rows for `flush_interval` seconds, so the measurement loops never
+wait on disk or compression and slow tables still reach disk during the
+run. Chunks are written to a temporary name and renamed, and are never
+modified afterwards.
+
+ResultsStore reads the manifests to select runs and, since every column
+is its own member of the .npz archive, decompresses only the columns a
+query asks for. The record_* helpers turn the objects the task scripts
+already produce (connectivity matrices, association histories, iperf3
+documents, OLSR route diffs) into rows.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from association import NOT_CONNECTED, int_to_mac, parse_iw_link
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use without Mininet
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+MANIFEST = 'manifest.json'
+
+
+def git_revision(path=None):
+    """Commit hash of the checkout containing `path`, or None outside git"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=path or os.path.dirname(os.path.abspath(__file__)),
+                                timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _column(values, kind=None):
+    """numpy array for one column; None becomes NaN in numbers and '' in text
+
+    `kind` is the dtype kind the column has had in earlier chunks; it
+    decides how a chunk in which the column is entirely None is stored.
+    """
+    array = np.asarray(values)
+    if array.dtype != object:
+        return array
+    if kind in ('U', 'S') and all(value is None for value in values):
+        return np.full(len(values), '')
+    if all(value is None or isinstance(value, (int, float, np.number)) for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    return np.array(['' if value is None else str(value) for value in values])
+
+
+def _write_json(path, document):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as handle:
+        json.dump(document, handle, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+class ResultsWriter:
+    """One run's manifest and tables, written by a background thread
+
+    `params` (scenario parameters, backend, ...) go into the manifest
+    verbatim; timings added with timing()/timed() are written when the
+    run is closed. The manifest also records each column's dtype kind
+    from the first chunk in which it has a value.
+    """
+
+    def __init__(self, root='results', params=None, run_id=None, chunk_rows=65536,
+                 flush_interval=10.0):
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.directory = os.path.join(root, self.run_id)
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        os.makedirs(self.directory)
+        self.manifest = {'run': self.run_id, 'status': 'running', 'params': params or {},
+                         'git': git_revision(), 'started': time.time(), 'timings': {},
+                         'tables': {}}
+        _write_json(os.path.join(self.directory, MANIFEST), self.manifest)
+        self._buffers = {}
+        self._since = {}
+        self._queue = queue.SimpleQueue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f'results-{self.run_id}')
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close('failed' if exc[0] is not None else 'complete')
+
+    def append(self, table, rows):
+        """Queue rows for `table`: a list of dicts or a dict of equal-length columns"""
+        if isinstance(rows, dict):
+            rows = {name: values.tolist() if isinstance(values, np.ndarray) else list(values)
+                    for name, values in rows.items()}
+        else:
+            rows = list(rows)
+        if rows:
+            self._queue.put((table, rows))
+
+    def timing(self, name, seconds):
+        self.manifest['timings'][name] = seconds
+
+    @contextmanager
+    def timed(self, name):
+        """Record the duration of the enclosed block as a manifest timing"""
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timing(name, time.monotonic() - began)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._timeout())
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            try:
+                if item:
+                    self._add(*item)
+                self._flush_due()
+            except Exception as e:  # surfaced by close(); keep draining the queue
+                self._error = self._error or e
+
+    def _timeout(self):
+        """Seconds until the oldest buffered table is due, None to block"""
+        if self.flush_interval is None or not self._since:
+            return None
+        return max(min(self._since.values()) + self.flush_interval - time.monotonic(), 0.0)
+
+    def _flush_due(self):
+        if self.flush_interval is None:
+            return
+        now = time.monotonic()
+        for table, since in list(self._since.items()):
+            if now - since >= self.flush_interval:
+                self._flush(table)
+
+    def _add(self, table, rows):
+        self._since.setdefault(table, time.monotonic())
+        buffer = self._buffers.setdefault(table, {})
+        if isinstance(rows, dict):
+            length = len(next(iter(rows.values())))
+            columns = rows
+        else:
+            length = len(rows)
+            names = list(dict.fromkeys(name for row in rows for name in row))
+            columns = {name: [row.get(name) for row in rows] for name in names}
+        filled = len(next(iter(buffer.values()))) if buffer else 0
+        for name in list(buffer) + [name for name in columns if name not in buffer]:
+            buffer.setdefault(name, [None] * filled).extend(columns.get(name, [None] * length))
+        if filled + length >= self.chunk_rows:
+            self._flush(table)
+
+    def _flush(self, table):
+        self._since.pop(table, None)
+        buffer = self._buffers.pop(table, None)
+        if not buffer:
+            return
+        entry = self.manifest['tables'].setdefault(table, {'rows': 0, 'chunks': 0,
+                                                           'columns': {}})
+        kinds = entry['columns']
+        directory = os.path.join(self.directory, table)
+        os.makedirs(directory, exist_ok=True)
+        columns = {name: _column(values, kinds.get(name)) for name, values in buffer.items()}
+        path = os.path.join(directory, f"chunk-{entry['chunks']:06d}.npz")
+        with open(path + '.tmp', 'wb') as handle:
+            np.savez_compressed(handle, **columns)
+        os.replace(path + '.tmp', path)
+        entry['rows'] += len(next(iter(columns.values())))
+        entry['chunks'] += 1
+        for name, values in buffer.items():
+            # A column that is all None here has no kind of its own yet
+            if name not in kinds and any(value is not None for value in values):
+                kinds[name] = columns[name].dtype.kind
+
+    def close(self, status='complete'):
+        """Flush every table and finish the manifest; returns the run id"""
+        if self._thread is None:
+            return self.run_id
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for table in list(self._buffers):
+            self._flush(table)
+        self.manifest.update(status=status if self._error is None else 'failed',
+                             finished=time.time())
+        self.manifest['duration'] = self.manifest['finished'] - self.manifest['started']
+        if self._error is not None:
+            self.manifest['error'] = repr(self._error)
+        _write_json(os.path.join(self.directory, MANIFEST), self.manifest)
+        info(f"*** Results of run {self.run_id} stored in {self.directory}\n")
+        return self.run_id
+
+
+def open_from_env(params=None, variable='WIFI_RESULTS'):
+    """A ResultsWriter under the directory named by the variable, or None"""
+    root = os.environ.get(variable)
+    if not root:
+        return None
+    return ResultsWriter(root, params)
+
+
+@contextmanager
+def timed(writer, name):
+    """ResultsWriter.timed, or nothing when results are not being stored"""
+    if writer is None:
+        yield
+    else:
+        with writer.timed(name):
+            yield
+
+
+class ResultsStore:
+    """Read side: select runs by their manifests and load chosen columns"""
+
+    def __init__(self, root='results', workers=8):
+        self.root = root
+        self.workers = workers
+
+    def runs(self, status='complete', **params):
+        """Manifests of runs whose params match every keyword, oldest first"""
+        manifests = []
+        if not os.path.isdir(self.root):
+            return manifests
+        for name in sorted(os.listdir(self.root)):
+            try:
+                with open(os.path.join(self.root, name, MANIFEST)) as handle:
+                    manifest = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            if status is not None and manifest.get('status') != status:
+                continue
+            if all(manifest['params'].get(key) == value for key, value in params.items()):
+                manifests.append(manifest)
+        return manifests
+
+    def _chunks(self, run, table):
+        directory = os.path.join(self.root, run, table)
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith('.npz')]
+
+    @staticmethod
+    def _read(path, columns):
+        with np.load(path) as archive:
+            names = archive.files if columns is None else columns
+            length = len(archive[archive.files[0]])
+            return {name: archive[name] for name in names if name in archive.files}, length
+
+    def load(self, table, columns=None, runs=None, **params):
+        """{column: array} of `table` over the selected runs, plus a 'run' column
+
+        `runs` is a list of run ids (default: every complete run whose
+        params match the keywords). Only the named columns are read.
+        """
+        if runs is None:
+            runs = [manifest['run'] for manifest in self.runs(**params)]
+        jobs = [(run, path) for run in runs for path in self._chunks(run, table)]
+        if not jobs:
+            return {name: np.array([]) for name in (columns or []) + ['run']}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            parts = list(pool.map(lambda job: self._read(job[1], columns), jobs))
+        names = columns or list(dict.fromkeys(name for part, _ in parts for name in part))
+        result = {}
+        for name in names:
+            # Chunks written before a column existed read as NaN (or '' for
+            # text), as do text columns that were all None before their
+            # kind was known and so were stored as NaN
+            kinds = {part[name].dtype.kind for part, _ in parts if name in part}
+            text = bool(kinds & {'U', 'S'})
+            fill = '' if text else np.nan
+            result[name] = np.concatenate([
+                part[name] if name in part and not (text and part[name].dtype.kind == 'f')
+                else np.full(length, fill) for part, length in parts])
+        result['run'] = np.concatenate([np.full(length, run)
+                                        for (run, _), (_, length) in zip(jobs, parts)])
+        return result
+
+
+def record_connectivity(writer, matrix, t=None):
+    """One 'ping' row per probed pair of a ConnectivityMatrix"""
+    t = time.time() if t is None else t
+    writer.append('ping', [dict(matrix.get(src, dst), t=t, src=src, dst=dst)
+                           for src, dst in matrix.pairs()])
+
+
+def record_association_history(writer, history, bssid_names=None):
+    """Every sample of an AssociationHistory as 'rssi' rows"""
+    names = bssid_names or {}
+    for name in history.names:
+        times, bssid, signal, bitrate = history.series(name)
+        aps = [None if value == NOT_CONNECTED else
+               names.get(int_to_mac(value), int_to_mac(value)) for value in bssid]
+        writer.append('rssi', {'t': times, 'station': [name] * len(times), 'ap': aps,
+                               'signal': signal, 'tx_bitrate': bitrate})
+
+
+def record_iw_link(writer, outputs, bssid_names=None, t=None):
+    """'associations' rows from {station: `iw dev ... link` output}, raw text kept"""
+    t = time.time() if t is None else t
+    names = bssid_names or {}
+    rows = []
+    for station, output in outputs.items():
+        bssid, signal, bitrate = parse_iw_link(output)
+        connected = bssid != NOT_CONNECTED
+        rows.append({'t': t, 'station': station,
+                     'ap': names.get(int_to_mac(bssid), int_to_mac(bssid)) if connected else None,
+                     'signal': signal, 'tx_bitrate': bitrate, 'raw': output})
+    writer.append('associations', rows)
+
+
+def record_handovers(writer, handovers):
+    """(time, station, old, new) tuples as 'handovers' rows"""
+    writer.append('handovers', [{'t': t, 'station': station, 'old': old, 'new': new}
+                                for t, station, old, new in handovers])
+
+
+def record_iperf(writer, document, flow='', t=None):
+    """Per-interval 'throughput' rows of an iperf3 JSON document"""
+    t = time.time() if t is None else t
+    rows = []
+    for interval in document.get('intervals', []):
+        total = interval.get('sum', {})
+        streams = interval.get('streams', [])
+        rtts = [stream['rtt'] for stream in streams if 'rtt' in stream]
+        rows.append({'t': t, 'flow': flow, 'start': total.get('start'),
+                     'end': total.get('end'), 'bits_per_second': total.get('bits_per_second'),
+                     'retransmits': total.get('retransmits'),
+                     'snd_cwnd': sum(stream.get('snd_cwnd', 0) for stream in streams),
+                     'rtt_us': sum(rtts) / len(rtts) if rtts else None})
+    writer.append('throughput', rows)
+
+
+def interval_recorder(writer, flow='', on_sample=None):
+    """on_sample callback for stream_iperf that stores each interval as it arrives"""
+    def record(sample):
+        writer.append('throughput', [{'t': time.time(), 'flow': flow,
+                                      'start': sample.get('start'), 'end': sample.get('end'),
+                                      'bits_per_second': sample.get('bits_per_second'),
+                                      'retransmits': sample.get('retransmits'),
+                                      'snd_cwnd': sample.get('snd_cwnd'),
+                                      'rtt_us': sample.get('rtt_us')}])
+        if on_sample is not None:
+            on_sample(sample)
+    return record
+
+
+def record_route_changes(writer, churn):
+    """'route_changes' rows from [(timestamp, RoutingGraph.diff())]"""
+    rows = []
+    for t, changes in churn:
+        for kind in ('added', 'removed', 'changed'):
+            for entry in changes[kind]:
+                node, destination, route = entry[0], entry[1], entry[-1]
+                gateway, metric, etx, interface = route
+                rows.append({'t': t, 'node': node, 'destination': destination,
+                             'change': kind, 'gateway': gateway, 'metric': metric,
+                             'etx': etx, 'interface': interface})
+    writer.append('route_changes', rows)
+
+
+def record_routes(writer, graph, t=None):
+    """A RoutingGraph's route tables as 'routes' rows"""
+    t = getattr(graph, 'timestamp', None) if t is None else t
+    t = time.time() if t is None else t
+    writer.append('routes', [{'t': t, 'node': node, 'destination': destination,
+                              'gateway': gateway, 'metric': metric, 'etx': etx,
+                              'interface': interface}
+                             for node, routes in sorted(graph.routes.items())
+                             for destination, (gateway, metric, etx, interface)
+                             in sorted(routes.items())])
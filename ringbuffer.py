@@ -0,0 +1,67 @@
+"""Fixed-size, array-backed ring buffer for measurement samples"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Keep the newest `capacity` records in a preallocated NumPy array
+
+    `fields` is a list of (name, dtype) pairs; records are appended as
+    dicts or tuples in field order. Memory stays constant no matter how
+    long the producer runs.
+    """
+
+    def __init__(self, capacity, fields):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(list(fields))
+        self._data = np.zeros(self.capacity, dtype=self.dtype)
+        self._next = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, record):
+        """Store one record, overwriting the oldest when full"""
+        if isinstance(record, dict):
+            record = tuple(record[name] for name in self.dtype.names)
+        self._data[self._next] = record
+        self._next = (self._next + 1) % self.capacity
+        self.total += 1
+
+    def extend(self, records):
+        """Store a structured array (or list of tuples) in one step"""
+        records = np.asarray(records, dtype=self.dtype)
+        if len(records) >= self.capacity:
+            self._data[:] = records[-self.capacity:]
+            self._next = 0
+        else:
+            end = self._next + len(records)
+            if end <= self.capacity:
+                self._data[self._next:end] = records
+            else:
+                split = self.capacity - self._next
+                self._data[self._next:] = records[:split]
+                self._data[:end - self.capacity] = records[split:]
+            self._next = end % self.capacity
+        self.total += len(records)
+
+    def values(self):
+        """Records in arrival order, oldest first (a copy)"""
+        if self.total < self.capacity:
+            return self._data[:self._next].copy()
+        return np.concatenate((self._data[self._next:], self._data[:self._next]))
+
+    def latest(self, count=1):
+        """The newest `count` records, oldest first"""
+        return self.values()[-count:] if count else self.values()[:0]
+
+    def __getitem__(self, field):
+        """Column view of one field in arrival order"""
+        return self.values()[field]
+
+    def clear(self):
+        self._next = 0
+        self.total = 0
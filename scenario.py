@@ -0,0 +1,416 @@
+"""Declarative YAML/JSON scenarios with generators and bulk node creation"""
+
+import ipaddress
+import json
+import os
+
+import numpy as np
+
+from association import int_to_mac, mac_to_int
+from mesh import plan_mesh
+from propagation import PropagationModel
+from mobility import _as_point, format_position
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub networks
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+NODE_SECTIONS = ('aps', 'stations')
+GENERATOR_KEYS = {
+    'grid': {'generate', 'prefix', 'start', 'rows', 'cols', 'spacing', 'origin'},
+    'random': {'generate', 'prefix', 'start', 'count', 'box', 'seed'},
+}
+LINK_KEYS = ('nodes', 'chain', 'mesh')
+# Link classes that join one node to a wireless network rather than a pair
+WIRELESS_LINKS = ('adhoc', 'mesh')
+# Keys every mobility entry needs; min_v/max_v are optional
+MOBILITY_KEYS = ('name', 'start', 'end', 'start_time', 'end_time')
+TOP_LEVEL_KEYS = {'network', 'propagation', 'plot', 'defaults', 'addressing',
+                  'aps', 'stations', 'links', 'mobility'}
+
+
+class ScenarioError(ValueError):
+    """A scenario file that cannot be turned into a network"""
+
+
+def _fail(where, message):
+    raise ScenarioError(f"{where}: {message}")
+
+
+def _point(where, value):
+    try:
+        return _as_point(value)
+    except (TypeError, ValueError):
+        _fail(where, f"expected an x,y[,z] position, got {value!r}")
+
+
+def _count(where, entry, key):
+    value = entry.get(key)
+    if not isinstance(value, int) or value < 0:
+        _fail(where, f"'{key}' must be a non-negative integer, got {value!r}")
+    return value
+
+
+def grid_positions(where, entry):
+    """(rows * cols, 3) positions of a `generate: grid` entry"""
+    rows, cols = _count(where, entry, 'rows'), _count(where, entry, 'cols')
+    spacing = entry.get('spacing', [10, 10])
+    if not isinstance(spacing, (list, tuple)) or len(spacing) != 2:
+        _fail(where, f"'spacing' must be [dx, dy], got {spacing!r}")
+    origin = _point(where, entry.get('origin', [0, 0, 0]))
+    iy, ix = np.mgrid[0:rows, 0:cols]
+    return np.column_stack((origin[0] + ix.ravel() * float(spacing[0]),
+                            origin[1] + iy.ravel() * float(spacing[1]),
+                            np.full(rows * cols, origin[2])))
+
+
+def random_positions(where, entry):
+    """(count, 3) uniformly placed positions of a `generate: random` entry"""
+    count = _count(where, entry, 'count')
+    box = entry.get('box')
+    if not isinstance(box, (list, tuple)) or len(box) != 2:
+        _fail(where, f"'box' must be [[x0, y0, z0], [x1, y1, z1]], got {box!r}")
+    low, high = _point(where, box[0]), _point(where, box[1])
+    rng = np.random.default_rng(entry.get('seed'))
+    return rng.uniform(low, high, size=(count, 3))
+
+
+GENERATORS = {'grid': grid_positions, 'random': random_positions}
+
+
+class AddressPool:
+    """Hand out IPs and MACs in order, skipping ones assigned explicitly"""
+
+    def __init__(self, network='10.0.0.0/8', mac='02:00:00:00:00:00', mac_step=256,
+                 start=1):
+        self.network = ipaddress.ip_network(network, strict=False)
+        self._host = int(self.network.network_address) + start
+        self._mac = mac_to_int(mac) + start * mac_step
+        self.mac_step = mac_step
+        self.used_ips = set()
+        self.used_macs = set()
+
+    def reserve(self, where, ip=None, mac=None):
+        if ip is not None:
+            address = ip.split('/')[0]
+            if address in self.used_ips:
+                _fail(where, f"duplicate IP {address}")
+            self.used_ips.add(address)
+        if mac is not None:
+            if mac.lower() in self.used_macs:
+                _fail(where, f"duplicate MAC {mac}")
+            self.used_macs.add(mac.lower())
+
+    def next_ip(self, where):
+        while str(ipaddress.ip_address(self._host)) in self.used_ips:
+            self._host += 1
+        address = ipaddress.ip_address(self._host)
+        if address not in self.network or address == self.network.broadcast_address:
+            _fail(where, f"address pool {self.network} exhausted")
+        self.used_ips.add(str(address))
+        return f'{address}/{self.network.prefixlen}'
+
+    def next_mac(self):
+        while int_to_mac(self._mac) in self.used_macs:
+            self._mac += self.mac_step
+        mac = int_to_mac(self._mac)
+        self.used_macs.add(mac)
+        return mac
+
+
+class Scenario:
+    """A validated scenario description, expanded into node specs on demand
+
+    Node specs are plain dicts of addAccessPoint()/addStation() keywords
+    plus 'name' and 'kind'; they are only generated when first needed, and
+    build() creates every node and link in one pass over them.
+    """
+
+    def __init__(self, data, source='<scenario>'):
+        if not isinstance(data, dict):
+            _fail(source, "top level must be a mapping")
+        unknown = set(data) - TOP_LEVEL_KEYS
+        if unknown:
+            _fail(source, f"unknown sections {sorted(unknown)}")
+        self.data = data
+        self.source = source
+        self._nodes = None
+        self._links = None
+
+    @property
+    def nodes(self):
+        """Every node spec, generators expanded and addresses assigned"""
+        if self._nodes is None:
+            self._nodes = self._expand()
+        return self._nodes
+
+    @property
+    def links(self):
+        """Deduplicated (a, b, params) link triples
+
+        Ad-hoc and mesh links join a single node to the wireless network,
+        so they appear once per node with b set to None.
+        """
+        if self._links is None:
+            self._links = self._expand_links()
+        return self._links
+
+    def names(self, kind=None):
+        return [node['name'] for node in self.nodes
+                if kind is None or node['kind'] == kind]
+
+    def _expand(self):
+        addressing = self.data.get('addressing') or {}
+        pool = AddressPool(**addressing)
+        defaults = self.data.get('defaults') or {}
+        nodes = []
+        # Explicit addresses are reserved first so generated ones avoid them
+        for section in NODE_SECTIONS:
+            for i, entry in enumerate(self.data.get(section) or []):
+                if isinstance(entry, dict) and 'generate' not in entry:
+                    pool.reserve(f'{self.source}: {section}[{i}]',
+                                 entry.get('ip'), entry.get('mac'))
+        for section in NODE_SECTIONS:
+            kind = section[:-1]
+            base = dict(defaults.get(kind) or {})
+            for i, entry in enumerate(self.data.get(section) or []):
+                where = f'{self.source}: {section}[{i}]'
+                if not isinstance(entry, dict):
+                    _fail(where, "expected a mapping")
+                if 'generate' in entry:
+                    specs = self._generate(where, entry, base)
+                else:
+                    if 'name' not in entry:
+                        _fail(where, "missing 'name'")
+                    specs = [dict(base, **entry)]
+                for spec in specs:
+                    spec['kind'] = kind
+                    if 'position' in spec and not isinstance(spec['position'], str):
+                        spec['position'] = format_position(_point(where, spec['position']))
+                    elif 'position' in spec:
+                        _point(where, spec['position'])
+                    if 'ip' not in spec:
+                        spec['ip'] = pool.next_ip(where)
+                    if 'mac' not in spec:
+                        spec['mac'] = pool.next_mac()
+                    nodes.append(spec)
+        seen = set()
+        for spec in nodes:
+            if spec['name'] in seen:
+                _fail(self.source, f"duplicate node name {spec['name']!r}")
+            seen.add(spec['name'])
+        return nodes
+
+    def _generate(self, where, entry, base):
+        method = entry['generate']
+        if method not in GENERATORS:
+            _fail(where, f"unknown generator {method!r}; use one of {sorted(GENERATORS)}")
+        extra = {key: value for key, value in entry.items()
+                 if key not in GENERATOR_KEYS[method]}
+        if 'ip' in extra or 'mac' in extra or 'name' in extra:
+            _fail(where, "generated nodes get names and addresses automatically")
+        if 'prefix' not in entry:
+            _fail(where, "generators need a name 'prefix'")
+        positions = GENERATORS[method](where, entry)
+        first = entry.get('start', 1)
+        params = dict(base, **extra)
+        return [dict(params, name=f"{entry['prefix']}{first + i}",
+                     position=format_position(position))
+                for i, position in enumerate(positions)]
+
+    def _expand_links(self):
+        known = set(self.names())
+        links = {}
+        for i, entry in enumerate(self.data.get('links') or []):
+            where = f'{self.source}: links[{i}]'
+            groups = [key for key in LINK_KEYS if key in entry]
+            if len(groups) != 1:
+                _fail(where, f"give exactly one of {', '.join(LINK_KEYS)}")
+            group = groups[0]
+            members = entry[group]
+            if members in ('stations', 'aps'):
+                members = self.names(members[:-1])
+            missing = [name for name in members if name not in known]
+            if missing:
+                _fail(where, f"unknown nodes {missing}")
+            params = {key: value for key, value in entry.items() if key != group}
+            if params.get('cls') in WIRELESS_LINKS:
+                for name in members:
+                    links.setdefault((name,), (name, None, params))
+                continue
+            if group == 'nodes':
+                if len(members) != 2:
+                    _fail(where, "'nodes' links join exactly two nodes")
+                pairs = [tuple(members)]
+            elif group == 'chain':
+                pairs = list(zip(members, members[1:]))
+            else:
+                pairs = [(a, b) for j, a in enumerate(members) for b in members[j + 1:]]
+            for a, b in pairs:
+                links.setdefault(tuple(sorted((a, b))), (a, b, params))
+        return list(links.values())
+
+    @property
+    def mobility(self):
+        """Trajectories in MOBILITY_SPECS format"""
+        specs = []
+        known = set(self.names())
+        for i, entry in enumerate(self.data.get('mobility') or []):
+            where = f'{self.source}: mobility[{i}]'
+            missing = [key for key in MOBILITY_KEYS if key not in entry]
+            if missing:
+                _fail(where, f"missing {', '.join(missing)}")
+            if entry.get('name') not in known:
+                _fail(where, f"unknown station {entry.get('name')!r}")
+            spec = dict(entry)
+            spec['start'] = tuple(_point(where, entry.get('start')))
+            spec['end'] = tuple(_point(where, entry.get('end')))
+            try:
+                start_time, end_time = float(entry['start_time']), float(entry['end_time'])
+            except (TypeError, ValueError):
+                _fail(where, "start_time and end_time must be numbers")
+            if end_time < start_time:
+                _fail(where, "end_time before start_time")
+            specs.append(spec)
+        return specs
+
+    def mesh_plan(self, kind='station', interference_factor=2.0):
+        """Neighbour and interference pairs of one kind of node (see plan_mesh)"""
+        exp = float((self.data.get('propagation') or {}).get('exp', 2.0))
+        specs = [spec for spec in self.nodes if spec['kind'] == kind]
+        return plan_mesh(specs, exp, interference_factor)
+
+    def propagation_model(self):
+        """PropagationModel matching the 'propagation' and 'network' sections"""
+        propagation = dict(self.data.get('propagation') or {})
+        network = self.data.get('network') or {}
+        params = {key: propagation[key] for key in ('model', 'exp', 'sl') if key in propagation}
+        params.update({key: network[key] for key in ('noise_th', 'fading_cof') if key in network})
+        return PropagationModel(**params)
+
+    def with_overrides(self, overrides):
+        """New Scenario with per-node parameter overrides ({name: {key: value}})
+
+        Generators are replaced by the nodes they expanded to, so the
+        result is explicit and reproducible when saved.
+        """
+        data = dict(self.data)
+        for section in NODE_SECTIONS:
+            kind = section[:-1]
+            entries = []
+            for spec in self.nodes:
+                if spec['kind'] == kind:
+                    entry = {'name': spec['name']}
+                    entry.update((key, value) for key, value in spec.items()
+                                 if key not in ('name', 'kind'))
+                    entry.update(overrides.get(spec['name'], {}))
+                    entries.append(entry)
+            if entries:
+                data[section] = entries
+        return Scenario(data, self.source)
+
+    def save(self, path):
+        """Write the scenario as YAML or JSON depending on the extension"""
+        with open(path, 'w') as handle:
+            if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+                import yaml
+                yaml.safe_dump(self.data, handle, sort_keys=False)
+            else:
+                json.dump(self.data, handle, indent=2)
+
+    def validate(self):
+        """Expand everything once so every error surfaces before building"""
+        self.nodes
+        self.links
+        self.mobility
+        return self
+
+    def create_net(self, simulated=False):
+        """Mininet_wifi instance configured from the 'network' section
+
+        With `simulated` the in-memory backend from simnet is used instead.
+        """
+        if simulated:
+            from simnet import Controller, Mininet_wifi, interference, wmediumd
+        else:
+            from mininet.node import Controller
+            from mn_wifi.link import wmediumd
+            from mn_wifi.net import Mininet_wifi
+            from mn_wifi.wmediumdConnector import interference
+
+        params = dict(self.data.get('network') or {})
+        if params.pop('controller', False):
+            params['controller'] = Controller
+        if params.pop('wmediumd', None) == 'interference':
+            params.update(link=wmediumd, wmediumd_mode=interference)
+        return Mininet_wifi(**params)
+
+    def build(self, net=None, link_classes=None, start=True, simulated=False):
+        """Create every node and link on `net` and optionally start it
+
+        `link_classes` maps the 'cls' names used in links to classes; the
+        defaults come from Mininet/Mininet-WiFi, and stub classes make the
+        loader testable without either installed.
+        """
+        self.validate()
+        net = self.create_net(simulated) if net is None else net
+        if link_classes is None and getattr(net, 'simulated', False):
+            from simnet import Link, adhoc, mesh
+            link_classes = {'wired': Link, 'adhoc': adhoc, 'mesh': mesh}
+        elif link_classes is None:
+            from mininet.link import Link
+            from mn_wifi.link import adhoc, mesh
+            link_classes = {'wired': Link, 'adhoc': adhoc, 'mesh': mesh}
+        if (self.data.get('network') or {}).get('controller'):
+            net.addController('c0')
+
+        info(f"*** Creating {len(self.nodes)} nodes\n")
+        add = {'ap': net.addAccessPoint, 'station': net.addStation}
+        created = {}
+        for spec in self.nodes:
+            params = {key: value for key, value in spec.items()
+                      if key not in ('name', 'kind')}
+            created[spec['name']] = add[spec['kind']](spec['name'], **params)
+
+        propagation = self.data.get('propagation')
+        if propagation:
+            net.setPropagationModel(**propagation)
+
+        info("*** Configuring WiFi nodes\n")
+        net.configureWifiNodes()
+
+        info(f"*** Creating {len(self.links)} links\n")
+        for a, b, params in self.links:
+            params = dict(params)
+            cls = params.pop('cls', 'wired')
+            if cls not in link_classes:
+                _fail(self.source, f"unknown link class {cls!r}")
+            if b is None:
+                net.addLink(created[a], cls=link_classes[cls], intf=f'{a}-wlan0', **params)
+            else:
+                net.addLink(created[a], created[b], cls=link_classes[cls], **params)
+
+        plot = self.data.get('plot')
+        if plot:
+            from renderer import plot_network
+            plot_network(net, **plot)
+        if start:
+            info("*** Starting network\n")
+            net.build()
+            net.start()
+        return net
+
+
+def load_scenario(source):
+    """Load a Scenario from a .yaml/.yml/.json path or an already-parsed dict"""
+    if isinstance(source, dict):
+        return Scenario(source)
+    with open(source) as handle:
+        if os.path.splitext(source)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            data = yaml.safe_load(handle)
+        else:
+            data = json.load(handle)
+    return Scenario(data, source)
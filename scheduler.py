@@ -0,0 +1,174 @@
+"""Discrete-event scheduler with pluggable real-time and virtual clocks"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class RealTimeClock:
+    """Wall clock that sleeps until the next event is due"""
+
+    def __init__(self):
+        self._origin = time.monotonic()
+        self._wake = threading.Event()
+
+    def now(self):
+        """Seconds elapsed since the clock was created"""
+        return time.monotonic() - self._origin
+
+    def sleep_until(self, t):
+        """Block until timeline time t, or until interrupted"""
+        delay = t - self.now()
+        if delay > 0:
+            self._wake.wait(delay)
+        # One interrupt wakes one sleep; the caller re-reads its queue
+        self._wake.clear()
+
+    def interrupt(self):
+        """Wake a pending sleep_until early"""
+        self._wake.set()
+
+
+class VirtualClock:
+    """Simulated clock that jumps straight to the next event"""
+
+    def __init__(self, start=0.0):
+        self._now = float(start)
+
+    def now(self):
+        return self._now
+
+    def sleep_until(self, t):
+        self._now = max(self._now, t)
+
+    def interrupt(self):
+        pass
+
+
+def clock_for(net):
+    """Pick a virtual clock for simulated backends and a real one otherwise"""
+    if getattr(net, 'simulated', False):
+        return VirtualClock()
+    return RealTimeClock()
+
+
+class Event:
+    """Handle for a scheduled callback, usable with EventScheduler.cancel"""
+
+    __slots__ = ('time', 'name', 'callback', 'cancelled')
+
+    def __init__(self, time, name, callback):
+        self.time = time
+        self.name = name
+        self.callback = callback
+        self.cancelled = False
+
+    def __repr__(self):
+        return f'Event({self.time:.3f}, {self.name!r})'
+
+
+class EventScheduler:
+    """Run timed callbacks in order on a single timeline
+
+    Events with the same timestamp run in the order they were scheduled.
+    The clock decides how waiting works: RealTimeClock sleeps until the next
+    event, VirtualClock fast-forwards so a 60 s timeline runs instantly.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = RealTimeClock() if clock is None else clock
+        self._queue = []
+        self._seq = itertools.count()
+        self._now = self.clock.now()
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def now(self):
+        """Timeline time of the event currently running"""
+        return self._now
+
+    def at(self, t, callback, name=None):
+        """Schedule callback() at absolute timeline time t
+
+        Safe to call from other threads; a run() sleeping towards a later
+        event wakes up to pick this one first.
+        """
+        event = Event(float(t), name or getattr(callback, '__name__', 'event'),
+                      callback)
+        with self._lock:
+            heapq.heappush(self._queue, (event.time, next(self._seq), event))
+            if self._queue[0][2] is event:
+                self.clock.interrupt()
+        return event
+
+    def after(self, delay, callback, name=None):
+        """Schedule callback() delay seconds after the current time"""
+        return self.at(self._now + delay, callback, name)
+
+    def every(self, interval, callback, start=None, until=None, name=None):
+        """Schedule callback() periodically from start up to until (inclusive)"""
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        start = self._now if start is None else start
+        name = name or getattr(callback, '__name__', 'periodic')
+        count = itertools.count(1)
+
+        def fire():
+            callback()
+            # Derive each time from start so long runs do not accumulate error
+            following = start + next(count) * interval
+            if until is None or following <= until + 1e-9:
+                event.time = following
+                with self._lock:
+                    heapq.heappush(self._queue, (following, next(self._seq), event))
+
+        event = self.at(start, fire, name)
+        return event
+
+    def cancel(self, event):
+        """Drop a scheduled event; cancelled events are skipped when due"""
+        event.cancelled = True
+
+    def stop(self):
+        """Stop run() after the current event"""
+        self._stopped = True
+        self.clock.interrupt()
+
+    def pending(self):
+        """Number of events still queued"""
+        return sum(not entry[2].cancelled for entry in self._queue)
+
+    def run(self, until=None):
+        """Process events in time order until the queue is empty or until
+
+        The head event is only popped once its time has come, so stop() or
+        an earlier event added with at() while sleeping leaves it queued.
+        """
+        self._stopped = False
+        while not self._stopped:
+            with self._lock:
+                head = self._queue[0] if self._queue else None
+                if head is not None and head[2].cancelled:
+                    heapq.heappop(self._queue)
+                    continue
+            idle = head is None or (until is not None and head[0] > until)
+            if idle and until is None:
+                break
+            due = until if idle else head[0]
+            self.clock.sleep_until(due)
+            if self._stopped or self.clock.now() < due:
+                continue
+            with self._lock:
+                if (self._queue[0] if self._queue else None) is not head:
+                    # Woken by an event scheduled ahead of the old head
+                    continue
+                if idle:
+                    break
+                heapq.heappop(self._queue)
+            t, _, event = head
+            self._now = t
+            event.callback()
+        if until is not None and not self._stopped:
+            self._now = max(self._now, until)
+        return self._now
@@ -0,0 +1,891 @@
+"""In-memory stand-in for Mininet-WiFi with analytic radio, ping and iperf results
+
+SimulatedNet offers the subset of the Mininet_wifi API the scripts use
+(addStation, addAccessPoint, addLink, setPropagationModel,
+configureWifiNodes, build, start, stop, get) and its nodes answer the
+shell commands the helpers send: `iw dev <intf> link|connect|disconnect`,
+ping, iperf3, pgrep/pkill, `route -n`, olsrd and its txtinfo plugin. Association, RSSI, loss, RTT
+and throughput come from the propagation model and the interference
+estimator, so whole scenarios run without root, mac80211_hwsim or
+wmediumd, in a fraction of a second.
+"""
+
+import heapq
+import io
+import itertools
+import json
+import logging
+import re
+import shlex
+import sys
+import threading
+import time
+
+import numpy as np
+
+from connectivity import PROBE_MARKER
+from interference import InterferenceEngine, channel_overlap, packet_error_rate
+from olsr import TXTINFO_PORT
+from propagation import (DEFAULT_ANTENNA_GAIN, PropagationModel, channel_frequency,
+                         node_txpower, to_dbm, to_mw)
+
+info = logging.getLogger('mininet').info
+
+# Share of PHY goodput left for TCP payload after 802.11 MAC/ACK overhead
+TCP_EFFICIENCY = 0.55
+# MAC retransmissions before a frame counts as lost
+MAC_RETRIES = 7
+# Size of the frames used to rate ping and OLSR hello delivery
+SMALL_FRAME = 100
+WIRED_RTT_MS = 0.05
+# `iperf3 --version` of the simulated iperf3, which speaks --json-stream
+IPERF_VERSION = 'iperf 3.17.1 (cJSON 1.7.15)\n'
+
+
+def setLogLevel(level):
+    """Print mininet-style log lines (which carry their own newlines)
+
+    Only the 'mininet' logger and its children are configured, and the
+    handler is added once however often this is called.
+    """
+    logger = logging.getLogger('mininet')
+    if not any(getattr(h, '_simnet', False) for h in logger.handlers):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.terminator = ''
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler._simnet = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+
+class _Marker:
+    """Placeholder for Mininet classes that only select behaviour by identity"""
+
+    def __init__(self, name):
+        self.__name__ = name
+
+    def __repr__(self):
+        return f'<simulated {self.__name__}>'
+
+
+Controller = _Marker('Controller')
+OVSKernelSwitch = _Marker('OVSKernelSwitch')
+OVSKernelAP = _Marker('OVSKernelAP')
+Station = _Marker('Station')
+Link = _Marker('Link')
+adhoc = _Marker('adhoc')
+mesh = _Marker('mesh')
+wmediumd = _Marker('wmediumd')
+interference = _Marker('interference')
+
+
+def CLI_wifi(net, *args, **kwargs):
+    info("*** The simulated backend has no interactive CLI\n")
+
+
+CLI = CLI_wifi
+
+
+class SimIntf:
+    __slots__ = ('name', 'mac', 'ip', 'node')
+
+    def __init__(self, name, mac, ip, node):
+        self.name = name
+        self.mac = mac
+        self.ip = ip
+        self.node = node
+
+
+class SimProcess:
+    """Finished-on-demand process: output is produced when first read
+
+    Long-running commands (tcpdump) stay alive until terminate().
+    """
+
+    _pids = itertools.count(10000)
+
+    def __init__(self, produce, universal_newlines=False, daemon=False):
+        self.pid = next(self._pids)
+        self._produce = produce
+        self._text = universal_newlines
+        self._daemon = daemon
+        self._stdout = None
+        self.returncode = None if daemon else 0
+
+    @property
+    def stdout(self):
+        if self._stdout is None:
+            output = self._produce()
+            self._stdout = io.StringIO(output) if self._text else io.BytesIO(output.encode())
+        return self._stdout
+
+    def communicate(self, timeout=None):
+        output = self.stdout.read()
+        self.returncode = 0
+        return output, None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self.returncode = 0 if self.returncode is None else self.returncode
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+    kill = terminate
+
+
+class SimNode:
+    """Station or AP with a fake shell driven by the owning SimulatedNet"""
+
+    def __init__(self, net, name, kind, params):
+        self.net = net
+        self.name = name
+        self.kind = kind
+        self.params = dict(params)
+        ip = params.get('ip')
+        mac = params.get('mac')
+        intf = f'{name}-wlan1' if kind == 'ap' else f'{name}-wlan0'
+        self.wintfs = {0: SimIntf(intf, mac, ip.split('/')[0] if ip else None, self)}
+        self.servers = set()
+        self.daemons = set()
+        self.ibss = None
+
+    def __repr__(self):
+        return f'<{self.kind} {self.name}>'
+
+    def IP(self):
+        return self.wintfs[0].ip
+
+    def MAC(self):
+        return self.wintfs[0].mac
+
+    @property
+    def position(self):
+        return list(self.net.position(self.name))
+
+    def setPosition(self, position):
+        self.params['position'] = position
+        self.net.move(self.name, position)
+
+    def cmd(self, command, *args, **kwargs):
+        if not isinstance(command, str):
+            command = ' '.join(command)
+        return self.net.shell(self, command)
+
+    def popen(self, command, *args, **kwargs):
+        if not isinstance(command, str):
+            command = ' '.join(str(part) for part in command)
+        daemon = command.split()[0] == 'tcpdump'
+        return SimProcess(lambda: self.net.shell(self, command, launched=time.monotonic()),
+                          kwargs.get('universal_newlines', kwargs.get('text', False)),
+                          daemon)
+
+
+class SimulatedNet:
+    """Drop-in for Mininet_wifi that computes results instead of emulating"""
+
+    simulated = True
+
+    def __init__(self, noise_th=-91, fading_cof=0, activity=0.05, **kwargs):
+        self.noise_th = float(noise_th)
+        self.fading_cof = float(fading_cof)
+        self.activity = activity
+        self.model = PropagationModel(noise_th=noise_th, fading_cof=fading_cof)
+        self.nodes = {}
+        self.aps = []
+        self.stations = []
+        self.controllers = []
+        self.wired = {}
+        self.engine = None
+        self.started = False
+        self._by_ip = {}
+        self._serving = {}
+        self._dirty = True
+        self._hops = {}
+        self._routes = {}
+        self._graphs = {}
+        self._moves = {}
+        self._flows = []
+        self._server_pids = {}
+        self._noise_mw = to_mw(self.noise_th)
+        self._counter = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # --- topology construction -------------------------------------------------
+
+    def addController(self, name='c0', *args, **kwargs):
+        controller = _Marker(name)
+        controller.name = name
+        self.controllers.append(controller)
+        return controller
+
+    def _add(self, name, kind, params):
+        index = next(self._counter)
+        params = dict(params)
+        params.setdefault('ip', f'10.0.0.{index}/8')
+        params.setdefault('mac', f'02:00:00:00:{index:02x}:00')
+        node = SimNode(self, name, kind, params)
+        self.nodes[name] = node
+        self._by_ip[node.IP()] = node
+        return node
+
+    def addAccessPoint(self, name, **params):
+        node = self._add(name, 'ap', params)
+        self.aps.append(node)
+        return node
+
+    def addStation(self, name, **params):
+        node = self._add(name, 'station', params)
+        self.stations.append(node)
+        return node
+
+    def addLink(self, node1, node2=None, cls=None, **params):
+        kind = getattr(cls, '__name__', str(cls)).lower()
+        if kind in ('adhoc', 'mesh'):
+            node1.ibss = (params.get('ssid'), int(params.get('channel', 1)))
+            self._dirty = True
+        elif node2 is not None:
+            self.wired.setdefault(node1.name, set()).add(node2.name)
+            self.wired.setdefault(node2.name, set()).add(node1.name)
+        return None
+
+    def setPropagationModel(self, model='logDistance', exp=2.0, sl=1.0, **kwargs):
+        self.model = PropagationModel(model, exp, sl, self.noise_th, self.fading_cof)
+
+    def configureWifiNodes(self):
+        pass
+
+    def plotGraph(self, **kwargs):
+        pass
+
+    def build(self):
+        self._engine()
+
+    def start(self):
+        self._engine()
+        self.started = True
+
+    def stop(self):
+        self.started = False
+        for node in self.nodes.values():
+            node.servers.clear()
+            node.daemons.clear()
+
+    def get(self, *names):
+        nodes = [self.nodes[name] for name in names]
+        return nodes[0] if len(nodes) == 1 else nodes
+
+    getNodeByName = get
+
+    def __getitem__(self, name):
+        return self.nodes[name]
+
+    # --- radio state -------------------------------------------------------------
+
+    def _wireless(self):
+        return self.aps + self.stations
+
+    def _channel(self, node):
+        if node.ibss is not None:
+            return node.ibss[1]
+        if node.kind == 'ap':
+            return int(node.params.get('channel', 1))
+        serving = self._serving.get(node.name)
+        if serving is not None:
+            return int(serving.params.get('channel', 1))
+        return int(self.aps[0].params.get('channel', 1)) if self.aps else 1
+
+    def _engine(self):
+        # Probes run from a thread pool; applying moves and re-associating
+        # must finish before any of them reads the radio state
+        with self._lock:
+            if self.engine is None:
+                specs = []
+                for node in self._wireless():
+                    channel = self._channel(node)
+                    specs.append({'name': node.name,
+                                  'position': node.params.get('position', '0,0,0'),
+                                  'channel': channel,
+                                  'txpower': node_txpower(node.params, self.model, channel),
+                                  'antennaGain': node.params.get('antennaGain',
+                                                                 DEFAULT_ANTENNA_GAIN)})
+                self.engine = InterferenceEngine(specs, self.model, self.activity)
+            if self._moves:
+                moves, self._moves = self._moves, {}
+                self.engine.move(moves)
+            return self.engine
+
+    def position(self, name):
+        engine = self._engine()
+        return engine.positions[engine.index[name]]
+
+    def move(self, name, position):
+        # Applied in one batch the next time radio state is read, so a
+        # mobility tick moving every station costs one matrix update
+        self._moves[name] = position
+        self._dirty = True
+
+    def _usable(self, tx, rx):
+        """Signal minus fading margin above the noise floor"""
+        engine = self._engine()
+        return engine.power[engine.index[tx], engine.index[rx]] >= self._noise_mw
+
+    def rssi(self, tx, rx):
+        engine = self._engine()
+        return float(to_dbm(engine.power[engine.index[tx], engine.index[rx]])
+                     + self.fading_cof)
+
+    def _refresh(self):
+        """Recompute associations after movement; stations stay while usable"""
+        with self._lock:
+            if not self._dirty:
+                return
+            engine = self._engine()
+            changed = False
+            infrastructure = [node for node in self.stations if node.ibss is None]
+            if self.aps and infrastructure:
+                ap_rows = [engine.index[ap.name] for ap in self.aps]
+                for station in infrastructure:
+                    column = engine.power[ap_rows, engine.index[station.name]]
+                    current = self._serving.get(station.name)
+                    if current is not None and column[self.aps.index(current)] >= self._noise_mw:
+                        continue
+                    best = int(np.argmax(column))
+                    serving = self.aps[best] if column[best] >= self._noise_mw else None
+                    if serving is not current:
+                        self._serving[station.name] = serving
+                        channel = self._channel(station)
+                        if engine.channel[engine.index[station.name]] != channel:
+                            engine.channel[engine.index[station.name]] = channel
+                            changed = True
+            if changed:
+                engine.recompute()
+            self._hops = {}
+            self._routes = {}
+            self._graphs = {}
+            self._dirty = False
+
+    def serving(self, station):
+        self._refresh()
+        return self._serving.get(station.name)
+
+    def hop(self, tx, rx):
+        """SINR/PER/PHY rate of one wireless hop, cached until something moves
+
+        Unlike the raw InterferenceEngine estimate, transmitters the sender
+        can hear defer to it (CSMA/CA), so only hidden nodes interfere.
+        """
+        self._refresh()
+        key = (tx, rx)
+        if key not in self._hops:
+            engine = self._engine()
+            i, j = engine.index[tx], engine.index[rx]
+            heard = (engine.power[:, j] * engine.activity
+                     * channel_overlap(engine.channel, engine.channel[j]))
+            hidden = engine.power[:, i] < engine.noise
+            hidden[[i, j]] = False
+            sinr = to_dbm(engine.power[i, j]) - to_dbm(heard[hidden].sum() + engine.noise)
+            rates, per = packet_error_rate(sinr, engine.frame_bytes)
+            goodput = rates * (1.0 - per)
+            best = int(np.argmax(goodput))
+            self._hops[key] = {
+                'sinr': float(sinr),
+                'per': float(per[best]),
+                'phy_rate': float(rates[best]),
+                'goodput': float(goodput[best]),
+                'small_loss': float(packet_error_rate(sinr, SMALL_FRAME)[1][0]),
+            }
+        return self._hops[key]
+
+    # --- routing -----------------------------------------------------------------
+
+    def _wired_path(self, a, b):
+        if a == b:
+            return [a]
+        previous = {a: None}
+        frontier = [a]
+        while frontier:
+            following = []
+            for node in frontier:
+                for peer in self.wired.get(node, ()):
+                    if peer not in previous:
+                        previous[peer] = node
+                        following.append(peer)
+            frontier = following
+        if b not in previous:
+            return None
+        path = [b]
+        while previous[path[-1]] is not None:
+            path.append(previous[path[-1]])
+        return path[::-1]
+
+    def link_quality(self, a, b):
+        """OLSR-style LQ: delivery ratio of small frames from a to b"""
+        if not self._usable(a, b):
+            return 0.0
+        return max(0.0, 1.0 - self.hop(a, b)['small_loss'])
+
+    def _ibss_members(self, node):
+        return [peer for peer in self.stations if peer.ibss == node.ibss]
+
+    def _olsr_graph(self, node):
+        """(members, {name: [peers in range]}, {(a, b): LQ}) of node's olsrd mesh
+
+        Only pairs above the noise floor get a link quality, so building
+        the graph costs one hop() per usable link rather than per pair.
+        Cached until something moves or olsrd starts or stops somewhere.
+        """
+        self._refresh()
+        members = [peer for peer in self._ibss_members(node) if 'olsrd' in peer.daemons]
+        key = (node.ibss, tuple(peer.name for peer in members))
+        if key not in self._graphs:
+            engine = self._engine()
+            rows = [engine.index[peer.name] for peer in members]
+            usable = engine.power[np.ix_(rows, rows)] >= self._noise_mw
+            np.fill_diagonal(usable, False)
+            near = {peer.name: [] for peer in members}
+            quality = {}
+            for i, j in zip(*np.nonzero(usable)):
+                a, b = members[i].name, members[j].name
+                near[a].append(b)
+                quality[a, b] = max(0.0, 1.0 - self.hop(a, b)['small_loss'])
+            self._graphs[key] = (members, near, quality)
+        return self._graphs[key]
+
+    def olsr_routes(self, source):
+        """{destination name: (next hop, hops, etx)} via Dijkstra on ETX"""
+        self._refresh()
+        if source.name not in self._routes:
+            self._routes[source.name] = self._dijkstra(source)
+        return self._routes[source.name]
+
+    def _dijkstra(self, source):
+        members, near, lq = self._olsr_graph(source)
+        if source.name not in near:
+            return {}
+        best = {source.name: (0.0, 0, None)}
+        queue = [(0.0, 0, source.name, None)]
+        done = set()
+        while queue:
+            etx, hops, name, first = heapq.heappop(queue)
+            if name in done:
+                continue
+            done.add(name)
+            for peer in near[name]:
+                if peer in done:
+                    continue
+                quality = lq[name, peer] * lq.get((peer, name), 0.0)
+                if quality < 0.1:
+                    continue
+                cost = etx + 1.0 / quality
+                if peer not in best or cost < best[peer][0]:
+                    best[peer] = (cost, hops + 1, first or peer)
+                    heapq.heappush(queue, (cost, hops + 1, peer, first or peer))
+        return {name: (first, hops, etx) for name, (etx, hops, first) in best.items()
+                if name != source.name}
+
+    def path(self, src, dst):
+        """[(tx, rx, wireless?)] hops from src to dst, or None if unreachable"""
+        if src is dst:
+            return []
+        if src.ibss is not None:
+            if dst.ibss != src.ibss:
+                return None
+            if 'olsrd' not in src.daemons:
+                # Without a routing daemon only direct neighbours are reachable
+                if self._usable(src.name, dst.name) and self._usable(dst.name, src.name):
+                    return [(src.name, dst.name, True)]
+                return None
+            if dst.name not in self.olsr_routes(src):
+                return None
+            hops, current = [], src
+            while current is not dst:
+                route = self.olsr_routes(current).get(dst.name)
+                if route is None or len(hops) > len(self.nodes):
+                    return None
+                next_hop = self.nodes[route[0]]
+                hops.append((current.name, next_hop.name, True))
+                current = next_hop
+            return hops
+        hops = []
+        if src.kind == 'station':
+            ap_src = self.serving(src)
+            if ap_src is None:
+                return None
+            hops.append((src.name, ap_src.name, True))
+        else:
+            ap_src = src
+        if dst.kind == 'station':
+            ap_dst = self.serving(dst)
+            if ap_dst is None or dst.ibss is not None:
+                return None
+        else:
+            ap_dst = dst
+        wired = self._wired_path(ap_src.name, ap_dst.name)
+        if wired is None:
+            return None
+        hops += [(a, b, False) for a, b in zip(wired, wired[1:])]
+        if dst.kind == 'station':
+            hops.append((ap_dst.name, dst.name, True))
+        return hops
+
+    # --- shell -------------------------------------------------------------------
+
+    def shell(self, node, command, launched=None):
+        """Output of a shell command line run in `node`'s namespace"""
+        if PROBE_MARKER in command:
+            return self._probe(node, command)
+        outputs = []
+        for segment in re.split(r';|&&|\|\||\n', command):
+            output = self._run_segment(node, segment.strip(), command, launched)
+            if output:
+                outputs.append(output)
+        return '\n'.join(outputs)
+
+    def _run_segment(self, node, segment, command, launched):
+        match = re.search(r'iw dev (\S+?)\'? link', segment)
+        if match:
+            return self._iw_link(node, match.group(1))
+        match = re.search(r'iw dev (\S+) (connect|disconnect)\b(.*)', segment)
+        if match:
+            return self._iw_connect(node, match.group(1), match.group(2), match.group(3).split())
+        if re.search(r"(?:^|[\s'])pgrep\s", segment):
+            return self._pgrep(node, segment)
+        if re.search(r'(?:^|\s)ping\s', segment):
+            return self._ping(node, segment)
+        if 'iperf3' in segment and 'pkill' not in segment:
+            return self._iperf(node, segment, launched)
+        if 'pkill' in segment or 'killall' in segment or re.match(r'kill\s', segment):
+            self._kill(node, segment)
+            return ''
+        if re.search(r'(?:^|\s)olsrd\s', segment):
+            node.daemons.add('olsrd')
+            self._routes = {}
+            return ''
+        if re.search(rf'\bnc\b.*\b{TXTINFO_PORT}\b', segment):
+            paths = re.search(r'echo\s+"?([/\w]+)', segment)
+            return self._txtinfo(node, paths.group(1) if paths else '/all')
+        if re.search(r'\broute -n\b', segment):
+            return self._route_table(node)
+        return ''
+
+    def _kill(self, node, segment):
+        if re.match(r'kill\s', segment):
+            for pid in map(int, re.findall(r'\b\d+\b', segment)):
+                owner, port = self._server_pids.pop(pid, (None, None))
+                if owner is not None:
+                    owner.servers.discard(port)
+            return
+        if 'olsrd' in segment:
+            node.daemons.discard('olsrd')
+            self._routes = {}
+        port = re.search(r'iperf3 -s -p (\d+)', segment)
+        if port:
+            node.servers.discard(int(port.group(1)))
+        elif 'iperf3' in segment:
+            node.servers.clear()
+            self._flows = [flow for flow in self._flows if flow['node'] is not node]
+
+    def _pgrep(self, node, segment):
+        name = segment.split()[-1].strip('\'"')
+        running = name in node.daemons or (name == 'iperf3' and node.servers)
+        return str(1000 + list(self.nodes).index(node.name)) if running else ''
+
+    def _iw_connect(self, node, interface, action, args):
+        """`iw dev <intf> disconnect` / `connect <ssid> [freq] [bssid]`"""
+        if interface != node.wintfs[0].name or node.kind != 'station':
+            return 'command failed: No such device (-19)'
+        self._refresh()
+        if action == 'disconnect':
+            self._serving[node.name] = None
+            self._hops = {}
+            self._graphs = {}
+            return ''
+        candidates = [ap for ap in self.aps if not args or ap.params.get('ssid') == args[0]]
+        bssid = next((arg for arg in args[1:] if ':' in arg), None)
+        if bssid is not None:
+            candidates = [ap for ap in candidates if ap.MAC() == bssid]
+        candidates = [ap for ap in candidates if self._usable(ap.name, node.name)]
+        if not candidates:
+            return 'command failed: No such file or directory (-2)'
+        self._serving[node.name] = max(candidates, key=lambda ap: self.rssi(ap.name, node.name))
+        engine = self._engine()
+        engine.channel[engine.index[node.name]] = self._channel(node)
+        engine.recompute()
+        self._hops = {}
+        self._routes = {}
+        self._graphs = {}
+        return ''
+
+    def _iw_link(self, node, interface):
+        if interface != node.wintfs[0].name or node.kind != 'station':
+            return 'command failed: No such device (-19)'
+        if node.ibss is not None:
+            return 'Not connected.'
+        ap = self.serving(node)
+        if ap is None:
+            return 'Not connected.'
+        hop = self.hop(ap.name, node.name)
+        freq = int(round(channel_frequency(ap.params.get('channel', 1)) * 1000))
+        return (f"Connected to {ap.MAC()} (on {interface})\n"
+                f"\tSSID: {ap.params.get('ssid', '')}\n"
+                f"\tfreq: {freq}\n"
+                f"\tsignal: {self.rssi(ap.name, node.name):.0f} dBm\n"
+                f"\trx bitrate: {hop['phy_rate']:.1f} MBit/s\n"
+                f"\ttx bitrate: {self.hop(node.name, ap.name)['phy_rate']:.1f} MBit/s")
+
+    # ping
+
+    def _ping_stats(self, node, target):
+        """(delivery ratio, rtt ms) for one echo request/reply exchange"""
+        dst = self._by_ip.get(target)
+        route = None if dst is None else self.path(node, dst)
+        back = None if dst is None else self.path(dst, node)
+        if route is None or back is None:
+            return 0.0, None
+        delivery, rtt = 1.0, 0.0
+        for tx, rx, wireless in route + back:
+            if wireless:
+                hop = self.hop(tx, rx)
+                delivery *= 1.0 - hop['small_loss'] ** MAC_RETRIES
+                # 84-byte echo at the PHY rate plus MAC/ACK overhead
+                rtt += 84 * 8 / (hop['phy_rate'] * 1e3) + 0.3
+            else:
+                rtt += WIRED_RTT_MS
+        return delivery, rtt
+
+    def _ping(self, node, segment):
+        args = shlex.split(segment[segment.index('ping'):].split('>')[0])
+        count = 3 if '-c' not in args else int(args[args.index('-c') + 1])
+        target = args[-1]
+        delivery, rtt = self._ping_stats(node, target)
+        received = int(round(count * delivery))
+        # Deterministic +-5% jitter around the analytic RTT
+        times = [rtt * (1 + 0.05 * (seq % 3 - 1)) for seq in range(1, received + 1)]
+        lines = [f"PING {target} ({target}) 56(84) bytes of data."]
+        for seq, value in enumerate(times, 1):
+            lines.append(f"64 bytes from {target}: icmp_seq={seq} ttl=64 time={value:.2f} ms")
+        loss = 100 * (1 - received / count) if count else 100
+        lines += ['', f"--- {target} ping statistics ---",
+                  f"{count} packets transmitted, {received} received, "
+                  f"{loss:.0f}% packet loss, time {max(count - 1, 0) * 1000}ms"]
+        if times:
+            lines.append(f"rtt min/avg/max/mdev = {min(times):.3f}/{np.mean(times):.3f}/"
+                         f"{max(times):.3f}/{np.std(times):.3f} ms")
+        return '\n'.join(lines)
+
+    def _probe(self, node, command):
+        chunks = []
+        for i, match in enumerate(re.finditer(r'ping ([^>]*?)\s*>', command)):
+            chunks.append(f'{PROBE_MARKER} {i}')
+            chunks.append(self._ping(node, 'ping ' + match.group(1)))
+        return '\n'.join(chunks)
+
+    # iperf3
+
+    def _flow_capacity(self, node, dst, launched):
+        """Payload throughput in bit/s for a flow, sharing airtime with others"""
+        route = self.path(node, dst)
+        if route is None:
+            return None, None
+        wireless = [(tx, rx) for tx, rx, is_wireless in route if is_wireless]
+        channels = {self._channel(self.nodes[tx]) for tx, _ in wireless}
+        # Flows overlapping in time on the same channels share the medium
+        sharing = 1
+        for other in self._flows:
+            if other['node'] is node and other['dst'] is dst and other['launched'] == launched:
+                continue
+            if abs(other['launched'] - launched) < other['duration'] and other['channels'] & channels:
+                sharing += 1
+        if not wireless:
+            return 1e9, 0.0
+        per = max(self.hop(tx, rx)['per'] for tx, rx in wireless)
+        goodput = min(self.hop(tx, rx)['goodput'] for tx, rx in wireless)
+        capacity = goodput * 1e6 * TCP_EFFICIENCY / len(wireless) / sharing
+        return capacity, per
+
+    def _iperf(self, node, segment, launched):
+        args = shlex.split(segment[segment.index('iperf3'):])
+        option = lambda flag, default: (args[args.index(flag) + 1]  # noqa: E731
+                                        if flag in args else default)
+        if '--version' in args or '-v' in args:
+            return IPERF_VERSION
+        if '-s' in args:
+            port = int(option('-p', 5201))
+            node.servers.add(port)
+            if '$!' not in args:
+                return ''
+            # Started in the background with `& echo $!`
+            pid = next(SimProcess._pids)
+            self._server_pids[pid] = (node, port)
+            return str(pid)
+        target = option('-c', None)
+        port = int(option('-p', 5201))
+        duration = int(float(option('-t', 10)))
+        parallel = int(option('-P', 1))
+        udp = '-u' in args
+        dst = self._by_ip.get(target)
+        launched = time.monotonic() if launched is None else launched
+        error = None
+        if dst is None or port not in dst.servers:
+            error = 'unable to connect to server: Connection refused'
+            capacity = per = None
+        else:
+            if not any(flow['launched'] == launched and flow['node'] is node
+                       for flow in self._flows):
+                route = self.path(node, dst) or []
+                self._flows.append({
+                    'node': node, 'dst': dst, 'launched': launched,
+                    'duration': duration,
+                    'channels': {self._channel(self.nodes[tx]) for tx, _, w in route if w}})
+            capacity, per = self._flow_capacity(node, dst, launched)
+            if capacity is None:
+                error = 'unable to connect to server: No route to host'
+        if udp and capacity is not None:
+            bitrate = _bitrate(option('-b', '1M'))
+            capacity = min(capacity, bitrate)
+        document = _iperf_document(capacity, per, duration, parallel, udp, error)
+        if '-J' in args:
+            return json.dumps(document)
+        if '--json-stream' in args:
+            lines = [json.dumps({'event': 'start', 'data': document['start']})]
+            if error:
+                lines.append(json.dumps({'event': 'error', 'data': error}))
+            for interval in document['intervals']:
+                lines.append(json.dumps({'event': 'interval', 'data': interval}))
+            lines.append(json.dumps({'event': 'end', 'data': document['end']}))
+            return '\n'.join(lines)
+        return _iperf_text(document, parallel, error)
+
+    # OLSR
+
+    def _txtinfo(self, node, paths):
+        if 'olsrd' not in node.daemons:
+            return ''
+        members, near, quality = self._olsr_graph(node)
+        routes = self.olsr_routes(node)
+        wanted = paths.lower()
+        tables = []
+
+        def table(name, header, rows):
+            tables.append('\n'.join([f'Table: {name}', '\t'.join(header)]
+                                    + ['\t'.join(str(v) for v in row) for row in rows]) + '\n')
+
+        neighbours = [self.nodes[peer] for peer in near[node.name]
+                      if quality[node.name, peer] >= 0.1
+                      and quality.get((peer, node.name), 0.0) >= 0.1]
+        if '/neighbors' in wanted or '/all' in wanted:
+            two_hop = {name for name, (_, hops, _) in routes.items() if hops == 2}
+            table('Neighbors', ['IP address', 'SYM', 'MPR', 'MPRS', 'Will.', '2 Hop Neighbors'],
+                  [(peer.IP(), 'YES', 'NO', 'NO', 7, len(two_hop)) for peer in neighbours])
+        if '/links' in wanted or '/all' in wanted:
+            rows = []
+            for peer in neighbours:
+                lq = quality[peer.name, node.name]
+                nlq = quality[node.name, peer.name]
+                rows.append((node.IP(), peer.IP(), '0.00', f'{lq:.3f}', f'{nlq:.3f}',
+                             f'{1.0 / (lq * nlq):.3f}'))
+            table('Links', ['Local IP', 'Remote IP', 'Hyst.', 'LQ', 'NLQ', 'Cost'], rows)
+        if '/routes' in wanted or '/all' in wanted:
+            rows = [(f'{self.nodes[name].IP()}/32', self.nodes[first].IP(), hops,
+                     f'{etx:.3f}', node.wintfs[0].name)
+                    for name, (first, hops, etx) in sorted(routes.items())]
+            table('Routes', ['Destination', 'Gateway IP', 'Metric', 'ETX', 'Interface'], rows)
+        if '/topology' in wanted or '/all' in wanted:
+            rows = []
+            for a in members:
+                for b in near[a.name]:
+                    lq = quality.get((b, a.name), 0.0)
+                    nlq = quality[a.name, b]
+                    if lq * nlq >= 0.01:
+                        rows.append((a.IP(), self.nodes[b].IP(), f'{lq:.3f}', f'{nlq:.3f}',
+                                     f'{1.0 / (lq * nlq):.3f}'))
+            table('Topology', ['Dest. IP', 'Last hop IP', 'LQ', 'NLQ', 'Cost'], rows)
+        return 'HTTP/1.0 200 OK\nContent-type: text/plain\n\n' + '\n'.join(tables)
+
+    def _route_table(self, node):
+        intf = node.wintfs[0].name
+        lines = ['Kernel IP routing table',
+                 'Destination     Gateway         Genmask         Flags Metric Ref    Use Iface']
+        ip, _, prefix = node.params.get('ip', '').partition('/')
+        if ip:
+            bits = int(prefix or 8)
+            mask = (0xffffffff << (32 - bits)) & 0xffffffff
+            network = int.from_bytes(bytes(int(p) for p in ip.split('.')), 'big') & mask
+            dotted = lambda v: '.'.join(str((v >> s) & 255) for s in (24, 16, 8, 0))  # noqa: E731
+            lines.append(f'{dotted(network):<15} 0.0.0.0         {dotted(mask):<15} '
+                         f'U     0      0        0 {intf}')
+        for name, (first, hops, _) in sorted(self.olsr_routes(node).items()):
+            if hops > 1:
+                lines.append(f'{self.nodes[name].IP():<15} {self.nodes[first].IP():<15} '
+                             f'255.255.255.255 UGH   {hops:<6} 0        0 {intf}')
+        return '\n'.join(lines)
+
+
+def _bitrate(text):
+    units = {'K': 1e3, 'M': 1e6, 'G': 1e9}
+    text = str(text)
+    if text[-1:].upper() in units:
+        return float(text[:-1]) * units[text[-1].upper()]
+    return float(text)
+
+
+def _iperf_document(capacity, per, duration, parallel, udp, error):
+    """iperf3 -J style document for a flow of constant throughput"""
+    start = {'test_start': {'protocol': 'UDP' if udp else 'TCP',
+                            'num_streams': parallel, 'duration': duration}}
+    if error:
+        return {'start': start, 'intervals': [], 'end': {}, 'error': error}
+    intervals = []
+    per_stream = capacity / parallel
+    mss = 1448
+    retransmits = int(round(per ** MAC_RETRIES * capacity / 8 / mss)) if not udp else 0
+    for second in range(duration):
+        streams = [{'socket': 5 + k, 'start': float(second), 'end': float(second + 1),
+                    'seconds': 1.0, 'bytes': int(per_stream / 8),
+                    'bits_per_second': per_stream, 'retransmits': retransmits,
+                    'snd_cwnd': int(per_stream / 8 * 0.02) + 2 * mss, 'rtt': 20000,
+                    'omitted': False, 'sender': True} for k in range(parallel)]
+        total = {'start': float(second), 'end': float(second + 1), 'seconds': 1.0,
+                 'bytes': int(capacity / 8), 'bits_per_second': capacity,
+                 'retransmits': retransmits * parallel, 'omitted': False, 'sender': True}
+        intervals.append({'streams': streams, 'sum': total})
+    total_bytes = int(capacity / 8 * duration)
+    if udp:
+        lost = min(per ** MAC_RETRIES, 1.0) * 100
+        end = {'sum': {'start': 0.0, 'end': float(duration), 'seconds': float(duration),
+                       'bytes': total_bytes, 'bits_per_second': capacity,
+                       'jitter_ms': 0.1, 'lost_packets': 0, 'packets': 0,
+                       'lost_percent': lost, 'sender': True}}
+    else:
+        summary = {'start': 0.0, 'end': float(duration), 'seconds': float(duration),
+                   'bytes': total_bytes, 'bits_per_second': capacity}
+        end = {'sum_sent': dict(summary, retransmits=retransmits * parallel * duration,
+                                sender=True),
+               'sum_received': dict(summary, sender=False)}
+    return {'start': start, 'intervals': intervals, 'end': end}
+
+
+def _iperf_text(document, parallel, error):
+    if error:
+        return f'iperf3: error - {error}'
+    lines = []
+    for interval in document['intervals']:
+        rows = [(str(s['socket']), s) for s in interval['streams']]
+        if parallel > 1:
+            rows.append(('SUM', interval['sum']))
+        for label, row in rows:
+            cwnd = f"    {row['snd_cwnd'] / 1024:.0f} KBytes" if 'snd_cwnd' in row else ''
+            lines.append(f"[{label:>3}]   {row['start']:.2f}-{row['end']:.2f}   sec  "
+                         f"{row['bytes'] / 1024 ** 2:.2f} MBytes  "
+                         f"{row['bits_per_second'] / 1e6:.2f} Mbits/sec  "
+                         f"{row['retransmits']}{cwnd}")
+    return '\n'.join(lines)
+
+
+Mininet_wifi = SimulatedNet
+Mininet = SimulatedNet
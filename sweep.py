@@ -0,0 +1,303 @@
+"""Headless parameter sweeps over scenarios with a process pool and result cache"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from coverage import parse_position
+from handover import APGrid
+from interference import InterferenceEngine
+from scenario import Scenario, ScenarioError, load_scenario
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use without Mininet
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+def set_path(data, path, value):
+    """Set a dotted path such as 'network.noise_th' or 'aps.ap1.position'
+
+    Inside the node lists entries are addressed by name, and '*' applies
+    the value to every entry (e.g. 'stations.*.range').
+    """
+    keys = path.split('.')
+    targets = [data]
+    for key in keys[:-1]:
+        following = []
+        for target in targets:
+            if isinstance(target, list):
+                matches = [entry for entry in target
+                           if key == '*' or entry.get('name') == key]
+                if not matches:
+                    raise ScenarioError(f"{path}: no entry named {key!r}")
+                following.extend(matches)
+            else:
+                following.append(target.setdefault(key, {}))
+        targets = following
+    for target in targets:
+        if isinstance(target, list):
+            raise ScenarioError(f"{path}: path ends inside a list")
+        target[keys[-1]] = value
+
+
+def expand_grid(base, grid):
+    """[(params, scenario data)] for every combination of the grid values"""
+    paths = sorted(grid)
+    points = []
+    for values in itertools.product(*(grid[path] for path in paths)):
+        data = copy.deepcopy(base)
+        params = dict(zip(paths, values))
+        for path, value in params.items():
+            set_path(data, path, value)
+        points.append((params, data))
+    return points
+
+
+def scenario_hash(data, backend=''):
+    blob = json.dumps({'scenario': data, 'backend': backend}, sort_keys=True,
+                      default=str).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+class ResultCache:
+    """One JSON file per scenario hash, written atomically
+
+    An interrupted sweep leaves only complete entries behind, so running
+    it again resumes where it stopped.
+    """
+
+    def __init__(self, directory='.sweep-cache'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        tmp = self._path(key) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w') as handle:
+            json.dump(value, handle)
+        os.replace(tmp, self._path(key))
+
+
+def _components(names, pairs):
+    """{name: component id} for an undirected graph"""
+    parent = {name: name for name in names}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for a, b in pairs:
+        parent[root(a)] = root(b)
+    return {name: root(name) for name in names}
+
+
+def estimate_scenario(data):
+    """Analytic stand-in for an emulation run
+
+    Stations attach to their strongest AP and are reachable from each
+    other when their APs are wired together; without APs, stations are
+    reachable through any multi-hop chain of in-range neighbours.
+    """
+    scenario = Scenario(data)
+    model = scenario.propagation_model()
+    aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+    stations = [spec for spec in scenario.nodes if spec['kind'] == 'station']
+    names = [spec['name'] for spec in stations]
+    result = {'backend': 'estimate', 'associations': {}, 'rssi': {}, 'sinr': {}}
+    if aps:
+        grid = APGrid(aps, model)
+        serving, rssi = grid.best([parse_position(spec['position'])
+                                   for spec in stations])
+        ap_names = [ap['name'] for ap in aps]
+        wired = [(a, b) for a, b, _ in scenario.links if b is not None
+                 and a in ap_names and b in ap_names]
+        component = _components(ap_names, wired)
+        nodes = aps + [dict(spec, channel=aps[max(index, 0)].get('channel', 1))
+                       for spec, index in zip(stations, serving)]
+        engine = InterferenceEngine(nodes, model)
+        for spec, index, level in zip(stations, serving, rssi):
+            ap = ap_names[index] if index >= 0 else None
+            result['associations'][spec['name']] = ap
+            result['rssi'][spec['name']] = float(level) if ap else None
+            if ap:
+                result['sinr'][spec['name']] = float(engine.sinr(
+                    [engine.index[ap]], [engine.index[spec['name']]])[0])
+        group = {name: component[ap] if ap else None
+                 for name, ap in result['associations'].items()}
+    else:
+        plan = scenario.mesh_plan()
+        group = _components(names, plan.neighbors)
+    reachable = {f'{a}_to_{b}': group[a] is not None and group[a] == group[b]
+                 for a, b in itertools.permutations(names, 2)}
+    result['reachable'] = reachable
+    result['reachable_ratio'] = (sum(reachable.values()) / len(reachable)
+                                 if reachable else 0.0)
+    return result
+
+
+def run_emulation(data, settle=5, count=3, simulated=False):
+    """Build the scenario on Mininet-WiFi, measure, and stop it
+
+    With `simulated` the same measurements run against simnet's
+    in-memory backend, which needs neither root nor settling time.
+    mininet.clean.cleanup() is left to the caller: it kills every
+    Mininet network on the host, not just this one.
+    """
+    from association import parse_iw_link, int_to_mac
+    from connectivity import connectivity_matrix
+    from executor import run_batch
+
+    scenario = Scenario(data)
+    net = scenario.build(simulated=simulated)
+    try:
+        if not simulated:
+            time.sleep(settle)
+        stations = [net.get(name) for name in scenario.names('station')]
+        bssids = {intf.mac: ap.name for ap in net.aps for intf in ap.wintfs.values()}
+        links = run_batch({station: f'iw dev {station.name}-wlan0 link'
+                           for station in stations}, timeout=5)
+        result = {'backend': 'simulated' if simulated else 'emulation',
+                  'associations': {}, 'rssi': {}}
+        for station in stations:
+            bssid, signal, _ = parse_iw_link(links[station.name][0].output)
+            result['associations'][station.name] = (
+                bssids.get(int_to_mac(bssid)) if bssid else None)
+            result['rssi'][station.name] = None if signal != signal else signal
+        matrix = connectivity_matrix(stations, count=count)
+        result['reachable'] = {key: value['reachable']
+                               for key, value in matrix.as_dict().items()}
+        result['reachable_ratio'] = (sum(result['reachable'].values())
+                                     / max(len(result['reachable']), 1))
+        return result
+    finally:
+        net.stop()
+
+
+def run_simulated(data, count=3):
+    return run_emulation(data, count=count, simulated=True)
+
+
+BACKENDS = {'emulation': run_emulation, 'simulated': run_simulated,
+            'estimate': estimate_scenario}
+
+
+def default_backend():
+    """Real emulation when Mininet-WiFi is usable here, else the simulated backend"""
+    try:
+        import mn_wifi  # noqa: F401
+    except ImportError:
+        return 'simulated'
+    return 'emulation' if os.geteuid() == 0 else 'simulated'
+
+
+def _run_point(backend, data):
+    began = time.monotonic()
+    result = BACKENDS[backend](data)
+    result['elapsed'] = time.monotonic() - began
+    return result
+
+
+def _store(cache, results, key, run):
+    """Cache the result of `run()` under `key`, logging a failed point"""
+    try:
+        result = run()
+    except Exception as e:  # keep the rest of the sweep going
+        info(f"*** Sweep point {key[:12]} failed: {e}\n")
+        return
+    cache.put(key, result)
+    results[key] = result
+
+
+def run_sweep(base, grid, backend=None, workers=None, cache_dir='.sweep-cache'):
+    """Run every grid point, reusing cached results
+
+    `base` is a scenario dict or file. Simulated and estimated points
+    run in a process pool. Emulated points run one after another in this
+    process, since every Mininet-WiFi network on a host shares
+    mac80211_hwsim, wmediumd, the OVS bridge names and the controller
+    port; the host is cleaned up once after the last point.
+    Returns [(params, result)] in grid order.
+    """
+    backend = backend or default_backend()
+    if backend == 'emulation' and workers not in (None, 1):
+        raise ValueError('emulated sweep points cannot run in parallel; use workers=1')
+    if not isinstance(base, dict):
+        base = load_scenario(base).data
+    cache = ResultCache(cache_dir)
+    points = expand_grid(base, grid)
+    keys = [scenario_hash(data, backend) for _, data in points]
+    results = {key: cache.get(key) for key in keys if key in cache}
+    # Validate up front so a typo fails before any worker starts
+    for _, data in points:
+        Scenario(data).validate()
+    missing = {key: data for key, (_, data) in zip(keys, points) if results.get(key) is None}
+    info(f"*** Sweep: {len(points)} points, {len(points) - len(missing)} cached, "
+         f"{len(missing)} to run on '{backend}'\n")
+
+    if missing and backend == 'emulation':
+        try:
+            for key, data in missing.items():
+                _store(cache, results, key, lambda: _run_point(backend, data))
+        finally:
+            from mininet.clean import cleanup
+            cleanup()
+    elif missing:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(_run_point, backend, data): key
+                       for key, data in missing.items()}
+            for future in as_completed(futures):
+                _store(cache, results, futures[future], future.result)
+    return [(params, results.get(key)) for (params, _), key in zip(points, keys)]
+
+
+def format_sweep(rows, metric='reachable_ratio'):
+    """Plain-text table of run_sweep() output"""
+    lines = []
+    for params, result in rows:
+        label = ', '.join(f'{path}={value}' for path, value in params.items())
+        value = 'failed' if result is None else f"{result.get(metric, float('nan')):.3f}"
+        lines.append(f"{label}: {metric} {value}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('scenario', help='base scenario file (YAML/JSON)')
+    parser.add_argument('grid', help='JSON/YAML mapping of dotted paths to value lists')
+    parser.add_argument('--backend', choices=sorted(BACKENDS))
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--cache', default='.sweep-cache')
+    args = parser.parse_args()
+    with open(args.grid) as handle:
+        if args.grid.endswith(('.yaml', '.yml')):
+            import yaml
+            grid = yaml.safe_load(handle)
+        else:
+            grid = json.load(handle)
+    rows = run_sweep(args.scenario, grid, args.backend, args.workers, args.cache)
+    print(format_sweep(rows))
+
+
+if __name__ == '__main__':
+    main()
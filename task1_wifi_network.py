@@ -1,31 +1,112 @@
-from mininet.net import Mininet
-from mininet.node import Controller, OVSKernelSwitch
-from mininet.cli import CLI
-from mininet.log import setLogLevel, info
-from mn_wifi.net import Mininet_wifi
-from mn_wifi.node import OVSKernelAP, Station
-from mn_wifi.cli import CLI_wifi
-from mn_wifi.link import wmediumd, adhoc
-from mn_wifi.wmediumdConnector import interference
-from mininet.link import Link
-import time
-import threading
+import os
+import sys
+# WIFI_BACKEND=simulated runs on the in-memory backend; anything else
+# needs Mininet-WiFi, so a broken install fails here instead of quietly
+# producing simulated results
+if os.environ.get('WIFI_BACKEND') == 'simulated':
+    from simnet import (CLI, CLI_wifi, Controller, Link, Mininet, Mininet_wifi,
+                        OVSKernelAP, OVSKernelSwitch, Station, adhoc, info,
+                        interference, setLogLevel, wmediumd)
+else:
+    try:
+        from mininet.net import Mininet
+        from mininet.node import Controller, OVSKernelSwitch
+        from mininet.cli import CLI
+        from mininet.log import setLogLevel, info
+        from mn_wifi.net import Mininet_wifi
+        from mn_wifi.node import OVSKernelAP, Station
+        from mn_wifi.cli import CLI_wifi
+        from mn_wifi.link import wmediumd, adhoc
+        from mn_wifi.wmediumdConnector import interference
+        from mininet.link import Link
+    except ImportError as error:
+        raise ImportError(f"{error}; set WIFI_BACKEND=simulated to run without "
+                          "Mininet-WiFi") from error
+from association import AssociationSampler
+from connectivity import connectivity_matrix
+from coverage import compute_coverage
+from executor import run_batch
+from handover import predict_handovers, predict_trace_handovers
+from interference import InterferenceEngine, format_links
+from mobility import MobilityEngine
+from planner import plan_scenario
+from profiling import enable_from_env, format_summary, instrument_net, profiled
+from propagation import PropagationModel
+from renderer import plot_network
+from results import (open_from_env, record_association_history, record_connectivity,
+                     record_handovers, record_iw_link, timed)
+from scenario import Scenario, load_scenario
+from scheduler import EventScheduler, clock_for
+from traces import TraceReplay, TraceWriter, record_positions
+
+# Seconds to wait after the last trajectory ends before measuring
+SETTLE_TIME = 5
+
+# Table 1: Access point placement, positioned to leave a dead spot at (25, 15)
+AP_SPECS = [
+    {'name': f'ap{i}', 'position': position, 'ssid': 'cafeteria-wifi',
+     'mode': 'g', 'channel': '35', 'range': 35,
+     'mac': f'02:00:00:00:0{i}:00', 'ip': f'192.168.1.{i}/24'}
+    for i, position in enumerate(('10,15,0', '20,8,0', '30,22,0', '40,15,0'), 1)
+]
+
+# Propagation and interference parameters shared by the emulation and
+# the offline coverage checks
+PROPAGATION = {'model': 'logDistance', 'exp': 3, 'noise_th': -70, 'fading_cof': 3}
+
+# Area shown by plotGraph()
+MAX_X, MAX_Y = 50, 30
+
+# Declarative copies of the tables, used by the planner
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
 
-def create_network():
-    """Create and configure the WiFi network topology"""
+# Table 2: Mobility Configuration
+MOBILITY_SPECS = [
+    {'name': 'sta1', 'start': (5, 10, 0), 'end': (45, 10, 0),
+     'start_time': 10, 'end_time': 20, 'min_v': 1, 'max_v': 5},
+    {'name': 'sta2', 'start': (15, 25, 0), 'end': (35, 15, 0),
+     'start_time': 30, 'end_time': 60, 'min_v': 5, 'max_v': 10},
+    {'name': 'sta3', 'start': (35, 5, 0), 'end': (15, 20, 0),
+     'start_time': 25, 'end_time': 60, 'min_v': 2, 'max_v': 7},
+]
+
+def station_names(scenario=None):
+    """Stations the experiment drives: the scenario's, or Table 2's"""
+    
+    if scenario is not None:
+        return scenario.names('station')
+    return [spec['name'] for spec in MOBILITY_SPECS]
+
+@profiled()
+def create_network(scenario=None):
+    """Create and configure the WiFi network topology
+    
+    With a scenario (a loaded Scenario or a file such as
+    scenarios/task1.yaml) the topology is built from it instead of the
+    tables below.
+    """
     
     # Set log level
     setLogLevel('info')
     
+    if scenario is not None:
+        if not isinstance(scenario, Scenario):
+            scenario = load_scenario(scenario)
+        return instrument_net(scenario.build(
+            simulated=getattr(Mininet_wifi, 'simulated', False)))
+    
     # Create Mininet-WiFi network with interference support
     net = Mininet_wifi(
         controller=Controller,
         link=wmediumd,
         wmediumd_mode=interference,
-        noise_th=-70,  
-        fading_cof=3  
+        noise_th=PROPAGATION['noise_th'],
+        fading_cof=PROPAGATION['fading_cof']
     )
     
+    # Time configureWifiNodes/build/start/stop when profiling
+    instrument_net(net)
+    
     info("*** Creating network components\n")
     
     # Add controller
@@ -33,41 +114,11 @@ def create_network():
     
 
     # By positions strategically placed to create dead spot at (25, 15)
-    ap1 = net.addAccessPoint('ap1', 
-                            ssid='cafeteria-wifi',
-                            mode='g',
-                            channel='35',
-                            position='10,15,0',
-                            range=35,
-                            mac='02:00:00:00:01:00',
-                            ip='192.168.1.1/24')
-    
-    ap2 = net.addAccessPoint('ap2',
-                            ssid='cafeteria-wifi', 
-                            mode='g',
-                            channel='35',
-                            position='20,8,0',
-                            range=35,
-                            mac='02:00:00:00:02:00',
-                            ip='192.168.1.2/24')
-    
-    ap3 = net.addAccessPoint('ap3',
-                            ssid='cafeteria-wifi',
-                            mode='g', 
-                            channel='35',
-                            position='30,22,0',
-                            range=35,
-                            mac='02:00:00:00:03:00',
-                            ip='192.168.1.3/24')
-    
-    ap4 = net.addAccessPoint('ap4',
-                            ssid='cafeteria-wifi',
-                            mode='g',
-                            channel='35', 
-                            position='40,15,0',
-                            range=35,
-                            mac='02:00:00:00:04:00',
-                            ip='192.168.1.4/24')
+    aps = []
+    for spec in AP_SPECS:
+        params = {key: value for key, value in spec.items() if key != 'name'}
+        aps.append(net.addAccessPoint(spec['name'], **params))
+    ap1, ap2, ap3, ap4 = aps
     
     # Add mobile stations at initial positions
     sta1 = net.addStation('sta1',
@@ -86,7 +137,7 @@ def create_network():
                          ip='192.168.1.13/24')
     
     # Configure propagation model for realistic wireless behavior
-    net.setPropagationModel(model="logDistance", exp=3)
+    net.setPropagationModel(model=PROPAGATION['model'], exp=PROPAGATION['exp'])
     
     info("*** Configuring WiFi nodes\n")
     net.configureWifiNodes()
@@ -98,109 +149,253 @@ def create_network():
     net.addLink(ap2, ap3, cls=Link) 
     net.addLink(ap3, ap4, cls=Link)
     
-    # Plot network topology for visualization
-    net.plotGraph(max_x=50, max_y=30)
+    # Plot network topology for visualization (WIFI_PLOT=throttled renders off-screen)
+    plot_network(net, max_x=MAX_X, max_y=MAX_Y)
     
     
     info("*** Starting network\n") # Start network
     net.build()
     net.start()
     
-    return net
+    # Nodes exist now, so their cmd() calls can be timed too
+    return instrument_net(net)
 
-def implement_mobility(net):
-    """Implement station mobility according to specifications"""
+def check_coverage(resolution=0.5):
+    """Predict RSSI, best server and dead spots for the AP layout
     
-    info("*** Starting mobility simulation\n")
+    Runs offline from AP_SPECS and PROPAGATION, so placements can be
+    checked before the network is started.
+    """
+    
+    model = PropagationModel(**PROPAGATION)
+    coverage = compute_coverage(AP_SPECS, model, MAX_X, MAX_Y, resolution)
+    
+    print(f"Predicted coverage: {coverage.coverage_ratio:.1%} of the area")
+    point = coverage.at(25, 15)
+    print(f"At (25, 15): best server {point['best_server']}, "
+          f"RSSI {point['rssi']:.1f} dBm, SINR {point['sinr']:.1f} dB")
     
-    # Get station objects
-    sta1 = net.get('sta1')
-    sta2 = net.get('sta2') 
-    sta3 = net.get('sta3')
-    
-    def sta1_mobility():
-        """STA1: (5,10) to (45,10) from 10s-20s, speed 1-5"""
-        time.sleep(10)  # Timestamp until 10s
-        info("*** STA1 starting mobility\n")
-        # Move from (5,10) to (45,10) over 10 seconds
-        for t in range(10):
-            x_pos = 5 + (40 * t / 10)  
-            sta1.setPosition(f'{x_pos},10,0')
-            time.sleep(1)
-        info("*** STA1 mobility completed\n")
-    
-    def sta2_mobility():
-        """STA2: (15,25) to (35,15) from 30s-60s, speed 5-10"""
-        time.sleep(30)  # Wait until 30s
-        info("*** STA2 starting mobility\n")
-        # Move from (15,25) to (35,15) over 30 seconds
-        for t in range(30):
-            x_pos = 15 + (20 * t / 30)  
-            y_pos = 25 - (10 * t / 30)  
-            sta2.setPosition(f'{x_pos},{y_pos},0')
-            time.sleep(1)
-        info("*** STA2 mobility completed\n")
-    
-    def sta3_mobility():
-        """STA3: (35,5) to (15,20) from 25s-60s, speed 2-7"""
-        time.sleep(25)  # Timestamp until 25s
-        info("*** STA3 starting mobility\n")
-        # Move from (35,5) to (15,20) over 35 seconds
-        for t in range(35):
-            x_pos = 35 - (20 * t / 35)  
-            y_pos = 5 + (15 * t / 35)   
-            sta3.setPosition(f'{x_pos},{y_pos},0')
-            time.sleep(1)
-        info("*** STA3 mobility completed\n")
-    
-    # Start mobility threads
-    threading.Thread(target=sta1_mobility, daemon=True).start()
-    threading.Thread(target=sta2_mobility, daemon=True).start() 
-    threading.Thread(target=sta3_mobility, daemon=True).start()
+    return coverage
 
-def run_connectivity_tests(net):
-    """Execute ping tests between stations"""
+def estimate_interference(activity=0.5):
+    """Expected downlink SINR, PER and PHY rate from every AP to every station
     
-    info("*** Running connectivity tests\n")
+    Uses the initial station positions; all APs share channel 35, so each
+    link sees the other APs as interferers busy `activity` of the time.
+    """
     
-    # Wait for mobility to complete
-    time.sleep(65)
+    channel = AP_SPECS[0]['channel']
+    nodes = AP_SPECS + [{'name': spec['name'], 'position': spec['start'],
+                         'channel': channel} for spec in MOBILITY_SPECS]
+    engine = InterferenceEngine(nodes, PropagationModel(**PROPAGATION), activity)
+    links = engine.links([(ap['name'], spec['name'])
+                          for ap in AP_SPECS for spec in MOBILITY_SPECS])
     
-    # Get stations
-    sta1 = net.get('sta1')
-    sta2 = net.get('sta2')
-    sta3 = net.get('sta3')
+    print("Estimated downlink quality:")
+    print(format_links(links))
     
-    # Test connectivity between stations
-    info("*** Testing STA1 -> STA2 connectivity\n")
-    result1 = sta1.cmd('ping -c 4 192.168.1.12')
-    print("STA1 to STA2 ping result:")
-    print(result1)
+    return engine
+
+def plan_channels(output='task1-planned.yaml'):
+    """Plan AP channels and tx power and write them into a scenario file
     
-    info("*** Testing STA1 -> STA3 connectivity\n") 
-    result2 = sta1.cmd('ping -c 4 192.168.1.13')
-    print("STA1 to STA3 ping result:")
-    print(result2)
+    The planned scenario can be run with
+    `task1_wifi_network.py scenarios/task1-planned.yaml` and compared
+    with the hand-configured layout.
+    """
     
-    info("*** Testing STA2 -> STA3 connectivity\n")
-    result3 = sta2.cmd('ping -c 4 192.168.1.13')
-    print("STA2 to STA3 ping result:")
-    print(result3)
+    scenario = load_scenario(os.path.join(SCENARIO_DIR, 'task1.yaml'))
+    plan, planned = plan_scenario(scenario)
+    planned.save(os.path.join(SCENARIO_DIR, output))
     
-    return result1, result2, result3
+    print("Channel plan:")
+    print(plan.format())
+    
+    return plan
+
+def predict_timeline(dt=0.1, policy='sticky', hysteresis=3.0, scenario=None,
+                     trace=None):
+    """Predict serving APs and handover instants along the Table 2 paths
+    
+    'sticky' roams the way the emulator does; 'strongest' shows where
+    stations would roam with `hysteresis` dB roaming logic instead.
+    A scenario supplies its own APs, propagation and trajectories; a
+    `trace` replaces the trajectories, as it does in implement_mobility.
+    """
+    
+    if scenario is not None:
+        specs = scenario.mobility
+        aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+        model = scenario.propagation_model()
+    else:
+        specs, aps, model = MOBILITY_SPECS, AP_SPECS, PropagationModel(**PROPAGATION)
+    if trace is not None:
+        timeline = predict_trace_handovers(trace, aps, model, dt=dt,
+                                           hysteresis=hysteresis, policy=policy)
+    else:
+        timeline = predict_handovers(specs, aps, model, dt=dt,
+                                     hysteresis=hysteresis, policy=policy)
+    
+    print("Predicted handovers:")
+    for t, sta_name, old, new in timeline.handovers():
+        print(f"  t={t:6.1f}s {sta_name}: {old or 'none'} -> {new or 'none'}")
+    
+    return timeline
 
-def check_ap_associations(net):
+@profiled()
+def implement_mobility(net, rate=1.0, scheduler=None, trace=None, scenario=None):
+    """Implement station mobility according to specifications
+    
+    With `trace` (a file written by traces.py, e.g. an imported
+    BonnMotion or ns-2 scenario) stations replay it instead of Table 2;
+    with `scenario` they follow its mobility section.
+    """
+    
+    info("*** Starting mobility simulation\n")
+    
+    # One engine drives every station; positions are updated in batches
+    # at `rate` ticks per second
+    if trace is not None:
+        engine = TraceReplay(trace, {sta.name: sta for sta in net.stations}, rate=rate)
+    else:
+        engine = MobilityEngine(rate=rate)
+        specs = MOBILITY_SPECS if scenario is None else scenario.mobility
+        for spec in specs:
+            engine.add_trajectory(net.get(spec['name']),
+                                  spec['start'], spec['end'],
+                                  spec['start_time'], spec['end_time'],
+                                  spec.get('min_v'), spec.get('max_v'))
+    
+    # With a scheduler the ticks become events on its timeline,
+    # otherwise the engine runs in its own background thread
+    if scheduler is not None:
+        engine.schedule(scheduler)
+        return engine
+    return engine.start()
+
+def ap_bssids(net):
+    """Map every AP's wireless MAC (its BSSID) to the AP name"""
+    
+    return {intf.mac: ap.name for ap in net.aps for intf in ap.wintfs.values()}
+
+def schedule_experiment(net, scheduler, interactive=True, rate=1.0,
+                        association_rate=1.0, record=None, trace=None, store=None,
+                        scenario=None):
+    """Put mobility, association checks and ping tests on one timeline
+    
+    `record` names a trace file that receives every position update;
+    `trace` replays a recorded or imported trace instead of Table 2.
+    `store` (a results.ResultsWriter) receives RSSI samples, handovers,
+    association dumps and ping results. With `scenario` its stations,
+    APs and trajectories replace Table 1 and 2.
+    """
+    
+    results = {'predicted': predict_timeline(scenario=scenario, trace=trace)}
+    if record is not None:
+        writer = TraceWriter(record)
+        unhook = record_positions(net.stations, writer, scheduler.now)
+    mobility = implement_mobility(net, rate=rate, scheduler=scheduler, trace=trace,
+                                  scenario=scenario)
+    
+    # Measurements start once the last station has settled
+    end = scheduler.now() + mobility.duration + SETTLE_TIME
+    
+    # Sample association state throughout mobility so handovers are seen
+    sampler = AssociationSampler([net.get(name) for name in station_names(scenario)],
+                                 rate=association_rate)
+    sampler.schedule(scheduler, until=end)
+    
+    def handovers():
+        sampler.stop()
+        if record is not None:
+            unhook()
+            writer.close()
+            info(f"*** {len(writer)} position updates recorded to {record}\n")
+        results['handovers'] = sampler.history.handovers(ap_bssids(net))
+        if store is not None:
+            record_association_history(store, sampler.history, ap_bssids(net))
+            record_handovers(store, results['handovers'])
+        print("Handover timeline:")
+        for t, sta_name, old, new in results['handovers']:
+            print(f"  t={t:6.1f}s {sta_name}: {old or 'none'} -> {new or 'none'}")
+        
+        # Sampling quantizes handover times to 1/association_rate
+        check = results['predicted'].compare(results['handovers'],
+                                             tolerance=2.0 / association_rate)
+        for t, sta_name, old, new in check['missing']:
+            print(f"  predicted but not seen: t={t:.1f}s {sta_name} {old} -> {new}")
+        for t, sta_name, old, new in check['unexpected']:
+            print(f"  seen but not predicted: t={t:.1f}s {sta_name} {old} -> {new}")
+    
+    def associations():
+        if interactive:
+            print("Mobility completed - take final screenshot now")
+            input("Press Enter to check AP associations...")
+        results['associations'] = check_ap_associations(net, scenario)
+        if store is not None:
+            record_iw_link(store, results['associations'], ap_bssids(net), scheduler.now())
+    
+    def connectivity():
+        if interactive:
+            input("Press Enter to run connectivity tests...")
+        results['ping_results'] = run_connectivity_tests(net, scenario=scenario)
+        if store is not None:
+            record_connectivity(store, results['ping_results'], scheduler.now())
+    
+    scheduler.at(end, handovers, name='handover-timeline')
+    scheduler.at(end, associations, name='association-check')
+    scheduler.at(end, connectivity, name='connectivity-tests')
+    
+    return results
+
+@profiled()
+def run_experiment(net, clock=None, interactive=False, rate=1.0,
+                   association_rate=1.0, record=None, trace=None, store=None,
+                   scenario=None):
+    """Run the full Task 1 timeline and return the collected results
+    
+    Simulated backends get a virtual clock so the 60 s timeline finishes
+    in milliseconds; a real network sleeps only until the next event.
+    """
+    
+    scheduler = EventScheduler(clock_for(net) if clock is None else clock)
+    results = schedule_experiment(net, scheduler, interactive, rate,
+                                  association_rate, record, trace, store, scenario)
+    scheduler.run()
+    
+    return results
+
+@profiled()
+def run_connectivity_tests(net, count=4, scenario=None):
+    """Execute ping tests between stations"""
+    
+    info("*** Running connectivity tests\n")
+    
+    # Probe every station pair at once and collect loss/RTT per pair
+    stations = [net.get(name) for name in station_names(scenario)]
+    matrix = connectivity_matrix(stations, count=count)
+    
+    print("Station connectivity results:")
+    print(matrix.format())
+    
+    return matrix
+
+@profiled()
+def check_ap_associations(net, scenario=None):
     """Check which AP each station is associated with"""
     
     info("*** Checking AP associations\n")
     
-    stations = ['sta1', 'sta2', 'sta3']
+    stations = station_names(scenario)
     associations = {}
     
+    # Check wireless interface link status on every station at once
+    batch = {net.get(sta_name): 'iw dev ' + sta_name + '-wlan0 link'
+             for sta_name in stations}
+    results = run_batch(batch, timeout=5)
+    
     for sta_name in stations:
-        sta = net.get(sta_name)
-        # Check wireless interface link status
-        result = sta.cmd('iw dev ' + sta_name + '-wlan0 link')
+        result = results[sta_name][0].output
         associations[sta_name] = result
         print(f"{sta_name} association:")
         print(result)
@@ -211,31 +406,36 @@ def check_ap_associations(net):
 def main():
     """Main function to orchestrate the network emulation"""
     
+    # WIFI_PROFILE=<prefix> writes <prefix>.json and <prefix>.trace.json
+    profiler, profile_prefix = enable_from_env()
+    
+    # WIFI_RESULTS=<dir> stores the run's manifest and measurements
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    scenario = load_scenario(path) if path else None
+    store = open_from_env({'task': 1, 'scenario': path, 'propagation': PROPAGATION,
+                           'backend': 'simulated' if getattr(Mininet_wifi, 'simulated', False)
+                           else 'emulation'})
+    status = 'failed'
+    
     try:
         # Create network
-        net = create_network()
+        # Optional scenario file, e.g. scenarios/task1.yaml
+        with timed(store, 'create_network'):
+            net = create_network(scenario)
         
         print("Network created successfully!")
         print("Initial network state - take screenshot now")
         input("Press Enter to start mobility simulation...")
         
-        # Start mobility simulation
-        implement_mobility(net)
-        
-        # Wait for mobility to complete and take final screenshot
-        print("Mobility in progress... Wait 65 seconds for completion")
-        time.sleep(65)
-        
-        print("Mobility completed - take final screenshot now")
-        input("Press Enter to check AP associations...")
-        
-        # Check AP associations
-        associations = check_ap_associations(net)
-        
-        input("Press Enter to run connectivity tests...")
-        
-        # Run connectivity tests  
-        ping_results = run_connectivity_tests(net)
+        # Mobility, association checks and connectivity tests run as
+        # events on one timeline instead of fixed sleeps
+        print("Mobility in progress... measurements follow once it completes")
+        with timed(store, 'experiment'):
+            results = run_experiment(net, interactive=True, store=store,
+                                     scenario=scenario)
+        associations = results['associations']
+        ping_results = results['ping_results']
+        status = 'complete'
         
         print("\n*** Network emulation completed successfully! ***")
         print("All required data has been collected.")
@@ -253,6 +453,12 @@ def main():
         if 'net' in locals():
             info("*** Stopping network\n")
             net.stop()
+        if store is not None:
+            store.close(status)
+        if profiler is not None:
+            print(format_summary(profiler.summary()))
+            json_path, trace_path = profiler.save(profile_prefix)
+            print(f"Profile written to {json_path} and {trace_path}")
             
   # Run the main function
 if __name__ == '__main__':
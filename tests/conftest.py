@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The task scripts only fall back to simnet when asked to
+os.environ.setdefault('WIFI_BACKEND', 'simulated')
+
+
+@pytest.fixture(autouse=True)
+def no_plot(monkeypatch):
+    """Scenario files ask for a plot; tests never draw one"""
+    monkeypatch.setenv('WIFI_PLOT', 'off')
+
+
+@pytest.fixture
+def scenario_path():
+    return lambda name: os.path.join(ROOT, 'scenarios', name)
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from association import NOT_CONNECTED, int_to_mac, mac_to_int, parse_iw_link
+
+# `iw dev sta1-wlan0 link` on Mininet-WiFi (iw 5.4)
+CONNECTED = """Connected to 02:00:00:00:01:00 (on sta1-wlan0)
+\tSSID: ssid-ap1
+\tfreq: 5180
+\tRX: 16874 bytes (216 packets)
+\tTX: 2351 bytes (24 packets)
+\tsignal: -52 dBm
+\trx bitrate: 54.0 MBit/s
+\ttx bitrate: 48.0 MBit/s
+
+\tbss flags:\tshort-slot-time
+\tdtim period:\t2
+\tbeacon int:\t100
+"""
+
+# Right after association, before the first data frame is sent
+NO_BITRATE = """Connected to 02:00:00:00:02:00 (on sta2-wlan0)
+\tSSID: ssid-ap2
+\tfreq: 5200
+\tRX: 420 bytes (5 packets)
+\tTX: 0 bytes (0 packets)
+\tsignal: -71 dBm
+
+\tbss flags:\tshort-slot-time
+\tdtim period:\t2
+\tbeacon int:\t100
+"""
+
+
+@pytest.mark.parametrize('convert', [str, str.encode])
+def test_connected(convert):
+    bssid, signal, bitrate = parse_iw_link(convert(CONNECTED))
+    assert int_to_mac(bssid) == '02:00:00:00:01:00'
+    assert signal == -52.0
+    assert bitrate == 48.0
+
+
+@pytest.mark.parametrize('convert', [str, str.encode])
+def test_not_connected(convert):
+    bssid, signal, bitrate = parse_iw_link(convert('Not connected.\n'))
+    assert bssid == NOT_CONNECTED
+    assert math.isnan(signal) and math.isnan(bitrate)
+
+
+def test_missing_bitrate():
+    bssid, signal, bitrate = parse_iw_link(NO_BITRATE)
+    assert bssid == mac_to_int('02:00:00:00:02:00')
+    assert signal == -71.0
+    assert math.isnan(bitrate)
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+from benchmark import compare, load_baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_tiny_run_against_the_stored_baseline():
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'benchmark.py'),
+                             '--sizes', '10', '--repeat', '1'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'REGRESSION' not in result.stdout
+    baseline = load_baseline('simulated')
+    rows = [line.split() for line in result.stdout.splitlines()[1:]]
+    assert {row[0] for row in rows} == {key for key in baseline['phases'] if '/10/' in key}
+    # Every phase was compared, not just printed
+    assert all(row[2] != '-' for row in rows)
+
+
+def test_compare_allows_noise_but_flags_slowdowns():
+    baseline = {'threshold': 0.5, 'noise_floor': 0.02,
+                'phases': {'task1/10/build': 0.010, 'task1/100/build': 1.0}}
+    assert compare({'task1/10/build': 0.029, 'task1/100/build': 1.5}, baseline) == []
+    assert compare({'task1/10/build': 0.040, 'task1/100/build': 1.6, 'new/1/x': 9.0},
+                   baseline) == [('task1/10/build', 0.010, 0.040), ('task1/100/build', 1.0, 1.6)]
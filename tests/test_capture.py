@@ -0,0 +1,50 @@
+import struct
+import time
+
+from capture import LINKTYPE_RAW, LiveAnalysis, TrafficCapture
+
+
+def _write_pcap(path, count):
+    data = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 28, 0, 0, 64, 17, 0,
+                       bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2])) + struct.pack('!HHHH', 698, 698, 8, 0)
+    with open(path, 'wb') as handle:
+        handle.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 262144, LINKTYPE_RAW))
+        for i in range(count):
+            handle.write(struct.pack('<IIII', 100 + i, 0, len(data), len(data)) + data)
+
+
+def test_full_packets_unless_snaplen_given():
+    assert '-s' not in TrafficCapture('sta1-wlan0').command()
+    command = TrafficCapture('sta1-wlan0', snaplen=128).command()
+    assert command[command.index('-s') + 1] == '128'
+
+
+def test_ring_files():
+    capture = TrafficCapture('eth0', filename='ring.pcap', ring_files=12, file_size_mb=1)
+    assert capture.files()[:2] == ['ring.pcap00', 'ring.pcap01']
+    assert capture.following('ring.pcap11') == 'ring.pcap00'
+
+
+def test_size_rotation_without_ring(tmp_path):
+    base = str(tmp_path / 'cap.pcap')
+    for suffix in ('', '1', '2', '10', '.idx'):
+        _write_pcap(base + suffix, 1)
+    capture = TrafficCapture('eth0', filename=base, file_size_mb=1)
+    assert capture.files() == [base, base + '1', base + '2', base + '10']
+    assert capture.following(base) == base + '1'
+    assert capture.following(base + '10') == base + '11'
+    assert TrafficCapture('eth0', filename=base).files() == [base]
+
+
+def test_live_analysis_follows_size_rotation(tmp_path):
+    base = str(tmp_path / 'cap.pcap')
+    _write_pcap(base, 2)
+    live = LiveAnalysis(TrafficCapture('eth0', filename=base, file_size_mb=1),
+                        interval=0.01).start()
+    for suffix, count, total in (('', 0, 2), ('1', 3, 5), ('2', 4, 9)):
+        if count:
+            _write_pcap(base + suffix, count)
+        deadline = time.time() + 5
+        while live.analyzer.packets < total and time.time() < deadline:
+            time.sleep(0.01)
+    assert live.stop()['olsr_packets'] == 9
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+
+from connectivity import (PROBE_MARKER, connectivity_matrix, parse_ping, probe_command,
+                          split_probe_output)
+from scenario import load_scenario
+
+REPLIES = """PING 192.168.1.12 (192.168.1.12) 56(84) bytes of data.
+64 bytes from 192.168.1.12: icmp_seq=1 ttl=64 time=0.412 ms
+64 bytes from 192.168.1.12: icmp_seq=3 ttl=64 time=1.73 ms
+
+--- 192.168.1.12 ping statistics ---
+4 packets transmitted, 2 received, 50% packet loss, time 3041ms
+rtt min/avg/max/mdev = 0.412/1.071/1.730/0.659 ms
+"""
+
+NO_REPLY = """PING 192.168.1.13 (192.168.1.13) 56(84) bytes of data.
+From 192.168.1.11 icmp_seq=1 Destination Host Unreachable
+
+--- 192.168.1.13 ping statistics ---
+4 packets transmitted, 0 received, +4 errors, 100% packet loss, time 3062ms
+"""
+
+BUSYBOX = """PING 10.0.0.2 (10.0.0.2): 56 data bytes
+
+--- 10.0.0.2 ping statistics ---
+3 packets transmitted, 3 packets received, 0% packet loss
+round-trip min/avg/max = 0.1/0.2/0.3 ms
+"""
+
+
+def test_partial_loss_with_rtt():
+    result = parse_ping(REPLIES)
+    assert (result['transmitted'], result['received']) == (4, 2)
+    assert result['loss'] == 50.0 and result['reachable']
+    assert (result['min'], result['avg'], result['max'], result['mdev']) == \
+        (0.412, 1.071, 1.730, 0.659)
+
+
+def test_full_loss_has_no_rtt():
+    result = parse_ping(NO_REPLY)
+    assert result['loss'] == 100.0 and not result['reachable']
+    assert all(math.isnan(result[key]) for key in ('min', 'avg', 'max', 'mdev'))
+
+
+def test_rtt_line_without_mdev_is_ignored():
+    result = parse_ping(BUSYBOX)
+    assert result['loss'] == 0.0 and result['reachable']
+    assert math.isnan(result['avg'])
+
+
+def test_no_output_counts_as_lost():
+    result = parse_ping('')
+    assert result['transmitted'] == 0 and result['loss'] == 100.0
+    assert not result['reachable']
+
+
+def test_split_probe_output():
+    command = probe_command(['192.168.1.12', '192.168.1.13'], count=4)
+    assert command.count('ping -c 4 -W 1') == 2 and 'wait $p0 $p1' in command
+    # Shell noise before the first marker is dropped; chunks follow marker order
+    output = (f'[1] 4242\n{PROBE_MARKER} 1\n{NO_REPLY}{PROBE_MARKER} 0\n{REPLIES}')
+    chunks = split_probe_output(output, 3)
+    assert parse_ping(chunks[0])['received'] == 2
+    assert parse_ping(chunks[1])['received'] == 0
+    assert chunks[2] == ''
+
+
+def test_simulated_matrix(scenario_path):
+    net = load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    try:
+        # Far outside every AP's range
+        net.get('sta3').setPosition('200,200,0')
+        matrix = connectivity_matrix(net.stations, count=2)
+    finally:
+        net.stop()
+    assert list(matrix.pairs()) == [(a, b) for a in ('sta1', 'sta2', 'sta3')
+                                    for b in ('sta1', 'sta2', 'sta3') if a != b]
+    expected = np.array([[False, True, False], [True, False, False], [False, False, False]])
+    assert (matrix.reachable == expected).all()
+    assert matrix.get('sta1', 'sta2')['loss'] == 0.0
+    assert matrix.get('sta1', 'sta3')['loss'] == 100.0
+    assert np.isnan(matrix['avg'][2, 2])
@@ -0,0 +1,81 @@
+import asyncio
+import subprocess
+import time
+
+import pytest
+
+from executor import TIMEOUT_MARKER, BatchExecutor, run_batch, with_timeout
+
+
+class ShellNode:
+    """Stand-in for a node shell that runs commands with the host's bash"""
+
+    def __init__(self, name):
+        self.name = name
+        self.commands = []
+
+    def cmd(self, command):
+        self.commands.append(command)
+        return subprocess.run(['bash', '-c', command], capture_output=True,
+                              text=True).stdout
+
+
+class BrokenNode:
+    name = 'broken'
+
+    def cmd(self, command):
+        raise OSError('shell died')
+
+
+def test_commands_keep_order_per_node():
+    nodes = [ShellNode(f'n{i}') for i in range(3)]
+    results = run_batch({node: ['echo one', f'echo {node.name}'] for node in nodes})
+    assert [r.output for r in results['n2']] == ['one\n', 'n2\n']
+    assert all(r.ok for rs in results.values() for r in rs)
+
+
+def test_nodes_run_in_parallel():
+    nodes = [ShellNode(f'n{i}') for i in range(8)]
+    began = time.monotonic()
+    run_batch({node: 'sleep 0.3' for node in nodes})
+    assert time.monotonic() - began < 8 * 0.3 / 2
+
+
+def test_timeout_marks_and_strips_output():
+    node = ShellNode('slow')
+    began = time.monotonic()
+    result = run_batch({node: 'echo started; sleep 10'}, timeout=0.5)['slow'][0]
+    assert time.monotonic() - began < 5
+    assert result.timed_out and not result.ok
+    assert result.output.strip() == 'started'
+    assert TIMEOUT_MARKER not in result.output
+    assert result.command == 'echo started; sleep 10'
+    assert node.commands == [with_timeout('echo started; sleep 10', 0.5)]
+
+
+def test_fast_command_under_timeout():
+    result = run_batch({ShellNode('fast'): "echo 'quoted; text'"}, timeout=5)['fast'][0]
+    assert result.ok
+    assert result.output == 'quoted; text\n'
+
+
+def test_broken_shell_does_not_sink_batch():
+    results = run_batch({BrokenNode(): 'true', ShellNode('fine'): 'echo ok'})
+    assert isinstance(results['broken'][0].error, OSError)
+    assert results['fine'][0].output == 'ok\n'
+
+
+def test_report_and_async():
+    nodes = [ShellNode('a'), ShellNode('b')]
+    with BatchExecutor(workers=2) as executor:
+        results = asyncio.run(executor.run_async({node: ['true', 'true'] for node in nodes}))
+        assert sorted(results) == ['a', 'b']
+        report = executor.report()
+    assert report['a']['commands'] == 2
+    assert report['a']['max'] >= report['a']['mean'] > 0
+
+
+@pytest.mark.parametrize('plan', [{}, {ShellNode('idle'): []}])
+def test_outputs_of_empty_plans(plan):
+    with BatchExecutor() as executor:
+        assert executor.outputs(plan) == {node.name: '' for node in plan}
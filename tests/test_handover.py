@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from handover import predict_handovers, trajectory_positions
+from propagation import PropagationModel
+from scenario import load_scenario
+
+
+@pytest.fixture
+def task1(scenario_path):
+    scenario = load_scenario(scenario_path('task1.yaml'))
+    aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+    return scenario, aps
+
+
+def test_sticky_stays_until_out_of_range(task1):
+    scenario, aps = task1
+    timeline = predict_handovers(scenario.mobility, aps, scenario.propagation_model())
+    # sta1 passes ap2 and ap3 but keeps ap1 until it leaves ap1's 35 m range
+    assert timeline.handovers() == [(20.0, 'sta1', 'ap1', 'ap4')]
+
+
+def test_strongest_roams_more(task1):
+    scenario, aps = task1
+    timeline = predict_handovers(scenario.mobility, aps, scenario.propagation_model(),
+                                 hysteresis=3.0, policy='strongest')
+    assert len(timeline.handovers()) > 1
+    assert timeline.serving_at('sta1', 60) == 'ap4'
+
+
+def test_range_bounds_service():
+    aps = [{'name': 'ap1', 'position': '0,0,0', 'channel': 1, 'range': 20}]
+    specs = [{'name': 'sta', 'start': (0, 0, 0), 'end': (40, 0, 0),
+              'start_time': 0, 'end_time': 40}]
+    timeline = predict_handovers(specs, aps, PropagationModel(exp=3, noise_th=-70), dt=0.5)
+    (t, _, old, new), = timeline.handovers()
+    assert (old, new) == ('ap1', None)
+    assert t == pytest.approx(20.0, abs=0.5)
+
+
+def test_unknown_policy(task1):
+    scenario, aps = task1
+    with pytest.raises(ValueError, match='unknown policy'):
+        predict_handovers(scenario.mobility, aps, policy='nearest')
+
+
+def test_matches_simulated_run(task1):
+    import task1_wifi_network
+    scenario, aps = task1
+    net = scenario.build(simulated=True)
+    try:
+        results = task1_wifi_network.run_experiment(net, association_rate=2.0)
+    finally:
+        net.stop()
+    check = results['predicted'].compare(results['handovers'], tolerance=1.0)
+    assert check['missing'] == [] and check['unexpected'] == []
+    assert len(check['matched']) == 1
+
+
+def test_experiment_follows_the_scenario(scenario_path):
+    import yaml
+    import task1_wifi_network
+    with open(scenario_path('task1.yaml')) as handle:
+        data = yaml.safe_load(handle)
+    # Two renamed stations; only the first moves, across to ap4
+    data['stations'] = [dict(data['stations'][0], name='phone'),
+                        dict(data['stations'][1], name='laptop')]
+    data['mobility'] = [dict(data['mobility'][0], name='phone', start_time=2, end_time=8)]
+    scenario = load_scenario(data)
+    net = scenario.build(simulated=True)
+    try:
+        results = task1_wifi_network.run_experiment(net, association_rate=2.0,
+                                                    scenario=scenario)
+    finally:
+        net.stop()
+    assert list(results['associations']) == ['phone', 'laptop']
+    assert [name for _, name, _, _ in results['handovers']] == ['phone']
+    check = results['predicted'].compare(results['handovers'], tolerance=1.0)
+    assert check['missing'] == [] and check['unexpected'] == []
+
+
+def test_speed_bounds_are_optional(task1):
+    import task1_wifi_network
+    scenario, _ = task1
+    data = dict(scenario.data, mobility=[{key: value for key, value in spec.items()
+                                          if key not in ('min_v', 'max_v')}
+                                         for spec in scenario.data['mobility']])
+    scenario = load_scenario(data)
+    net = scenario.build(simulated=True)
+    try:
+        results = task1_wifi_network.run_experiment(net, association_rate=2.0,
+                                                    scenario=scenario)
+    finally:
+        net.stop()
+    check = results['predicted'].compare(results['handovers'], tolerance=1.0)
+    assert check['missing'] == [] and check['unexpected'] == []
+    assert len(check['matched']) == 1
+
+
+def test_trace_replay_is_predicted_from_the_trace(task1, tmp_path):
+    import task1_wifi_network
+    scenario, _ = task1
+    path = str(tmp_path / 'task1.trc')
+    net = scenario.build(simulated=True)
+    try:
+        task1_wifi_network.run_experiment(net, record=path)
+    finally:
+        net.stop()
+    # Replay with no mobility section: only the trace moves sta1
+    scenario = load_scenario(dict(scenario.data, mobility=[]))
+    net = scenario.build(simulated=True)
+    try:
+        results = task1_wifi_network.run_experiment(net, association_rate=2.0,
+                                                    trace=path, scenario=scenario)
+    finally:
+        net.stop()
+    check = results['predicted'].compare(results['handovers'], tolerance=1.0)
+    assert check['missing'] == [] and check['unexpected'] == []
+    assert [event[1] for event, _ in check['matched']] == ['sta1']
+
+
+def test_zero_length_trajectory_arrives():
+    specs = [{'start': (0, 0), 'end': (10, 0), 'start_time': 5, 'end_time': 5}]
+    assert trajectory_positions(specs, np.array([4.0, 5.0]))[:, 0, 0].tolist() == [0, 10]
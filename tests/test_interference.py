@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from interference import InterferenceEngine, channel_overlap
+from propagation import PropagationModel
+
+
+def layout(rng, count=12):
+    return [{'name': f'n{i}',
+             'position': [float(v) for v in rng.uniform(0, [120, 80, 5])],
+             'channel': int(rng.choice([1, 3, 6, 11])),
+             'range': float(rng.uniform(20, 60))}
+            for i in range(count)]
+
+
+def test_incremental_moves_match_full_recompute():
+    rng = np.random.default_rng(7)
+    nodes = layout(rng)
+    model = PropagationModel(exp=3.0)
+    activity = rng.uniform(0.1, 1.0, len(nodes))
+    engine = InterferenceEngine(nodes, model, activity)
+    for _ in range(20):
+        movers = rng.choice(len(nodes), size=int(rng.integers(1, 5)), replace=False)
+        moves = {f'n{i}': [float(v) for v in rng.uniform(0, [120, 80, 5])] for i in movers}
+        engine.move(moves)
+        for name, position in moves.items():
+            nodes[engine.index[name]]['position'] = position
+    fresh = InterferenceEngine(nodes, model, activity)
+    np.testing.assert_allclose(engine.positions, fresh.positions)
+    np.testing.assert_allclose(engine.power, fresh.power, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(engine.total, fresh.total, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(engine.links()['sinr'], fresh.links()['sinr'], atol=1e-9)
+
+
+def test_move_without_nodes_is_a_no_op():
+    engine = InterferenceEngine(layout(np.random.default_rng(1), 4))
+    power, total = engine.power.copy(), engine.total.copy()
+    engine.move({})
+    assert (engine.power == power).all() and (engine.total == total).all()
+
+
+@pytest.mark.parametrize('a, b, overlap', [
+    (6, 6, 1.0),      # co-channel
+    (36, 36, 1.0),
+    (1, 2, 0.8),      # adjacent 2.4 GHz channels share most of the band
+    (1, 3, 0.6),
+    (3, 1, 0.6),
+    (1, 6, 0.0),      # the usual non-overlapping 1/6/11 plan
+    (6, 11, 0.0),
+    (1, 14, 0.0),
+    (36, 40, 0.0),    # 5 GHz channels never overlap each other
+    (11, 36, 0.0),
+])
+def test_channel_overlap(a, b, overlap):
+    assert channel_overlap(a, b) == pytest.approx(overlap)
+
+
+def test_channel_overlap_broadcasts():
+    result = channel_overlap(np.array([[1], [6]]), np.array([[1, 4, 11]]))
+    np.testing.assert_allclose(result, [[1.0, 0.4, 0.0], [0.0, 0.6, 0.0]])
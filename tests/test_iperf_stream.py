@@ -0,0 +1,67 @@
+import json
+
+from iperf_stream import (iperf3_version, iperf_client_command, stream_iperf,
+                          supports_json_stream)
+
+
+def _document(intervals=3, rate=20e6):
+    return {
+        'start': {},
+        'intervals': [{'sum': {'start': float(i), 'end': i + 1.0, 'bytes': int(rate / 8),
+                               'bits_per_second': rate, 'retransmits': i},
+                       'streams': [{'snd_cwnd': 65536, 'rtt': 4000}]}
+                      for i in range(intervals)],
+        'end': {'sum_sent': {'bytes': int(rate / 8) * intervals, 'seconds': intervals,
+                             'bits_per_second': rate},
+                'sum_received': {'bytes': int(rate / 8) * intervals, 'seconds': intervals,
+                                 'bits_per_second': rate}},
+    }
+
+
+class OldIperfNode:
+    """Node whose iperf3 (3.9, Ubuntu 22.04) predates --json-stream"""
+
+    name = 'sta1'
+
+    def __init__(self):
+        self.commands = []
+
+    def cmd(self, command):
+        self.commands.append(command)
+        if '--version' in command:
+            return 'iperf 3.9 (cJSON 1.7.13)\nLinux sta1 5.15.0 #1 SMP x86_64\n'
+        if '-J' in command:
+            return json.dumps(_document())
+        return ''
+
+    def popen(self, *args, **kwargs):
+        raise AssertionError('streaming needs --json-stream')
+
+
+def test_version_detection():
+    assert iperf3_version(OldIperfNode()) == (3, 9)
+    assert not supports_json_stream(OldIperfNode())
+
+
+def test_old_iperf_falls_back_to_json_document():
+    node = OldIperfNode()
+    seen = []
+    stream = stream_iperf(node, '192.168.2.2', duration=3, on_sample=seen.append)
+    assert node.commands[-1] == iperf_client_command('192.168.2.2', 5001, 3, 'json')
+    assert [sample['retransmits'] for sample in seen] == [0, 1, 2]
+    assert len(stream.samples) == 3
+    assert stream.document()['end']['sum_received']['bits_per_second'] == 20e6
+
+
+def test_simulated_iperf_streams(scenario_path):
+    from scenario import load_scenario
+    net = load_scenario(scenario_path('task2.yaml')).build(simulated=True)
+    try:
+        client, server = net.get('adhoc1'), net.get('adhoc2')
+        assert supports_json_stream(client)
+        server.cmd('iperf3 -s -p 5001 -D')
+        stream = stream_iperf(client, server.IP(), duration=5)
+        assert len(stream.samples) == 5
+        assert stream.document() is not None
+    finally:
+        net.stop()
@@ -0,0 +1,94 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from mesh import SpatialHash, build_mesh, plan_mesh
+from propagation import DEFAULT_ANTENNA_GAIN
+from simnet import SimulatedNet, adhoc
+
+
+def brute_force(nodes, exp=2.0, interference_factor=2.0, default_range=30.0):
+    """Every pair checked directly, as plan_mesh would without the hash"""
+    neighbors, interference = set(), set()
+    for a, b in itertools.combinations(nodes, 2):
+        distance = np.linalg.norm(np.subtract(a['position'], b['position']))
+        extra = (a.get('antennaGain', DEFAULT_ANTENNA_GAIN)
+                 + b.get('antennaGain', DEFAULT_ANTENNA_GAIN) - 2 * DEFAULT_ANTENNA_GAIN)
+        reach = (max(a.get('range', default_range), b.get('range', default_range))
+                 * 10 ** (extra / (10 * exp)))
+        if distance <= reach:
+            neighbors.add((a['name'], b['name']))
+        elif distance <= reach * interference_factor:
+            interference.add((a['name'], b['name']))
+    return neighbors, interference
+
+
+def ordered(pairs, names):
+    """Pairs keyed in layout order so both sides compare equal"""
+    index = {name: i for i, name in enumerate(names)}
+    return {tuple(sorted(pair, key=index.get)) for pair in pairs}
+
+
+def test_pairs_match_brute_force():
+    rng = np.random.default_rng(3)
+    points = rng.uniform(0, 100, (200, 3))
+    i, j, distance = SpatialHash(points, 12.5).pairs()
+    found = {(min(a, b), max(a, b)) for a, b, d in zip(i, j, distance) if d <= 12.5}
+    expected = {(a, b) for a, b in itertools.combinations(range(len(points)), 2)
+                if np.linalg.norm(points[a] - points[b]) <= 12.5}
+    assert found == expected
+    assert len(i) == len({(min(a, b), max(a, b)) for a, b in zip(i, j)})
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_plan_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    nodes = []
+    for index in range(80):
+        node = {'name': f'n{index}',
+                'position': [float(v) for v in rng.uniform(0, [300, 300, 30])]}
+        if index % 3 == 0:
+            node['range'] = float(rng.uniform(10, 60))
+        if index % 4 == 0:
+            # Gains above the default stretch the reach past the cell size
+            node['antennaGain'] = float(rng.uniform(0, 12))
+        nodes.append(node)
+    plan = plan_mesh(nodes, exp=2.5)
+    names = [node['name'] for node in nodes]
+    neighbors, interference = brute_force(nodes, exp=2.5)
+    assert ordered(plan.neighbors, names) == ordered(neighbors, names)
+    assert ordered(plan.interference, names) == ordered(interference, names)
+    assert neighbors and interference
+
+
+def test_height_counts_towards_distance():
+    nodes = [{'name': 'ground', 'position': [0, 0, 0]},
+             {'name': 'mast', 'position': [0, 0, 40]}]
+    plan = plan_mesh(nodes, default_range=30.0)
+    assert plan.neighbors == []
+    assert plan.interference == [('ground', 'mast')]
+    assert plan.isolated() == ['ground', 'mast']
+
+
+def test_one_link_per_node_joins_the_mesh():
+    net = SimulatedNet()
+    specs = [{'name': f'sta{i}', 'position': f'{40 * i},0,0', 'range': 50}
+             for i in range(4)]
+    stations = [net.addStation(spec['name'], position=spec['position'], range=spec['range'])
+                for spec in specs]
+    calls = []
+    add_link = net.addLink
+    net.addLink = lambda *args, **kwargs: calls.append(args) or add_link(*args, **kwargs)
+    build_mesh(net, stations, adhoc, ssid='adhocNet', channel=5)
+    net.build()
+    net.start()
+    try:
+        assert calls == [(station,) for station in stations]
+        assert all(station.ibss == ('adhocNet', 5) for station in stations)
+        # Without a routing daemon only the planned neighbours reach each other
+        direct = {(a.name, b.name) for a, b in itertools.combinations(stations, 2)
+                  if net.path(a, b) is not None}
+        assert direct == set(plan_mesh(specs).neighbors)
+    finally:
+        net.stop()
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from mobility import MobilityEngine, _as_point, format_position
+from scheduler import EventScheduler, VirtualClock
+
+
+class FakeStation:
+    def __init__(self, name):
+        self.name = name
+        self.moves = []
+
+    def setPosition(self, position):
+        self.moves.append(position)
+
+
+def _engine(rate=1.0):
+    """Table 2 of Readme.md"""
+    engine = MobilityEngine(rate)
+    stations = [FakeStation(f'sta{i}') for i in (1, 2, 3)]
+    engine.add_trajectory(stations[0], '5,10,0', '45,10,0', 10, 20, 1, 5)
+    engine.add_trajectory(stations[1], '15,25,0', '35,15,0', 30, 60, 5, 10)
+    engine.add_trajectory(stations[2], '35,5,0', '15,20,0', 25, 60, 2, 7)
+    return engine, stations
+
+
+def test_positions_interpolate_and_clamp():
+    engine, _ = _engine()
+    assert engine.positions(0).tolist() == [[5, 10, 0], [15, 25, 0], [35, 5, 0]]
+    assert engine.positions(15)[0].tolist() == [25, 10, 0]
+    assert engine.positions(45)[1].tolist() == [25, 20, 0]
+    assert engine.positions(100).tolist() == [[45, 10, 0], [35, 15, 0], [15, 20, 0]]
+    assert engine.duration == 60
+
+
+def test_speeds_against_table_bounds():
+    engine, _ = _engine()
+    assert engine.speeds() == pytest.approx([4.0, np.hypot(20, 10) / 30, 25 / 35])
+    # sta2 needs 0.75 m/s but may not go below 5; sta3 needs 0.71, minimum 2
+    assert engine.speed_violations() == ['sta2', 'sta3']
+
+
+def test_zero_length_interval_jumps():
+    engine = MobilityEngine()
+    engine.add_trajectory(FakeStation('s'), [0, 0], [10, 0], 5, 5)
+    assert engine.positions(4.9)[0].tolist() == [0, 0, 0]
+    assert engine.positions(5)[0].tolist() == [10, 0, 0]
+
+
+def test_tick_moves_only_changed_stations():
+    engine, stations = _engine()
+    assert engine.tick(5) == 0
+    assert engine.tick(12) == 1
+    assert stations[0].moves == ['13.00,10.00,0.00']
+    assert engine.tick(12) == 0
+    assert stations[1].moves == stations[2].moves == []
+
+
+def test_schedule_on_virtual_clock_ends_exactly():
+    engine = MobilityEngine(rate=2.0)
+    station = FakeStation('s')
+    engine.add_trajectory(station, [0, 0, 0], [9, 0, 0], 0, 2.25)
+    scheduler = EventScheduler(VirtualClock())
+    end = engine.schedule(scheduler)
+    scheduler.run()
+    assert end == 2.25
+    # Ticks every 0.5 s plus a last one at 2.25 s
+    assert station.moves == ['2.00,0.00,0.00', '4.00,0.00,0.00', '6.00,0.00,0.00',
+                             '8.00,0.00,0.00', '9.00,0.00,0.00']
+
+
+def test_background_run_finishes_on_virtual_clock():
+    engine, stations = _engine()
+    engine.start(VirtualClock())
+    assert engine.wait(timeout=10)
+    engine.stop()
+    assert stations[0].moves[-1] == '45.00,10.00,0.00'
+    assert stations[2].moves[-1] == '15.00,20.00,0.00'
+    assert len(stations[0].moves) == 10
+
+
+@pytest.mark.parametrize('value, point', [
+    ('1,2,3', [1, 2, 3]), ([1, 2], [1, 2, 0]), ((1.5, 2, 0), [1.5, 2, 0])])
+def test_as_point(value, point):
+    assert _as_point(value) == point
+    assert format_position(point) == ','.join(f'{v:.2f}' for v in point)
+
+
+def test_bad_input():
+    with pytest.raises(ValueError):
+        _as_point('1')
+    with pytest.raises(ValueError):
+        MobilityEngine(rate=0)
+    with pytest.raises(ValueError, match='s: end time before start time'):
+        MobilityEngine().add_trajectory(FakeStation('s'), [0, 0], [1, 1], 5, 1)
@@ -0,0 +1,31 @@
+from netpool import NetworkPool
+from scenario import load_scenario
+
+
+class EmulatedNet:
+    simulated = False
+
+    def __init__(self):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_reset_restores_positions(scenario_path):
+    build = lambda: load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    with NetworkPool() as pool:
+        net, report = pool.acquire('task1', build)
+        assert report['built']
+        net.get('sta1').setPosition('45,10,0')
+        again, report = pool.acquire('task1', build)
+        assert again is net and not report['built'] and report['clean']
+        assert net.get('sta1').position[:2] == [5, 10]
+
+
+def test_one_emulated_network_at_a_time():
+    pool = NetworkPool()
+    first, _ = pool.acquire('a', EmulatedNet)
+    second, _ = pool.acquire('b', EmulatedNet)
+    assert first.stopped and not second.stopped
+    assert 'a' not in pool and 'b' in pool
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from olsr import (RoutingGraph, TxtinfoClient, has_changes, parse_txtinfo, route_destinations,
+                  wait_for_convergence)
+from scheduler import VirtualClock
+
+# `echo /all | nc 127.0.0.1 2006` on adhoc1 (olsrd 0.6.6, txtinfo plugin),
+# trailing tabs as olsrd writes them
+ALL_BEFORE = (
+    'HTTP/1.0 200 OK\r\n'
+    'Content-type: text/plain\r\n'
+    '\r\n'
+    'Table: Links\n'
+    'Local IP\tRemote IP\tHyst.\tLQ\tNLQ\tCost\n'
+    '192.168.2.1\t192.168.2.2\t0.00\t1.000\t0.878\t1.138\t\n'
+    '\n'
+    'Table: Neighbors\n'
+    'IP address\tSYM\tMPR\tMPRS\tWill.\t2 Hop Neighbors\n'
+    '192.168.2.2\tYES\tNO\tYES\t3\t1\t\n'
+    '\n'
+    'Table: Topology\n'
+    'Dest. IP\tLast hop IP\tLQ\tNLQ\tCost\n'
+    '192.168.2.1\t192.168.2.2\t0.878\t1.000\t1.138\n'
+    '192.168.2.3\t192.168.2.2\t0.741\t0.803\t1.680\n'
+    '\n'
+    'Table: HNA\n'
+    'Destination\tGateway\n'
+    '\n'
+    'Table: MID\n'
+    'IP address\tAliases\n'
+    '\n'
+    'Table: Routes\n'
+    'Destination\tGateway IP\tMetric\tETX\tInterface\n'
+    '192.168.2.2/32\t192.168.2.2\t1\t1.138\tadhoc1-wlan0\t\n'
+    '192.168.2.3/32\t192.168.2.2\t2\t2.818\tadhoc1-wlan0\t\n'
+    '\n'
+)
+
+# The same node after adhoc3 moved into direct range of adhoc1
+ALL_AFTER = (
+    'HTTP/1.0 200 OK\r\n'
+    'Content-type: text/plain\r\n'
+    '\r\n'
+    'Table: Links\n'
+    'Local IP\tRemote IP\tHyst.\tLQ\tNLQ\tCost\n'
+    '192.168.2.1\t192.168.2.2\t0.00\t1.000\t0.878\t1.138\t\n'
+    '192.168.2.1\t192.168.2.3\t0.00\t0.592\t0.498\tINFINITE\t\n'
+    '\n'
+    'Table: Topology\n'
+    'Dest. IP\tLast hop IP\tLQ\tNLQ\tCost\n'
+    '192.168.2.1\t192.168.2.2\t0.878\t1.000\t1.138\n'
+    '\n'
+    'Table: Routes\n'
+    'Destination\tGateway IP\tMetric\tETX\tInterface\n'
+    '192.168.2.2/32\t192.168.2.2\t1\t1.138\tadhoc1-wlan0\t\n'
+    '192.168.2.3/32\t192.168.2.3\t1\t3.392\tadhoc1-wlan0\t\n'
+    '192.168.2.4/32\t192.168.2.2\t2\t2.276\tadhoc1-wlan0\t\n'
+    '\n'
+)
+
+
+def test_parse_sections():
+    tables = parse_txtinfo(ALL_BEFORE)
+    assert set(tables) == {'Links', 'Neighbors', 'Topology', 'HNA', 'MID', 'Routes'}
+    assert tables['HNA'] == [] and tables['MID'] == []
+    assert tables['Links'] == [{'Local IP': '192.168.2.1', 'Remote IP': '192.168.2.2',
+                                'Hyst.': '0.00', 'LQ': '1.000', 'NLQ': '0.878',
+                                'Cost': '1.138'}]
+    assert len(tables['Topology']) == 2
+    assert route_destinations(tables) == {'192.168.2.2', '192.168.2.3'}
+
+
+def test_link_quality_and_etx():
+    graph = RoutingGraph.from_tables({'adhoc1': parse_txtinfo(ALL_BEFORE)})
+    assert graph.links[('adhoc1', '192.168.2.2')] == (1.0, 0.878, 1.138)
+    assert graph.routes['adhoc1']['192.168.2.3/32'] == ('192.168.2.2', 2.0, 2.818,
+                                                       'adhoc1-wlan0')
+    assert graph.topology[('192.168.2.3', '192.168.2.2')] == pytest.approx(1.680)
+    # ETX is 1 / (LQ * NLQ)
+    lq, nlq, cost = graph.links[('adhoc1', '192.168.2.2')]
+    assert cost == pytest.approx(1 / (lq * nlq), abs=1e-3)
+
+
+def test_infinite_cost():
+    graph = RoutingGraph.from_tables({'adhoc1': parse_txtinfo(ALL_AFTER)})
+    assert graph.links[('adhoc1', '192.168.2.3')] == (0.592, 0.498, float('inf'))
+
+
+def test_route_diff():
+    before = RoutingGraph.from_tables({'adhoc1': parse_txtinfo(ALL_BEFORE)})
+    after = RoutingGraph.from_tables({'adhoc1': parse_txtinfo(ALL_AFTER)})
+    changes = before.diff(after)
+    assert changes['added'] == [('adhoc1', '192.168.2.4/32',
+                                 ('192.168.2.2', 2.0, 2.276, 'adhoc1-wlan0'))]
+    assert changes['removed'] == []
+    assert changes['changed'] == [('adhoc1', '192.168.2.3/32',
+                                   ('192.168.2.2', 2.0, 2.818, 'adhoc1-wlan0'),
+                                   ('192.168.2.3', 1.0, 3.392, 'adhoc1-wlan0'))]
+    assert changes['link_deltas'] == [('adhoc1', '192.168.2.3', 0.0, 0.592, 0.592)]
+    assert changes['topology_removed'] == [('192.168.2.3', '192.168.2.2')]
+    assert changes['topology_added'] == []
+    assert not has_changes(after.diff(after))
+
+
+class TxtinfoNode:
+    def __init__(self, name, outputs):
+        self.name = name
+        self.outputs = list(outputs)
+
+    def cmd(self, command):
+        return self.outputs.pop(0) if len(self.outputs) > 1 else self.outputs[0]
+
+    def IP(self):
+        return '192.168.2.1'
+
+
+def test_sample_waits_on_the_given_clock():
+    clock = VirtualClock()
+    node = TxtinfoNode('adhoc1', [ALL_BEFORE, ALL_BEFORE, ALL_AFTER])
+    began = time.monotonic()
+    with TxtinfoClient([node], clock=clock) as client:
+        samples = list(client.sample(interval=10, count=4))
+    assert time.monotonic() - began < 5
+    assert clock.now() == 40
+    # The first poll and the one where the tables changed, on the run's clock
+    assert [graph.timestamp for graph, _ in samples] == [0, 20]
+
+
+def test_convergence_time_is_the_start_of_the_stable_run():
+    clock = VirtualClock()
+    # No neighbours on the first poll, then the same tables from the second on
+    node = TxtinfoNode('adhoc1', [ALL_AFTER, ALL_BEFORE])
+    metrics = wait_for_convergence([node], interval=0.5, stable_polls=3, clock=clock)
+    assert metrics['converged']
+    assert metrics['convergence_time'] == 0.5
+    assert metrics['node_complete_time'] == {'adhoc1': 0.5}
+    assert clock.now() == 1.5
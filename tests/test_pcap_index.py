@@ -0,0 +1,63 @@
+import struct
+
+import numpy as np
+import pytest
+
+from capture import LINKTYPE_RAW
+from pcap_index import PcapIndex
+
+
+def _udp(src, dst, sport, dport, payload=b'x' * 32):
+    header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + 8 + len(payload), 0, 0, 64, 17, 0,
+                         bytes(map(int, src.split('.'))), bytes(map(int, dst.split('.'))))
+    return header + struct.pack('!HHHH', sport, dport, 8 + len(payload), 0) + payload
+
+
+@pytest.fixture
+def pcap(tmp_path):
+    path = tmp_path / 'flows.pcap'
+    with open(path, 'wb') as handle:
+        handle.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, LINKTYPE_RAW))
+        for i in range(20):
+            sport = 5000 if i % 2 == 0 else 6000
+            data = _udp('10.0.0.1', '10.0.0.2', sport, 698)
+            handle.write(struct.pack('<IIII', 100 + i // 4, (i % 4) * 250000,
+                                     len(data), len(data)) + data)
+    return str(path)
+
+
+def test_select_and_aggregate(pcap):
+    with PcapIndex(pcap) as index:
+        assert len(index) == 20
+        rows = index.select(flow=('udp', '10.0.0.1', 5000, '10.0.0.2', 698))
+        assert len(rows) == 10
+        summary = index.aggregate(interval=1.0)
+        assert summary['packets'].tolist() == [4, 4, 4, 4, 4]
+        assert np.all(summary['per_flow_bytes'].sum(axis=0) == summary['bytes'])
+
+
+def test_aggregate_absolute_times(pcap):
+    with PcapIndex(pcap) as index:
+        summary = index.aggregate(interval=1.0, relative=False)
+        assert summary['window_start'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+        assert summary['per_flow_bytes'].shape == (len(index.flows), 5)
+        later = index.aggregate(interval=2.0, t0=102.0, relative=False)
+        assert later['window_start'].tolist() == [102.0, 104.0]
+        assert later['packets'].tolist() == [8, 4]
+
+
+def test_index_is_reused(pcap):
+    with PcapIndex(pcap) as first:
+        timestamps = first.timestamps.copy()
+    with PcapIndex(pcap) as second:
+        assert np.array_equal(second.timestamps, timestamps)
+
+
+def test_close_with_packet_views_alive(pcap):
+    index = PcapIndex(pcap)
+    view = index.packet(0)
+    held = [data for _, data in index.packets(index.select(t0=1, t1=2))]
+    index.close()
+    assert index._file.closed
+    assert bytes(view[9:10]) == b'\x11'
+    assert len(held) == 4
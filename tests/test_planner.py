@@ -0,0 +1,36 @@
+import pytest
+
+from planner import CHANNELS_24GHZ, CHANNELS_5GHZ, band_channels, plan_scenario
+from scenario import load_scenario
+
+
+@pytest.mark.parametrize('aps, channels', [
+    ([{'mode': 'g', 'channel': '35'}], CHANNELS_24GHZ),
+    ([{'mode': 'b', 'channel': 1}], CHANNELS_24GHZ),
+    ([{'mode': 'a', 'channel': 1}], CHANNELS_5GHZ),
+    ([{'mode': 'n', 'channel': 36}, {'mode': 'ac', 'channel': 40}], CHANNELS_5GHZ),
+    ([{'mode': 'n', 'channel': 6}], CHANNELS_24GHZ),
+    ([], CHANNELS_24GHZ),
+])
+def test_band_follows_mode(aps, channels):
+    assert band_channels(aps) == channels
+
+
+def test_mixed_bands_need_explicit_channels():
+    with pytest.raises(ValueError, match='different bands'):
+        band_channels([{'mode': 'g'}, {'mode': 'a'}])
+
+
+def test_task1_plan_stays_in_band(scenario_path):
+    plan, planned = plan_scenario(load_scenario(scenario_path('task1.yaml')))
+    assert set(plan.channels) <= set(CHANNELS_24GHZ)
+    aps = [spec for spec in planned.nodes if spec['kind'] == 'ap']
+    assert all(ap['mode'] == 'g' and int(ap['channel']) in CHANNELS_24GHZ for ap in aps)
+    assert plan.throughput >= plan.baseline
+
+
+def test_shipped_planned_scenario_is_valid(scenario_path):
+    planned = load_scenario(scenario_path('task1-planned.yaml'))
+    for ap in planned.nodes:
+        if ap['kind'] == 'ap':
+            assert int(ap['channel']) in band_channels([ap])
@@ -0,0 +1,97 @@
+import json
+import math
+import threading
+
+import pytest
+
+import profiling
+from profiling import Histogram, Profiler, instrument_net
+from renderer import plot_network
+from scenario import load_scenario
+
+
+@pytest.fixture
+def profiler():
+    active = profiling.enable()
+    yield active
+    profiling.disable()
+
+
+def test_nested_phases_count_outer_time_once():
+    profiler = Profiler()
+    with profiler.phase('outer'):
+        with profiler.phase('inner', 'step', index=1):
+            pass
+        with profiler.phase('inner', 'step', index=2):
+            pass
+    spans = {(name, depth) for name, _, _, _, _, depth, _ in profiler.spans}
+    assert spans == {('outer', 0), ('inner', 1)}
+    assert profiler.histograms['inner'].count == 2
+    outer = next(span for span in profiler.spans if span[0] == 'outer')
+    for name, _, _, start, duration, _, _ in profiler.spans:
+        assert outer[3] <= start and start + duration <= outer[3] + outer[4]
+    # Only the outermost span counts towards the thread's busy time
+    assert profiler.utilization() == {threading.current_thread().name: pytest.approx(1.0)}
+
+
+def test_percentiles_are_bucket_edges():
+    histogram = Histogram()
+    assert math.isnan(histogram.percentile(50))
+    for _ in range(90):
+        histogram.add(1e-3)
+    for _ in range(10):
+        histogram.add(1.0)
+    assert histogram.percentile(50) == pytest.approx(1e-3)
+    assert histogram.percentile(90) == pytest.approx(1e-3)
+    assert histogram.percentile(99) == pytest.approx(1.0)
+    summary = histogram.as_dict()
+    assert (summary['count'], summary['min'], summary['max']) == (100, 1e-3, 1.0)
+    assert summary['buckets'] == {'1e-03': 90, '1e+00': 10}
+    # Beyond the last bucket the maximum is the best bound there is
+    histogram.add(5000.0)
+    assert histogram.percentile(100) == 5000.0
+
+
+def test_chrome_trace_is_valid_trace_event_json(tmp_path):
+    profiler = Profiler()
+
+    def work(label):
+        with profiler.phase(label):
+            with profiler.phase('child', 'cmd', command='ping'):
+                pass
+
+    worker = threading.Thread(target=work, args=('worker',), name='worker-0')
+    worker.start()
+    worker.join()
+    work('main')
+    with open(profiler.save_chrome_trace(str(tmp_path / 'run.trace.json'))) as handle:
+        document = json.load(handle)
+    events = document['traceEvents']
+    assert document['displayTimeUnit'] == 'ms'
+    names = {event['tid']: event['args']['name'] for event in events if event['ph'] == 'M'}
+    assert 'worker-0' in names.values() and len(names) == 2
+    complete = [event for event in events if event['ph'] == 'X']
+    assert len(complete) == 4
+    for event in complete:
+        assert {'name', 'cat', 'ph', 'pid', 'tid', 'ts', 'dur', 'args'} <= set(event)
+        assert isinstance(event['pid'], int) and event['tid'] in names
+        assert event['ts'] >= 0 and event['dur'] >= 0
+    for parent in (event for event in complete if event['name'] != 'child'):
+        child = next(event for event in complete
+                     if event['name'] == 'child' and event['tid'] == parent['tid'])
+        assert parent['ts'] <= child['ts']
+        assert child['ts'] + child['dur'] <= parent['ts'] + parent['dur'] + 1e-3
+        assert child['args'] == {'command': 'ping'}
+
+
+def test_plotting_is_timed(profiler, scenario_path, tmp_path):
+    net = load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    instrument_net(net)
+    assert not getattr(net.plotGraph, '_profiled', False)
+    plot_network(net, max_x=50, max_y=30, mode='throttled', output=str(tmp_path))
+    net.get('sta1').setPosition('20,20,0')
+    net.stop()
+    # The scenario's own plot (off under tests) and the throttled one
+    assert profiler.histograms['plot.network'].count == 2
+    assert profiler.histograms['plot.frame'].count >= 1
+    assert profiler.histograms['net.stop'].count == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from association import parse_iw_link
+from coverage import compute_coverage, score_layouts
+from propagation import DEFAULT_TXPOWER, PropagationModel, channel_frequency, node_txpower
+from scenario import load_scenario
+
+
+@pytest.mark.parametrize('model', [PropagationModel('logDistance', exp=3, noise_th=-70,
+                                                    fading_cof=3),
+                                   PropagationModel('friis', noise_th=-91)])
+def test_range_txpower_inverts_max_distance(model):
+    freq = channel_frequency(6)
+    txpower = node_txpower({'range': 35, 'channel': 6, 'antennaGain': 4}, model)
+    assert model.max_distance(freq, txpower, 4, 4) == pytest.approx(35)
+
+
+def test_node_txpower_precedence():
+    model = PropagationModel()
+    assert node_txpower({'txpower': 9, 'range': 35}, model) == 9
+    assert node_txpower({}, model) == DEFAULT_TXPOWER
+    assert node_txpower({'range': 35, 'channel': 1}, model, channel=36) == pytest.approx(
+        model.range_txpower(35, channel_frequency(36)))
+
+
+def test_coverage_matches_simulated_backend(scenario_path):
+    scenario = load_scenario(scenario_path('task1.yaml'))
+    aps = [spec for spec in scenario.nodes if spec['kind'] == 'ap']
+    coverage = compute_coverage(aps, scenario.propagation_model(), cache=False)
+    net = scenario.build(simulated=True)
+    try:
+        _, signal, _ = parse_iw_link(net.get('sta1').cmd('iw dev sta1-wlan0 link'))
+    finally:
+        net.stop()
+    cell = coverage.at(5, 10)
+    assert cell['best_server'] == 'ap1'
+    assert signal == pytest.approx(cell['rssi'], abs=0.5)
+
+
+@pytest.mark.parametrize('power', [{}, {'txpower': 20}, {'range': 12}])
+def test_layout_scores_match_coverage(power):
+    model = PropagationModel(exp=3.0)
+    layout = [[10, 10, 0], [40, 20, 0]]
+    aps = [dict(power, position=position, channel=6) for position in layout]
+    expected = compute_coverage(aps, model, max_x=50, max_y=30, cache=False)
+    scores = score_layouts([layout], model, max_x=50, max_y=30, channel=6,
+                           txpower=power.get('txpower'), ap_range=power.get('range'))
+    assert scores['coverage'][0] == pytest.approx(expected.coverage_ratio)
+    assert scores['worst_rssi'][0] == pytest.approx(expected.best_rssi.min())
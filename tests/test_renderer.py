@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from renderer import ThrottledPlot, plot_network
+from scenario import load_scenario
+
+
+@pytest.fixture
+def net(scenario_path):
+    net = load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    yield net
+    net.stop()
+
+
+def test_off_draws_nothing(net, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    stop = net.stop
+    assert plot_network(net, max_x=50, max_y=30) is None
+    assert net.stop == stop
+    assert os.listdir(tmp_path) == []
+
+
+def test_live_uses_plot_graph(net, monkeypatch):
+    monkeypatch.setenv('WIFI_PLOT', 'live')
+    calls = []
+    net.plotGraph = lambda **kwargs: calls.append(kwargs)
+    assert plot_network(net, max_x=50, max_y=30) is None
+    assert calls == [{'max_x': 50, 'max_y': 30}]
+
+
+def test_unknown_mode(net, monkeypatch):
+    monkeypatch.setenv('WIFI_PLOT', 'fast')
+    with pytest.raises(ValueError, match='unknown plot mode'):
+        plot_network(net, max_x=50, max_y=30)
+
+
+def test_throttled_png_is_replaced(net, monkeypatch, tmp_path):
+    output = tmp_path / 'topology.png'
+    monkeypatch.setenv('WIFI_PLOT', 'throttled')
+    monkeypatch.setenv('WIFI_PLOT_OUTPUT', str(output))
+    plot = plot_network(net, max_x=50, max_y=30)
+    assert isinstance(plot, ThrottledPlot)
+    net.get('sta1').setPosition('20,20,0')
+    net.stop()
+    assert os.listdir(tmp_path) == ['topology.png']
+    assert plot.sink.count == 2
+
+
+def test_throttled_sequence_coalesces_moves(net, monkeypatch, tmp_path):
+    monkeypatch.setenv('WIFI_PLOT', 'throttled')
+    monkeypatch.setenv('WIFI_PLOT_OUTPUT', str(tmp_path / 'frames'))
+    # One frame per minute, so every move lands in the frame stop() flushes
+    monkeypatch.setenv('WIFI_PLOT_FPS', str(1 / 60))
+    plot = plot_network(net, max_x=50, max_y=30)
+    station = net.get('sta1')
+    for x in range(10):
+        station.setPosition(f'{x},10,0')
+    net.stop()
+    assert sorted(os.listdir(tmp_path / 'frames')) == ['frame_000000.png', 'frame_000001.png']
+    stats = plot.stats()
+    assert (stats['updates'], stats['frames'], stats['coalesced']) == (10, 1, 9)
+
+
+def test_stop_restores_an_existing_hook(net, tmp_path):
+    station = net.get('sta1')
+    seen = []
+    original = station.setPosition
+
+    def recorder(position):
+        seen.append(position)
+        original(position)
+
+    station.setPosition = recorder
+    plot = ThrottledPlot(net, 50, 30, output=str(tmp_path / 'frames')).start()
+    station.setPosition('5,5,0')
+    plot.stop()
+    assert station.setPosition is recorder
+    assert seen == ['5,5,0']
@@ -0,0 +1,40 @@
+import os
+import time
+
+import numpy as np
+
+from results import ResultsStore, ResultsWriter
+
+
+def test_all_none_text_column_loads_empty(tmp_path):
+    root = str(tmp_path)
+    with ResultsWriter(root, run_id='run', chunk_rows=2) as writer:
+        writer.append('associations', [{'t': 0.0, 'ap': None}, {'t': 1.0, 'ap': None}])
+        writer.append('associations', [{'t': 2.0, 'ap': 'ap1'}, {'t': 3.0, 'ap': None}])
+        writer.append('associations', [{'t': 4.0, 'ap': None}, {'t': 5.0, 'ap': None}])
+    assert writer.manifest['tables']['associations']['columns'] == {'t': 'f', 'ap': 'U'}
+    loaded = ResultsStore(root).load('associations', ['ap'])
+    assert loaded['ap'].tolist() == ['', '', 'ap1', '', '', '']
+
+
+def test_numbers_keep_nan(tmp_path):
+    root = str(tmp_path)
+    with ResultsWriter(root, run_id='run', chunk_rows=2) as writer:
+        writer.append('rssi', {'signal': [None, None]})
+        writer.append('rssi', {'signal': [-40, None]})
+    signal = ResultsStore(root).load('rssi', ['signal'])['signal']
+    assert np.isnan(signal[[0, 1, 3]]).all() and signal[2] == -40
+
+
+def test_flushes_after_interval(tmp_path):
+    writer = ResultsWriter(str(tmp_path), run_id='run', flush_interval=0.05)
+    try:
+        writer.append('ping', [{'t': 0.0, 'loss': 0.0}])
+        chunk = os.path.join(writer.directory, 'ping', 'chunk-000000.npz')
+        deadline = time.time() + 5
+        while not os.path.exists(chunk) and time.time() < deadline:
+            time.sleep(0.01)
+        assert os.path.exists(chunk)
+    finally:
+        writer.close()
+    assert writer.manifest['tables']['ping']['rows'] == 1
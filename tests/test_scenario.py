@@ -0,0 +1,111 @@
+import pytest
+
+from scenario import Scenario, ScenarioError, load_scenario
+
+
+def _base(**sections):
+    data = {
+        'aps': [{'name': 'ap1', 'position': [10, 10, 0], 'ssid': 'test', 'channel': 1,
+                 'mode': 'g'}],
+        'stations': [{'name': 'sta1', 'position': [12, 10, 0]},
+                     {'name': 'sta2', 'position': [8, 10, 0]}],
+    }
+    data.update(sections)
+    return data
+
+
+@pytest.mark.parametrize('data, message', [
+    (_base(extra={}), "unknown sections ['extra']"),
+    (_base(stations=[{'name': 'sta1'}, {'name': 'sta1'}]), "duplicate node name 'sta1'"),
+    (_base(stations=[{'name': 'sta1', 'ip': '10.0.0.5/8'},
+                     {'name': 'sta2', 'ip': '10.0.0.5/8'}]), 'duplicate IP 10.0.0.5'),
+    (_base(stations=[{'name': 'sta1', 'position': 'left'}]), 'expected an x,y[,z] position'),
+    (_base(stations=[{'generate': 'hex', 'prefix': 's'}]), "unknown generator 'hex'"),
+    (_base(stations=[{'generate': 'grid', 'prefix': 's', 'rows': -1, 'cols': 2}]),
+     "'rows' must be a non-negative integer"),
+    (_base(links=[{'nodes': ['ap1', 'ap9']}]), "unknown nodes ['ap9']"),
+    (_base(links=[{'nodes': ['ap1', 'sta1'], 'chain': ['ap1', 'sta1']}]),
+     'give exactly one of'),
+    (_base(mobility=[{'name': 'sta1', 'start': [0, 0, 0], 'end': [5, 0, 0],
+                      'start_time': 10, 'end_time': 5}]), 'end_time before start_time'),
+    (_base(mobility=[{'name': 'sta1', 'start': [0, 0, 0], 'end': [5, 0, 0]}]),
+     'mobility[0]: missing start_time, end_time'),
+    (_base(mobility=[{'name': 'sta1', 'start': [0, 0, 0], 'end': [5, 0, 0],
+                      'start_time': 'soon', 'end_time': 5}]), 'must be numbers'),
+])
+def test_validation_errors(data, message):
+    with pytest.raises(ScenarioError, match=message.replace('[', r'\[').replace(']', r'\]')):
+        Scenario(data, 'test.yaml').validate()
+
+
+def test_errors_name_the_entry():
+    with pytest.raises(ScenarioError, match=r'^test.yaml: stations\[1\]: missing'):
+        Scenario(_base(stations=[{'name': 'sta1'}, {'position': [0, 0, 0]}]),
+                 'test.yaml').validate()
+
+
+def test_grid_generator_and_addresses():
+    scenario = Scenario(_base(
+        addressing={'network': '10.1.0.0/24'},
+        stations=[{'name': 'fixed', 'ip': '10.1.0.2/24'},
+                  {'generate': 'grid', 'prefix': 'node', 'rows': 2, 'cols': 3,
+                   'spacing': [5, 10], 'origin': [1, 2, 3], 'range': 20}]))
+    stations = [spec for spec in scenario.nodes if spec['kind'] == 'station']
+    assert [spec['name'] for spec in stations] == ['fixed'] + [f'node{i}' for i in range(1, 7)]
+    assert stations[3]['position'] == '11.00,2.00,3.00'
+    assert stations[4]['position'] == '1.00,12.00,3.00'
+    assert all(spec['range'] == 20 for spec in stations[1:])
+    ips = [spec['ip'] for spec in scenario.nodes]
+    assert len(set(ips)) == len(ips)
+    # ap1 gets the first free address, the explicit one is skipped
+    assert ips[0] == '10.1.0.1/24' and '10.1.0.2/24' not in ips[2:]
+
+
+def test_random_generator_is_seeded():
+    entry = {'generate': 'random', 'prefix': 's', 'count': 5,
+             'box': [[0, 0, 0], [50, 30, 0]], 'seed': 7}
+    first = Scenario(_base(stations=[entry])).nodes
+    second = Scenario(_base(stations=[dict(entry)])).nodes
+    assert [spec['position'] for spec in first] == [spec['position'] for spec in second]
+
+
+def test_links_are_deduplicated():
+    scenario = Scenario(_base(
+        aps=[{'name': f'ap{i}'} for i in range(1, 4)],
+        links=[{'chain': ['ap1', 'ap2', 'ap3']}, {'nodes': ['ap2', 'ap1']},
+               {'mesh': 'stations', 'cls': 'adhoc', 'ssid': 'mesh'}]))
+    pairs = [(a, b) for a, b, _ in scenario.links]
+    assert pairs == [('ap1', 'ap2'), ('ap2', 'ap3'), ('sta1', None), ('sta2', None)]
+
+
+def test_overrides_round_trip(tmp_path):
+    scenario = Scenario(_base(stations=[{'generate': 'grid', 'prefix': 's', 'rows': 1,
+                                          'cols': 2}]))
+    explicit = scenario.with_overrides({'s2': {'range': 5}})
+    path = str(tmp_path / 'explicit.yaml')
+    explicit.save(path)
+    loaded = load_scenario(path)
+    assert loaded.nodes == explicit.nodes
+    assert [spec.get('range') for spec in loaded.nodes] == [None, None, 5]
+
+
+def test_build_task1_simulated(scenario_path):
+    scenario = load_scenario(scenario_path('task1.yaml'))
+    net = scenario.build(simulated=True)
+    try:
+        assert [sta.name for sta in net.stations] == scenario.names('station')
+        assert 'Connected to 02:00:00:00:01:00' in net.get('sta1').cmd('iw dev sta1-wlan0 link')
+        assert ' 0% packet loss' in net.get('sta1').cmd('ping -c 1 192.168.1.13')
+        assert [spec['name'] for spec in scenario.mobility] == ['sta1', 'sta2', 'sta3']
+    finally:
+        net.stop()
+
+
+def test_build_task2_simulated(scenario_path):
+    scenario = load_scenario(scenario_path('task2.yaml'))
+    net = scenario.build(simulated=True)
+    try:
+        assert [sta.name for sta in net.stations] == ['adhoc1', 'adhoc2', 'adhoc3']
+        assert net.get('adhoc1').IP() == '192.168.2.1'
+    finally:
+        net.stop()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from scheduler import EventScheduler, RealTimeClock, VirtualClock
+
+
+def test_interrupt_wakes_one_sleep():
+    clock = RealTimeClock()
+    clock.interrupt()
+    began = time.monotonic()
+    clock.sleep_until(clock.now() + 5)
+    assert time.monotonic() - began < 1
+    began = time.monotonic()
+    clock.sleep_until(clock.now() + 0.2)
+    assert time.monotonic() - began >= 0.15
+
+
+def test_virtual_timeline_runs_in_order():
+    scheduler = EventScheduler(VirtualClock())
+    seen = []
+    scheduler.at(60, lambda: seen.append(('b', scheduler.now())))
+    scheduler.at(10, lambda: seen.append(('a', scheduler.now())))
+    scheduler.run()
+    assert seen == [('a', 10), ('b', 60)]
+
+
+def test_stop_leaves_the_sleeping_event_queued():
+    scheduler = EventScheduler(RealTimeClock())
+    seen = []
+    scheduler.at(5, lambda: seen.append('late'))
+    timer = threading.Timer(0.1, scheduler.stop)
+    timer.start()
+    began = time.monotonic()
+    scheduler.run()
+    timer.join()
+    assert time.monotonic() - began < 2
+    assert seen == [] and scheduler.pending() == 1
+
+
+def test_run_after_stop_resumes():
+    scheduler = EventScheduler(VirtualClock())
+    seen = []
+    scheduler.at(1, scheduler.stop)
+    scheduler.at(2, lambda: seen.append(scheduler.now()))
+    assert scheduler.run() == 1
+    assert scheduler.run() == 2
+    assert seen == [2]
+
+
+def test_earlier_event_from_another_thread_runs_first():
+    scheduler = EventScheduler(RealTimeClock())
+    seen = []
+    scheduler.at(1.0, lambda: seen.append('late'))
+    timer = threading.Timer(0.1, scheduler.at, (0.2, lambda: seen.append('early')))
+    timer.start()
+    began = time.monotonic()
+    scheduler.run()
+    timer.join()
+    assert seen == ['early', 'late']
+    assert time.monotonic() - began >= 0.9
+
+
+def test_idle_run_picks_up_events_before_until():
+    scheduler = EventScheduler(RealTimeClock())
+    seen = []
+    timer = threading.Timer(0.1, scheduler.at, (0.2, lambda: seen.append(scheduler.now())))
+    timer.start()
+    assert scheduler.run(until=0.4) == 0.4
+    timer.join()
+    assert seen == [0.2]
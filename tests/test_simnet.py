@@ -0,0 +1,71 @@
+import logging
+
+import numpy as np
+
+from interference import InterferenceEngine
+from scenario import load_scenario
+from simnet import setLogLevel
+
+
+def test_log_level_configures_the_mininet_logger_once(capsys):
+    logger = logging.getLogger('mininet')
+    before = list(logger.handlers)
+    added = []
+    try:
+        setLogLevel('info')
+        setLogLevel('debug')
+        added = [h for h in logger.handlers if h not in before]
+        assert len(added) == 1
+        assert logger.level == logging.DEBUG
+        assert added[0] not in logging.getLogger().handlers
+        logging.getLogger('mininet.olsr').info('*** Starting OLSR\n')
+        assert '*** Starting OLSR\n' in capsys.readouterr().out
+    finally:
+        for handler in added:
+            logger.removeHandler(handler)
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+
+def start_olsr(net):
+    for station in net.stations:
+        station.cmd(f'olsrd -f /tmp/{station.name}-olsrd.conf -d 1 &')
+
+
+def test_olsr_graph_is_rebuilt_after_a_move(scenario_path):
+    net = load_scenario(scenario_path('task2.yaml')).build(simulated=True)
+    try:
+        start_olsr(net)
+        adhoc1, adhoc3 = net.get('adhoc1', 'adhoc3')
+        graph = net._olsr_graph(adhoc1)
+        assert net._olsr_graph(adhoc1) is graph
+        assert 'adhoc3' in graph[1]['adhoc1']
+        assert 'adhoc3' in net.olsr_routes(adhoc1)
+        adhoc3.setPosition('500,500,3')
+        members, near, quality = net._olsr_graph(adhoc1)
+        assert 'adhoc3' not in near['adhoc1'] and ('adhoc1', 'adhoc3') not in quality
+        assert 'adhoc3' not in net.olsr_routes(adhoc1)
+    finally:
+        net.stop()
+
+
+def test_moves_are_applied_in_one_batch(scenario_path):
+    net = load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    try:
+        engine = net._engine()
+        batches = []
+        move = engine.move
+        engine.move = lambda positions: batches.append(dict(positions)) or move(positions)
+        for i, station in enumerate(net.stations):
+            station.setPosition(f'{10 * i},{5 * i},0')
+        assert batches == []
+        assert net.get('sta2').position == [10.0, 5.0, 0.0]
+        assert len(batches) == 1 and len(batches[0]) == len(net.stations)
+        specs = [dict(name=name, position=list(engine.positions[i]),
+                      channel=int(engine.channel[i]), txpower=float(engine.txpower[i]),
+                      antennaGain=float(engine.gain[i]))
+                 for i, name in enumerate(engine.names)]
+        fresh = InterferenceEngine(specs, engine.model, engine.activity)
+        np.testing.assert_allclose(engine.power, fresh.power, rtol=1e-12)
+    finally:
+        net.stop()
@@ -0,0 +1,66 @@
+import pytest
+import yaml
+
+import sweep
+from scenario import ScenarioError
+from sweep import ResultCache, expand_grid, run_sweep, set_path
+
+
+@pytest.fixture
+def task1(scenario_path):
+    with open(scenario_path('task1.yaml')) as handle:
+        return yaml.safe_load(handle)
+
+
+def test_set_path():
+    data = {'network': {}, 'stations': [{'name': 'sta1'}, {'name': 'sta2'}]}
+    set_path(data, 'network.noise_th', -80)
+    set_path(data, 'stations.sta2.range', 20)
+    set_path(data, 'stations.*.antennaGain', 3)
+    set_path(data, 'plot.max_x', 50)
+    assert data['network'] == {'noise_th': -80}
+    assert data['stations'] == [{'name': 'sta1', 'antennaGain': 3},
+                                {'name': 'sta2', 'range': 20, 'antennaGain': 3}]
+    assert data['plot'] == {'max_x': 50}
+    with pytest.raises(ScenarioError, match='no entry named'):
+        set_path(data, 'stations.sta9.range', 1)
+    with pytest.raises(ScenarioError, match='inside a list'):
+        set_path(data, 'stations.*', 1)
+
+
+def test_expand_grid_leaves_base_alone():
+    base = {'network': {'noise_th': -70}}
+    points = expand_grid(base, {'network.noise_th': [-80, -90], 'network.fading_cof': [0, 3]})
+    assert [params for params, _ in points] == [
+        {'network.fading_cof': 0, 'network.noise_th': -80},
+        {'network.fading_cof': 0, 'network.noise_th': -90},
+        {'network.fading_cof': 3, 'network.noise_th': -80},
+        {'network.fading_cof': 3, 'network.noise_th': -90}]
+    assert points[3][1]['network'] == {'noise_th': -90, 'fading_cof': 3}
+    assert base == {'network': {'noise_th': -70}}
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert 'abc' not in cache and cache.get('abc') is None
+    cache.put('abc', {'reachable_ratio': 1.0})
+    assert 'abc' in cache and cache.get('abc') == {'reachable_ratio': 1.0}
+
+
+def test_simulated_sweep_resumes_from_cache(task1, tmp_path, monkeypatch):
+    grid = {'aps.ap4.range': [35, 5]}
+    cache = str(tmp_path / 'cache')
+    rows = run_sweep(task1, grid, backend='simulated', workers=2, cache_dir=cache)
+    assert [params for params, _ in rows] == [{'aps.ap4.range': 35}, {'aps.ap4.range': 5}]
+    assert all(result['backend'] == 'simulated' for _, result in rows)
+    assert rows[0][1]['reachable_ratio'] == 1.0
+    # A second run must not run anything
+    monkeypatch.setattr(sweep, 'ProcessPoolExecutor', None)
+    again = run_sweep(task1, grid, backend='simulated', cache_dir=cache)
+    assert [result for _, result in again] == [result for _, result in rows]
+
+
+def test_workers_rejected_for_resolved_emulation(task1, tmp_path, monkeypatch):
+    monkeypatch.setattr(sweep, 'default_backend', lambda: 'emulation')
+    with pytest.raises(ValueError, match='workers=1'):
+        run_sweep(task1, {}, workers=4, cache_dir=str(tmp_path))
@@ -0,0 +1,39 @@
+import importlib.util
+import os
+
+import pytest
+import yaml
+
+from scenario import load_scenario
+
+
+@pytest.fixture(scope='module')
+def task2():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'Task 2', 'task2_wifi_network.py')
+    spec = importlib.util.spec_from_file_location('task2_wifi_network', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_runs_on_any_station_names(task2, scenario_path):
+    with open(scenario_path('task2.yaml')) as handle:
+        data = yaml.safe_load(handle)
+    names = ['medic', 'engine', 'command', 'drone']
+    positions = [[60, 10, 1], [75, 25, 2], [90, 15, 3], [80, 5, 10]]
+    data['stations'] = [{'name': name, 'position': position}
+                        for name, position in zip(names, positions)]
+    net = load_scenario(data).build(simulated=True)
+    try:
+        assert task2.configure_olsr(net)['converged']
+        matrix = task2.test_icmp_connectivity(net, count=1)
+        assert len(matrix) == len(names) * (len(names) - 1)
+        client, server = task2.setup_tcp_transfer(net)
+        assert (client.name, server.name) == ('medic', 'engine')
+        routing = task2.check_routing_tables(net)
+        assert set(names) <= set(routing)
+        churn = task2.track_route_churn(net, duration=2)
+        assert {node for node, *_ in churn[0][1]['added']} == set(names)
+    finally:
+        net.stop()
@@ -0,0 +1,24 @@
+from renderer import ThrottledPlot
+from scenario import load_scenario
+from traces import TraceReader, TraceWriter, record_positions
+
+
+def test_recording_keeps_the_plot_hook(scenario_path, tmp_path):
+    net = load_scenario(scenario_path('task1.yaml')).build(simulated=True)
+    try:
+        plot = ThrottledPlot(net, 100, 100, output=None).start()
+        sta1 = net.get('sta1')
+        with TraceWriter(str(tmp_path / 'run.trace')) as writer:
+            unhook = record_positions(net.stations, writer)
+            sta1.setPosition('10,20,0')
+            unhook()
+            sta1.setPosition('11,20,0')
+        # The plot saw both moves; the recorder only the one while hooked
+        assert plot.stop()['updates'] == 2
+        assert 'setPosition' not in vars(sta1)
+        sta1.setPosition('12,20,0')
+        assert plot.updates == 2
+        with TraceReader(str(tmp_path / 'run.trace')) as reader:
+            assert len(reader) == len(net.stations) + 1
+    finally:
+        net.stop()
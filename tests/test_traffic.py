@@ -0,0 +1,48 @@
+import pytest
+
+from scenario import load_scenario
+from traffic import TrafficOrchestrator, aggregate_flows, server_pids
+
+
+def _document(protocol, sent, received=None, lost=0.0, retransmits=0):
+    if protocol == 'udp':
+        return {'end': {'sum': {'bytes': sent, 'seconds': 10.0, 'bits_per_second': sent * 0.8,
+                                'lost_percent': lost}}}
+    summary = {'seconds': 10.0, 'bits_per_second': received * 0.8}
+    return {'end': {'sum_sent': dict(summary, bytes=sent, retransmits=retransmits),
+                    'sum_received': dict(summary, bytes=received)}}
+
+
+def test_server_pids_ignore_job_notices():
+    assert server_pids('[1] 4242\n4242\n[2] 4243\r\n4243\r\n') == [4242, 4243]
+
+
+def test_tcp_reports_retransmits_not_loss():
+    summary = aggregate_flows({'a': _document('tcp', 1000, 900, retransmits=3),
+                               'b': _document('tcp', 1000, 1000, retransmits=2)})
+    assert summary['flows']['a']['loss_percent'] is None
+    assert summary['loss_percent'] is None
+    assert summary['retransmits'] == 5
+
+
+def test_loss_counts_udp_flows_only():
+    summary = aggregate_flows({'tcp': _document('tcp', 1000, 500),
+                               'udp': _document('udp', 1000, lost=10.0)})
+    assert summary['loss_percent'] == pytest.approx(10.0)
+
+
+def test_stop_kills_only_started_servers(scenario_path):
+    net = load_scenario(scenario_path('task2.yaml')).build(simulated=True)
+    try:
+        server = net.get('adhoc2')
+        server.cmd('iperf3 -s -p 5001 -D')
+        orchestrator = TrafficOrchestrator()
+        orchestrator.add_flow(net.get('adhoc1'), server, duration=2)
+        orchestrator.add_flow(net.get('adhoc3'), server, duration=2)
+        flows = orchestrator.run()
+        assert all(flow.result and 'error' not in flow.result for flow in flows)
+        assert server.servers == {5001, 5201, 5202}
+        orchestrator.stop_servers()
+        assert server.servers == {5001}
+    finally:
+        net.stop()
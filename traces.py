@@ -0,0 +1,551 @@
+"""Binary columnar mobility traces: record setPosition updates, import, replay
+
+File layout (little endian):
+
+    header   b'WIFITRC1', version u4, flags u4, footer offset u8, reserved u8
+    chunk*   t f8[n] | next i8[n] | x f4[n] | y f4[n] | z f4[n] | station u4[n]
+    footer   chunk count u8, index (offset u8, count u8, t_min f8, t_max f8)[k],
+             names length u8, names as JSON
+
+Records are in time order. `next` is the global index of the same
+station's following record (-1 for its last one), filled in when the
+writer closes. A replay cursor can then interpolate towards the next
+waypoint without reading ahead, so replaying streams through the file
+with memory proportional to the station count, not the trace length.
+The chunk index (time bounds per chunk) serves time-range queries.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+import numpy as np
+
+from mobility import format_position
+from scheduler import EventScheduler
+
+MAGIC = b'WIFITRC1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('count', '<u8'),
+                        ('t_min', '<f8'), ('t_max', '<f8')])
+# (name, dtype) in on-disk order; 8-byte columns first keeps them aligned
+COLUMNS = (('t', '<f8'), ('next', '<i8'), ('x', '<f4'), ('y', '<f4'),
+           ('z', '<f4'), ('station', '<u4'))
+RECORD_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+
+
+class TraceError(ValueError):
+    pass
+
+
+def _chunk_bytes(count):
+    """Chunk size padded to 8 bytes so the next chunk stays aligned"""
+    return -(-count * RECORD_BYTES // 8) * 8
+
+
+class TraceWriter:
+    """Append position records and write them out in columnar chunks
+
+    Station names are registered on first use. Records must arrive in
+    non-decreasing time order (as setPosition updates do).
+    """
+
+    def __init__(self, path, names=(), chunk_size=65536):
+        self.path = path
+        self.chunk_size = int(chunk_size)
+        self.names = []
+        self._ids = {}
+        for name in names:
+            self.station_id(name)
+        self._buffer = {name: np.empty(self.chunk_size, dtype=dtype)
+                        for name, dtype in COLUMNS if name != 'next'}
+        self._fill = 0
+        self._index = []
+        self._count = 0
+        self._last_t = -np.inf
+        self._handle = open(path, 'wb')
+        self._handle.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count + self._fill
+
+    def station_id(self, name):
+        if name not in self._ids:
+            self._ids[name] = len(self.names)
+            self.names.append(name)
+        return self._ids[name]
+
+    def add(self, t, name, position):
+        """Record one station at one time; `position` is 'x,y,z' or a sequence"""
+        if isinstance(position, str):
+            position = [float(v) for v in position.split(',')]
+        point = (list(position) + [0.0, 0.0])[:3]
+        self.add_ids([t], [self.station_id(name)], [point])
+
+    def add_many(self, t, names, positions):
+        """Record several stations at time t from an (N, 3) array"""
+        ids = [self.station_id(name) for name in names]
+        self.add_ids(np.full(len(ids), float(t)), ids, positions)
+
+    def add_ids(self, times, ids, points):
+        """Vectorised add: time-ordered arrays of times, station ids and points"""
+        times = np.asarray(times, dtype=float)
+        if not len(times):
+            return
+        if times[0] < self._last_t or np.any(np.diff(times) < 0):
+            raise TraceError(f"records must be in time order (last t={self._last_t})")
+        self._last_t = times[-1]
+        ids = np.asarray(ids)
+        if ids.min() < 0 or ids.max() >= len(self.names):
+            raise TraceError("station ids must refer to registered names")
+        points = np.asarray(points, dtype=float).reshape(len(times), -1)
+        done = 0
+        while done < len(times):
+            take = min(len(times) - done, self.chunk_size - self._fill)
+            rows = slice(self._fill, self._fill + take)
+            part = slice(done, done + take)
+            self._buffer['t'][rows] = times[part]
+            self._buffer['station'][rows] = ids[part]
+            for axis, name in enumerate('xyz'):
+                self._buffer[name][rows] = (points[part, axis] if axis < points.shape[1]
+                                            else 0.0)
+            self._fill += take
+            done += take
+            if self._fill == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        count = self._fill
+        if not count:
+            return
+        offset = self._handle.tell()
+        for name, dtype in COLUMNS:
+            values = (np.full(count, -1, dtype=dtype) if name == 'next'
+                      else self._buffer[name][:count])
+            self._handle.write(values.tobytes())
+        self._handle.write(b'\0' * (_chunk_bytes(count) - count * RECORD_BYTES))
+        self._index.append((offset, count, self._buffer['t'][0],
+                            self._buffer['t'][count - 1]))
+        self._count += count
+        self._fill = 0
+
+    def close(self):
+        """Flush, write the footer, then link each record to its successor"""
+        if self._handle is None:
+            return
+        self.flush()
+        footer = self._handle.tell()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        names = json.dumps(self.names).encode()
+        self._handle.write(struct.pack('<Q', len(index)) + index.tobytes()
+                           + struct.pack('<Q', len(names)) + names)
+        self._handle.seek(0)
+        self._handle.write(HEADER.pack(MAGIC, VERSION, 0, footer, 0))
+        self._handle.close()
+        self._handle = None
+        _link_successors(self.path, len(self.names))
+
+
+def _link_successors(path, stations):
+    """Fill the `next` column in one backward pass, chunk by chunk"""
+    with TraceReader(path, writable=True) as reader:
+        following = np.full(stations, -1, dtype=np.int64)
+        for k in range(len(reader.index) - 1, -1, -1):
+            chunk = reader.chunk(k)
+            station = chunk['station']
+            base = int(reader.starts[k])
+            order = np.argsort(station, kind='stable')
+            sorted_ids = station[order]
+            nxt = np.empty(len(station), dtype=np.int64)
+            same = sorted_ids[1:] == sorted_ids[:-1]
+            nxt[order[:-1]] = np.where(same, base + order[1:], -1)
+            nxt[order[-1:]] = -1
+            # Last record of each station in this chunk continues into later chunks
+            last = np.ones(len(station), dtype=bool)
+            last[order[:-1]] = ~same
+            nxt[last] = following[station[last]]
+            chunk['next'][:] = nxt
+            # First record of each station becomes the successor for earlier chunks
+            first = np.ones(len(station), dtype=bool)
+            first[order[1:]] = ~same
+            following[station[first]] = base + np.flatnonzero(first)
+
+
+class TraceReader:
+    """Memory-mapped view of a trace file; columns are zero-copy arrays"""
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                              access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, _, footer, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise TraceError(f"{path}: not a version {VERSION} trace file")
+        if not footer:
+            raise TraceError(f"{path}: trace was not closed")
+        (chunks,) = struct.unpack_from('<Q', self._map, footer)
+        self.index = np.frombuffer(self._map, INDEX_DTYPE, chunks, footer + 8).copy()
+        names_at = footer + 8 + chunks * INDEX_DTYPE.itemsize
+        (length,) = struct.unpack_from('<Q', self._map, names_at)
+        self.names = json.loads(bytes(self._map[names_at + 8:names_at + 8 + length]))
+        counts = self.index['count'].astype(np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(counts)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:  # column views still alive; freed with them
+                pass
+            self._file.close()
+            self._map = None
+
+    @property
+    def start_time(self):
+        return float(self.index['t_min'][0]) if len(self.index) else 0.0
+
+    @property
+    def end_time(self):
+        return float(self.index['t_max'][-1]) if len(self.index) else 0.0
+
+    def chunk(self, k):
+        """{column: array view} of chunk k"""
+        offset, count = int(self.index['offset'][k]), int(self.index['count'][k])
+        columns = {}
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(self._map, dtype, count, offset)
+            offset += count * np.dtype(dtype).itemsize
+        return columns
+
+    def release(self, k):
+        """Let the OS drop chunk k's pages; they are re-read if touched again"""
+        if not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        offset = int(self.index['offset'][k])
+        start = offset - offset % mmap.PAGESIZE
+        end = offset + _chunk_bytes(int(self.index['count'][k]))
+        self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def records(self, indices):
+        """{column: array} for arbitrary global record indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        result = {name: np.empty(len(indices), dtype=dtype) for name, dtype in COLUMNS}
+        chunk_of = np.searchsorted(self.starts, indices, side='right') - 1
+        for k in np.unique(chunk_of):
+            mask = chunk_of == k
+            local = indices[mask] - self.starts[k]
+            for name, values in self.chunk(int(k)).items():
+                result[name][mask] = values[local]
+        return result
+
+    def between(self, t0, t1):
+        """Yield column dicts for records with t0 <= t < t1, chunk by chunk
+
+        The chunk index skips everything outside the range.
+        """
+        first = int(np.searchsorted(self.index['t_max'], t0, side='left'))
+        for k in range(first, len(self.index)):
+            if self.index['t_min'][k] >= t1:
+                break
+            columns = self.chunk(k)
+            lo = np.searchsorted(columns['t'], t0, side='left')
+            hi = np.searchsorted(columns['t'], t1, side='left')
+            if hi > lo:
+                yield {name: values[lo:hi] for name, values in columns.items()}
+
+
+class TraceCursor:
+    """Interpolated positions of every station as time moves forward
+
+    Only per-station state is kept: the last waypoint reached and the
+    next one (found through the `next` column). Stations are NaN until
+    their first record; after their last record they stay put.
+    `interpolate='step'` holds each position until the next record.
+    """
+
+    def __init__(self, reader, interpolate='linear'):
+        if interpolate not in ('linear', 'step'):
+            raise TraceError(f"unknown interpolation {interpolate!r}")
+        self.reader = reader
+        self.interpolate = interpolate
+        count = len(reader.names)
+        self.t0 = np.full(count, np.nan)
+        self.t1 = np.full(count, np.inf)
+        self.p0 = np.full((count, 3), np.nan)
+        self.p1 = np.full((count, 3), np.nan)
+        self._chunk = 0
+        self._row = 0
+        self.time = -np.inf
+
+    def _consume(self, columns):
+        """Apply a batch of time-ordered records, keeping each station's last"""
+        station = columns['station']
+        reverse = station[::-1]
+        ids, first = np.unique(reverse, return_index=True)
+        last = len(station) - 1 - first
+        self.t0[ids] = columns['t'][last]
+        self.p0[ids] = np.stack([columns[c][last] for c in 'xyz'], axis=1)
+        nxt = columns['next'][last]
+        has_next = nxt >= 0
+        self.t1[ids[~has_next]] = np.inf
+        self.p1[ids[~has_next]] = self.p0[ids[~has_next]]
+        if has_next.any():
+            ahead = self.reader.records(nxt[has_next])
+            self.t1[ids[has_next]] = ahead['t']
+            self.p1[ids[has_next]] = np.stack([ahead[c] for c in 'xyz'], axis=1)
+
+    def advance(self, t):
+        """Positions of all stations at time t (not earlier than the last call)"""
+        if t < self.time:
+            raise TraceError("cursors only move forward; open a new one to rewind")
+        self.time = t
+        index = self.reader.index
+        while self._chunk < len(index) and index['t_min'][self._chunk] <= t:
+            columns = self.reader.chunk(self._chunk)
+            end = int(np.searchsorted(columns['t'], t, side='right'))
+            if end > self._row:
+                self._consume({name: values[self._row:end]
+                               for name, values in columns.items()})
+            if end < len(columns['t']):
+                self._row = end
+                break
+            # Successor links only point forward: this chunk is done with
+            self.reader.release(self._chunk)
+            self._chunk += 1
+            self._row = 0
+        if self.interpolate == 'step':
+            return self.p0.copy()
+        span = self.t1 - self.t0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(np.isfinite(span) & (span > 0), (t - self.t0) / span, 0.0)
+        return self.p0 + (self.p1 - self.p0) * np.clip(frac, 0.0, 1.0)[:, None]
+
+
+class TraceReplay:
+    """Drive node positions from a trace, like MobilityEngine does from specs
+
+    `nodes` maps trace station names to nodes; stations without a node
+    are skipped. Only positions that changed since the previous tick
+    are pushed to setPosition.
+    """
+
+    def __init__(self, path, nodes, rate=1.0, interpolate='linear'):
+        self.reader = TraceReader(path)
+        self.cursor = TraceCursor(self.reader, interpolate)
+        self.rate = float(rate)
+        by_name = {name: node for name, node in nodes.items()}
+        self.rows = np.array([i for i, name in enumerate(self.reader.names)
+                              if name in by_name], dtype=np.int64)
+        self.nodes = [by_name[self.reader.names[i]] for i in self.rows]
+        self._last = np.full((len(self.rows), 3), np.nan)
+
+    @property
+    def duration(self):
+        return self.reader.end_time - min(self.reader.start_time, 0.0)
+
+    def tick(self, t):
+        """Apply positions for trace time t; returns the number of updates"""
+        pos = self.cursor.advance(t)[self.rows]
+        moved = np.isfinite(pos).all(axis=1) & np.any(pos != self._last, axis=1)
+        for i in np.flatnonzero(moved):
+            self.nodes[i].setPosition(format_position(pos[i]))
+        self._last[moved] = pos[moved]
+        return int(moved.sum())
+
+    def schedule(self, scheduler, start=None):
+        """Tick every 1/rate seconds from `start` until the trace ends"""
+        start = scheduler.now() if start is None else start
+        end = start + self.reader.end_time
+
+        def tick():
+            self.tick(scheduler.now() - start)
+
+        scheduler.every(1.0 / self.rate, tick, start=start, until=end,
+                        name='trace-replay')
+        scheduler.at(end, tick, name='trace-replay')
+        return end
+
+    def start(self, clock=None):
+        """Replay in a background thread on its own scheduler"""
+        self._scheduler = EventScheduler(clock)
+        self.schedule(self._scheduler)
+        self._thread = threading.Thread(target=self._scheduler.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def close(self):
+        self.reader.close()
+
+
+def record_positions(nodes, writer, now=None):
+    """Wrap each node's setPosition so every update is also recorded
+
+    `now` returns the timeline time (e.g. scheduler.now); by default
+    seconds since this call. Current positions are recorded first.
+    Returns a function that removes the hooks.
+    """
+    began = time.monotonic()
+    now = now or (lambda: time.monotonic() - began)
+    # Instance attributes only: another hook may already wrap setPosition
+    previous = {}
+
+    for node in nodes:
+        # Start from where the node is, so replays begin in the right place
+        if getattr(node, 'position', None) is not None:
+            writer.add(now(), node.name, node.position)
+        previous[node] = vars(node).get('setPosition')
+        original = node.setPosition
+
+        def hooked(position, *args, _node=node, _original=original, **kwargs):
+            writer.add(now(), _node.name, position)
+            return _original(position, *args, **kwargs)
+
+        node.setPosition = hooked
+
+    def unhook():
+        for node, saved in previous.items():
+            if saved is not None:
+                node.setPosition = saved
+            else:
+                vars(node).pop('setPosition', None)
+
+    return unhook
+
+
+def _write_waypoints(path, names, times, stations, points, chunk_size=65536):
+    """Sort waypoints by time and write them as a trace"""
+    order = np.argsort(times, kind='stable')
+    with TraceWriter(path, names, chunk_size) as writer:
+        writer.add_ids(np.asarray(times)[order], np.asarray(stations)[order],
+                       np.asarray(points, dtype=float).reshape(len(order), 3)[order])
+    return path
+
+
+def import_bonnmotion(movements, path, dimensions=2, prefix='sta', start=1):
+    """Convert a BonnMotion .movements file (one node per line:
+    't x y [z] t x y [z] ...') to a trace; nodes are named prefix1, prefix2, ..."""
+    step = 1 + dimensions
+    names, times, stations, points = [], [], [], []
+    with open(movements) as handle:
+        for line in handle:
+            values = [float(v) for v in line.split()]
+            if not values:
+                continue
+            if len(values) % step:
+                raise TraceError(f"{movements}: line {len(names) + 1} is not "
+                                 f"a list of {dimensions}D waypoints")
+            station = len(names)
+            names.append(f'{prefix}{station + start}')
+            for k in range(0, len(values), step):
+                times.append(values[k])
+                stations.append(station)
+                points.append((values[k + 1:k + step] + [0.0])[:3])
+    return _write_waypoints(path, names, np.array(times), stations, np.array(points))
+
+
+_NS2_SET = re.compile(r'\$node_\((\d+)\)\s+set\s+([XYZ])_\s+(\S+)')
+_NS2_DEST = re.compile(r'\$ns_?\s+at\s+(\S+)\s+"\$node_\((\d+)\)\s+setdest\s+'
+                       r'(\S+)\s+(\S+)\s+(\S+)"')
+
+
+def import_ns2(script, path, prefix='sta', start=1):
+    """Convert an ns-2 setdest movement script to a trace
+
+    Initial `set X_/Y_/Z_` lines give the start points; each setdest
+    becomes a waypoint pair (where the node is when the command runs,
+    and where it arrives at the given speed). A new setdest cuts the
+    previous leg short at the node's interpolated position.
+    """
+    initial, moves = {}, []
+    with open(script) as handle:
+        for line in handle:
+            match = _NS2_SET.search(line)
+            if match and ' at ' not in line:
+                node, axis, value = match.groups()
+                initial.setdefault(int(node), [0.0, 0.0, 0.0])['XYZ'.index(axis)] = float(value)
+                continue
+            match = _NS2_DEST.search(line)
+            if match:
+                t, node, x, y, speed = match.groups()
+                moves.append((float(t), int(node), float(x), float(y), float(speed)))
+    ids = sorted(set(initial) | {node for _, node, *_ in moves})
+    names = [f'{prefix}{node + start}' for node in ids]
+    waypoints = {node: [(0.0, np.array(initial.get(node, [0.0, 0.0, 0.0])))]
+                 for node in ids}
+    for t, node, x, y, speed in sorted(moves, key=lambda move: move[0]):
+        path_so_far = waypoints[node]
+        t1, p1 = path_so_far[-1]
+        if t1 > t:
+            # Interrupted leg: drop its arrival and stop where the node is now
+            t0, p0 = path_so_far[-2]
+            path_so_far.pop()
+            p1 = p0 + (p1 - p0) * ((t - t0) / (t1 - t0))
+        here = p1
+        target = np.array([x, y, here[2]])
+        arrive = t + (np.linalg.norm(target - here) / speed if speed > 0 else 0.0)
+        path_so_far += [(t, here), (arrive, target)]
+    times, stations, points = [], [], []
+    for i, node in enumerate(ids):
+        for t, point in waypoints[node]:
+            times.append(t)
+            stations.append(i)
+            points.append(point)
+    return _write_waypoints(path, names, np.array(times), stations, np.array(points))
+
+
+def trace_info(path):
+    """Station count, record count, time span and size of a trace file"""
+    with TraceReader(path) as reader:
+        return {'stations': len(reader.names), 'records': len(reader),
+                'chunks': len(reader.index), 'start': reader.start_time,
+                'end': reader.end_time, 'bytes': os.path.getsize(path)}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Inspect or import mobility traces')
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('info', help='summarize a trace file')
+    show.add_argument('trace')
+    for name in ('bonnmotion', 'ns2'):
+        convert = commands.add_parser(name, help=f'convert a {name} file to a trace')
+        convert.add_argument('source')
+        convert.add_argument('trace')
+        convert.add_argument('--prefix', default='sta')
+        if name == 'bonnmotion':
+            convert.add_argument('--dimensions', type=int, default=2)
+    args = parser.parse_args()
+    if args.command == 'bonnmotion':
+        import_bonnmotion(args.source, args.trace, args.dimensions, args.prefix)
+    elif args.command == 'ns2':
+        import_ns2(args.source, args.trace, args.prefix)
+    print(json.dumps(trace_info(args.trace), indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Parallel multi-flow iperf3 orchestration and result aggregation"""
+
+import json
+import re
+import subprocess
+
+from executor import run_batch
+from scheduler import EventScheduler
+
+try:
+    from mininet.log import info
+except ImportError:  # offline use against stub nodes
+    import logging
+    info = logging.getLogger(f'mininet.{__name__}').info
+
+
+class Flow:
+    """One iperf3 client -> server flow and its outcome"""
+
+    def __init__(self, client, server, port, protocol='tcp', parallel=1,
+                 start=0.0, duration=10, bitrate=None):
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError(f"Unsupported protocol {protocol!r}")
+        self.client = client
+        self.server = server
+        self.port = port
+        self.protocol = protocol
+        self.parallel = parallel
+        self.start = start
+        self.duration = duration
+        self.bitrate = bitrate
+        self.process = None
+        self.result = None
+
+    @property
+    def name(self):
+        return f'{self.client.name}->{self.server.name}:{self.port}/{self.protocol}'
+
+    def command(self):
+        cmd = (f'iperf3 -c {self.server.IP()} -p {self.port} '
+               f'-t {self.duration} -J')
+        if self.parallel > 1:
+            cmd += f' -P {self.parallel}'
+        if self.protocol == 'udp':
+            cmd += ' -u'
+        if self.bitrate:
+            cmd += f' -b {self.bitrate}'
+        return cmd
+
+
+def server_command(ports, wait=5):
+    """Start one iperf3 server per port, print its PID and wait until all listen"""
+    parts = [f'iperf3 -s -p {port} >/dev/null 2>&1 & echo $!' for port in ports]
+    checks = ' && '.join(f'ss -ltn | grep -q ":{port} "' for port in ports)
+    tries = int(wait / 0.1)
+    parts.append(f'for i in $(seq {tries}); do {checks} && break; '
+                 f'sleep 0.1; done')
+    return '; '.join(parts)
+
+
+def server_pids(output):
+    """PIDs echoed by server_command (lines that are just a number)"""
+    return [int(pid) for pid in re.findall(r'^\s*(\d+)\s*$', output, re.MULTILINE)]
+
+
+class TrafficOrchestrator:
+    """Run many iperf3 flows at once across arbitrary station pairs
+
+    Ports are allocated per server from `base_port`, so several flows can
+    target the same station. Servers start in parallel (one shell command
+    per server node) and clients are launched at their staggered start
+    offsets as separate processes, so flows really overlap. The servers'
+    PIDs are kept so stop_servers() kills exactly those processes.
+    """
+
+    def __init__(self, base_port=5201, workers=16):
+        self.base_port = base_port
+        self.workers = workers
+        self.flows = []
+        self._next_port = {}
+        self._pids = {}
+
+    def add_flow(self, client, server, protocol='tcp', parallel=1, start=0.0,
+                 duration=10, bitrate=None):
+        """Register a flow; the server port is allocated automatically"""
+        port = self._next_port.get(server.name, self.base_port)
+        self._next_port[server.name] = port + 1
+        flow = Flow(client, server, port, protocol, parallel, start,
+                    duration, bitrate)
+        self.flows.append(flow)
+        return flow
+
+    def _by_server(self):
+        servers = {}
+        for flow in self.flows:
+            servers.setdefault(flow.server.name, (flow.server, []))[1].append(flow.port)
+        return servers.values()
+
+    def start_servers(self):
+        """Start every iperf3 server, one node shell per worker"""
+        servers = list(self._by_server())
+        info(f"*** Starting {len(self.flows)} iperf3 servers on "
+             f"{len(servers)} nodes\n")
+        results = run_batch({server: server_command(ports) for server, ports in servers},
+                            workers=max(1, min(self.workers, len(servers))))
+        for server, _ in servers:
+            self._pids[server.name] = (server, server_pids(results[server.name][0].output))
+
+    def stop_servers(self):
+        """Kill only the iperf3 servers this orchestrator started"""
+        for server, pids in self._pids.values():
+            if pids:
+                server.cmd('kill ' + ' '.join(str(pid) for pid in pids))
+        self._pids = {}
+
+    def _launch(self, flow):
+        info(f"*** Starting flow {flow.name}\n")
+        flow.process = flow.client.popen(flow.command(),
+                                         stderr=subprocess.STDOUT,
+                                         universal_newlines=True)
+
+    def run(self, clock=None):
+        """Start servers, launch all flows on schedule and collect results
+
+        Returns the list of flows with `result` set to the decoded iperf3
+        JSON document (or None when the output could not be parsed).
+        """
+        if not self.flows:
+            return []
+        self.start_servers()
+        scheduler = EventScheduler(clock)
+        origin = scheduler.now()
+        for flow in self.flows:
+            scheduler.at(origin + flow.start, lambda f=flow: self._launch(f),
+                         name=flow.name)
+        scheduler.run()
+        for flow in self.flows:
+            output, _ = flow.process.communicate()
+            try:
+                flow.result = json.loads(output)
+            except ValueError:
+                info(f"*** Flow {flow.name} produced no JSON result\n")
+        return self.flows
+
+
+def summarize_flow(document):
+    """Goodput, success rate and loss of one iperf3 -J document
+
+    Only UDP measures loss. Bytes a TCP sender sent but the receiver had
+    not yet counted were in flight when the test ended, so TCP flows
+    report retransmits and a loss_percent of None.
+    """
+    end = document['end']
+    if 'sum_sent' in end:
+        sent, received = end['sum_sent'], end['sum_received']
+        sent_bytes, received_bytes = sent['bytes'], received['bytes']
+        loss = None
+        retransmits = sent.get('retransmits', 0)
+        duration = sent['seconds']
+        sent_bps = sent['bits_per_second']
+        received_bps = received['bits_per_second']
+    else:
+        # UDP reports one sum with datagram loss counted by the server
+        total = end['sum']
+        sent_bytes = total['bytes']
+        loss = total.get('lost_percent', 0.0)
+        retransmits = 0
+        duration = total['seconds']
+        sent_bps = total['bits_per_second']
+        received_bps = sent_bps * (1 - loss / 100.0)
+        received_bytes = sent_bytes * (1 - loss / 100.0)
+    return {
+        'sent_mbps': sent_bps / 1e6,
+        'received_mbps': received_bps / 1e6,
+        'goodput_mbps': received_bps / 1e6,
+        'success_rate': (received_bytes / sent_bytes) * 100 if sent_bytes > 0 else 0,
+        'loss_percent': loss,
+        'retransmits': retransmits,
+        'sent_bytes': sent_bytes,
+        'received_bytes': received_bytes,
+        'duration': duration,
+    }
+
+
+def jain_fairness(values):
+    """Jain's fairness index: 1.0 when every flow gets the same share"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return 0.0
+    square_sum = sum(v * v for v in values)
+    if square_sum == 0:
+        return 0.0
+    return sum(values) ** 2 / (len(values) * square_sum)
+
+
+def aggregate_flows(named_documents):
+    """Per-flow and network-wide goodput, fairness, loss and retransmits
+
+    `named_documents` maps a flow name to its iperf3 JSON document (flows
+    without a document count as zero goodput). Loss covers the UDP flows
+    and is None when there are none.
+    """
+    flows = {}
+    for name, document in named_documents.items():
+        try:
+            flows[name] = summarize_flow(document) if document else None
+        except KeyError:
+            flows[name] = None
+    valid = [f for f in flows.values() if f is not None]
+    udp = [f for f in valid if f['loss_percent'] is not None]
+    sent = sum(f['sent_bytes'] for f in udp)
+    received = sum(f['received_bytes'] for f in udp)
+    goodputs = [f['goodput_mbps'] if f else 0.0 for f in flows.values()]
+    return {
+        'flows': flows,
+        'total_goodput_mbps': sum(goodputs),
+        'fairness': jain_fairness(goodputs),
+        'loss_percent': 100.0 * (sent - received) / sent if sent > 0 else None,
+        'retransmits': sum(f['retransmits'] for f in valid),
+        'failed_flows': [name for name, f in flows.items() if f is None],
+    }